@@ -0,0 +1,125 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of being run; maps to 503 with Retry-After."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounded admission for the inference path.
+
+    At most `max_in_flight` requests run at once. Each client has at most one queued
+    request: a newer frame replaces the queued one (which is shed as superseded) and
+    keeps its place in line. Free slots go to the waiting client with the fewest
+    requests in flight, oldest first, so one busy camera cannot starve the rest.
+    Requests that wait longer than `queue_timeout` seconds, or arrive when
+    `max_queue` clients are already waiting, are shed.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int = 32, queue_timeout: float = 0.5):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._client_in_flight: Dict[str, int] = defaultdict(int)
+        self._waiting: "OrderedDict[str, asyncio.Future]" = OrderedDict()
+        self._service_time = 0.0  # Moving average of admitted request duration
+        self.stats = {'admitted': 0, 'queued_total': 0, 'superseded': 0, 'shed_deadline': 0, 'shed_queue_full': 0}
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog is expected to drain."""
+        backlog = len(self._waiting) + self.in_flight
+        return max(1, math.ceil(self._service_time * backlog / self.max_in_flight))
+
+    @asynccontextmanager
+    async def admit(self, client_id: str) -> AsyncIterator[None]:
+        """Hold an inference slot for the duration of the block."""
+        await self._acquire(client_id)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(client_id, time.monotonic() - started)
+
+    async def _acquire(self, client_id: str):
+        if self.in_flight < self.max_in_flight and not self._waiting:
+            self._grant(client_id)
+            return
+
+        previous = self._waiting.get(client_id)
+        if previous is not None:
+            # Coalesce to the newest frame; it inherits the older one's place in line
+            previous.set_exception(AdmissionRejected("superseded", 0))
+            self.stats['superseded'] += 1
+        elif len(self._waiting) >= self.max_queue:
+            self.stats['shed_queue_full'] += 1
+            raise AdmissionRejected("queue_full", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting[client_id] = waiter
+        self.stats['queued_total'] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                return  # Granted as the deadline expired
+            if self._waiting.get(client_id) is waiter:
+                del self._waiting[client_id]
+            if waiter.done() and not waiter.cancelled():
+                raise waiter.exception()
+            waiter.cancel()
+            self.stats['shed_deadline'] += 1
+            raise AdmissionRejected("deadline", self.retry_after())
+        except asyncio.CancelledError:
+            # Client went away: give back a slot granted in the meantime, or leave the queue
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                self._release(client_id, 0.0)
+            elif self._waiting.get(client_id) is waiter:
+                del self._waiting[client_id]
+                waiter.cancel()
+            raise
+
+    def _grant(self, client_id: str):
+        self.in_flight += 1
+        self._client_in_flight[client_id] += 1
+        self.stats['admitted'] += 1
+
+    def _release(self, client_id: str, duration: float):
+        self.in_flight -= 1
+        self._client_in_flight[client_id] -= 1
+        if self._client_in_flight[client_id] <= 0:
+            del self._client_in_flight[client_id]
+        if duration:
+            self._service_time = duration if not self._service_time else 0.8 * self._service_time + 0.2 * duration
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.in_flight < self.max_in_flight and self._waiting:
+            # Fewest requests in flight wins; dict order breaks ties by queue age
+            client_id = min(self._waiting, key=lambda waiting_id: self._client_in_flight.get(waiting_id, 0))
+            waiter = self._waiting.pop(client_id)
+            if waiter.done():
+                continue
+            self._grant(client_id)
+            waiter.set_result(True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queue_timeout_ms": round(self.queue_timeout * 1000),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiting),
+            "service_time_ms": round(self._service_time * 1000, 1),
+            **self.stats
+        }
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency the breaker considers down."""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} unavailable (circuit open)")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with background health probing.
+
+    Used as `async with breaker:` around calls to the dependency. After
+    `failure_threshold` consecutive failures the breaker opens and every call fails
+    immediately with CircuitOpenError. Once `reset_timeout` seconds have passed, the
+    next call starts a single background `probe` (half-open); success closes the
+    breaker, failure keeps it open for another `reset_timeout`. Only exceptions in
+    `failure_types` count as failures.
+    """
+
+    def __init__(self, name: str, probe: Callable[[], Awaitable[Any]], failure_threshold: int = 3,
+                 reset_timeout: float = 10.0, failure_types: Tuple[Type[BaseException], ...] = (Exception,)):
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_types = failure_types
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.last_error: Optional[str] = None
+        self._probe_task: Optional[asyncio.Task] = None
+        self.stats = {'calls': 0, 'failures': 0, 'short_circuited': 0, 'opened': 0, 'probes': 0}
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.opened_at + self.reset_timeout - time.monotonic()))
+
+    async def __aenter__(self):
+        if self.state != STATE_CLOSED:
+            if self.state == STATE_OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._start_probe()
+            self.stats['short_circuited'] += 1
+            raise CircuitOpenError(self.name, self.retry_after())
+        self.stats['calls'] += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.consecutive_failures = 0
+        elif issubclass(exc_type, self.failure_types):
+            self.record_failure(exc)
+        return False
+
+    def record_failure(self, exc: BaseException):
+        self.stats['failures'] += 1
+        self.consecutive_failures += 1
+        self.last_error = f"{type(exc).__name__}: {exc}"
+        if self.state == STATE_CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        if self.state == STATE_CLOSED:
+            logger.warning(f"{self.name} circuit opened after {self.consecutive_failures} failures: {self.last_error}")
+            self.stats['opened'] += 1
+        else:
+            logger.debug(f"{self.name} probe failed, circuit stays open: {self.last_error}")
+        self.state = STATE_OPEN
+        self.opened_at = time.monotonic()
+
+    def _start_probe(self):
+        self.state = STATE_HALF_OPEN
+        self._probe_task = asyncio.get_running_loop().create_task(self._run_probe())
+
+    async def _run_probe(self):
+        self.stats['probes'] += 1
+        try:
+            await self.probe()
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            self._open()
+            return
+        logger.info(f"{self.name} circuit closed after successful probe")
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+
+    def get_status(self) -> Dict[str, Any]:
+        status = {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout_seconds": self.reset_timeout,
+            "last_error": self.last_error,
+            **self.stats
+        }
+        if self.state != STATE_CLOSED:
+            status["retry_after_seconds"] = self.retry_after()
+        return status
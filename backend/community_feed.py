@@ -0,0 +1,134 @@
+import base64
+import bisect
+import binascii
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from schemas import CommunityPost
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Feed order key: newest first by (timestamp, id)
+FeedKey = Tuple[datetime, str]
+
+
+def normalize_timestamp(value: datetime) -> datetime:
+    """Naive UTC at millisecond precision, matching what MongoDB stores and returns."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
+def feed_key(post: CommunityPost) -> FeedKey:
+    return normalize_timestamp(post.timestamp), post.id
+
+
+def encode_cursor(post: CommunityPost) -> str:
+    """Opaque cursor pointing just after `post` in feed order."""
+    timestamp, post_id = feed_key(post)
+    milliseconds = (timestamp - _EPOCH) // timedelta(milliseconds=1)
+    raw = json.dumps([milliseconds, post_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> FeedKey:
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        milliseconds, post_id = json.loads(raw)
+        if not isinstance(milliseconds, int) or not isinstance(post_id, str):
+            raise ValueError
+        return _EPOCH + timedelta(milliseconds=milliseconds), post_id
+    except (binascii.Error, ValueError, TypeError, OverflowError):
+        raise ValueError("Invalid feed cursor")
+
+
+def keyset_filter(after: FeedKey) -> Dict:
+    """Mongo filter for posts strictly after `after` in (timestamp, id) descending order."""
+    timestamp, post_id = after
+    return {"$or": [
+        {"timestamp": {"$lt": timestamp}},
+        {"timestamp": timestamp, "id": {"$lt": post_id}}
+    ]}
+
+
+class FeedCache:
+    """In-process copy of the newest `capacity` community posts.
+
+    Kept current in place by create_post/like_post, so hot feed pages are served
+    without a query. Posts written by other processes show up when the copy expires
+    after `ttl` seconds. A load that overlaps a write is discarded rather than risk
+    dropping that write.
+    """
+
+    def __init__(self, capacity: int = 100, ttl: float = 30.0):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._keys: List[FeedKey] = []          # Ascending, parallel to _posts
+        self._posts: List[CommunityPost] = []
+        self._by_id: Dict[str, CommunityPost] = {}
+        self._complete = False                  # True when the cache holds every post
+        self._loaded_at: Optional[float] = None
+        self.writes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'loads': 0}
+
+    @property
+    def fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def load(self, posts: List[CommunityPost], writes_at_start: int):
+        """Replace the cache with the newest posts from the database, newest first."""
+        if writes_at_start != self.writes:
+            return
+        self._posts = [post for post in reversed(posts[:self.capacity])]
+        for post in self._posts:
+            post.timestamp = normalize_timestamp(post.timestamp)
+        self._keys = [feed_key(post) for post in self._posts]
+        self._by_id = {post.id: post for post in self._posts}
+        self._complete = len(posts) < self.capacity
+        self._loaded_at = time.monotonic()
+        self.stats['loads'] += 1
+
+    def page(self, limit: int, after: Optional[FeedKey] = None
+             ) -> Optional[Tuple[List[CommunityPost], Optional[str]]]:
+        """(posts, next_cursor) from the cache, or None if it can't answer on its own."""
+        if not self.fresh:
+            self.stats['misses'] += 1
+            return None
+        end = len(self._keys) if after is None else bisect.bisect_left(self._keys, after)
+        start = end - limit
+        if start < 0 and not self._complete:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        page = self._posts[max(start, 0):end][::-1]
+        has_more = start > 0 or (start == 0 and not self._complete)
+        return page, encode_cursor(page[-1]) if page and has_more else None
+
+    def add(self, post: CommunityPost):
+        self.writes += 1
+        if not self.fresh:
+            return
+        key = feed_key(post)
+        if len(self._keys) >= self.capacity and key < self._keys[0]:
+            return  # Older than everything cached
+        index = bisect.bisect_left(self._keys, key)
+        self._keys.insert(index, key)
+        self._posts.insert(index, post)
+        self._by_id[post.id] = post
+        if len(self._posts) > self.capacity:
+            del self._keys[0]
+            evicted = self._posts.pop(0)
+            self._by_id.pop(evicted.id, None)
+            self._complete = False
+
+    def like(self, post_id: str):
+        self.writes += 1
+        post = self._by_id.get(post_id)
+        if post is not None:
+            post.likes += 1
+
+    def get_stats(self) -> Dict:
+        return {"cached_posts": len(self._posts), "complete": self._complete, "fresh": self.fresh, **self.stats}
@@ -1,30 +1,75 @@
 from motor.motor_asyncio import AsyncIOMotorClient
-from typing import List, Dict, Any, Optional
+from pymongo.errors import ConnectionFailure, ExecutionTimeout
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 import os
 from datetime import datetime, timedelta
 from schemas import User, Session, Appointment, CommunityPost, LearningResource
+from circuit_breaker import CircuitBreaker
+from community_feed import FeedCache, decode_cursor, encode_cursor, keyset_filter, normalize_timestamp
+from http_cache import VersionStamps
 import logging
 
+# Community feed order; keyset cursors depend on it being total
+FEED_SORT = [("timestamp", -1), ("id", -1)]
+
 class Database:
-    def __init__(self, mongo_url: str, db_name: str):
-        self.client = AsyncIOMotorClient(mongo_url)
+    def __init__(self, mongo_url: str, db_name: str, breaker_failure_threshold: int = 3,
+                 breaker_reset_timeout: float = 10.0, feed_cache_size: int = 100,
+                 feed_cache_ttl: float = 30.0, **client_options):
+        """`client_options` are passed to the Motor client (timeouts, pool size)."""
+        self.client_options = client_options
+        if mongo_url.startswith("memory://"):
+            # Offline in-memory stand-in (load tests, demos)
+            from memory_mongo import InMemoryMotorClient
+            self.client = InMemoryMotorClient()
+        else:
+            self.client = AsyncIOMotorClient(mongo_url, **client_options)
         self.db = self.client[db_name]
+        # Unreachable Mongo fails fast instead of waiting out server selection on every call
+        self.breaker = CircuitBreaker(
+            "MongoDB", self.ping,
+            failure_threshold=breaker_failure_threshold,
+            reset_timeout=breaker_reset_timeout,
+            failure_types=(ConnectionFailure, ExecutionTimeout)
+        )
+        self.feed = FeedCache(capacity=feed_cache_size, ttl=feed_cache_ttl)
+        # Bumped after every write (even a failed one) so response ETags change with the data
+        self.versions = VersionStamps()
         
     async def close(self):
         self.client.close()
+
+    async def ping(self):
+        """Cheap round trip used to probe a tripped breaker."""
+        await self.client.admin.command("ping")
+
+    async def ensure_indexes(self):
+        """Indexes backing sorted per-user session scans and feed pagination."""
+        async with self.breaker:
+            await self.db.sessions.create_index([("user_id", 1), ("date", 1)])
+            await self.db.community_posts.create_index(FEED_SORT)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Breaker state and client settings."""
+        return {"breaker": self.breaker.get_status(), "client_options": self.client_options,
+                "feed_cache": self.feed.get_stats(), "versions": self.versions.get_stats()}
     
     # User operations
     async def create_user(self, user: User) -> User:
         try:
-            await self.db.users.insert_one(user.dict())
+            async with self.breaker:
+                await self.db.users.insert_one(user.dict())
             return user
         except Exception as e:
             logging.error(f"Database error in create_user: {e}")
             return user  # Return user even if database fails
+        finally:
+            self.versions.bump(f"users:{user.id}")
     
     async def get_user(self, user_id: str) -> Optional[User]:
         try:
-            user_data = await self.db.users.find_one({"id": user_id})
+            async with self.breaker:
+                user_data = await self.db.users.find_one({"id": user_id})
             return User(**user_data) if user_data else None
         except Exception as e:
             logging.error(f"Database error in get_user: {e}")
@@ -32,39 +77,63 @@ class Database:
     
     async def update_user(self, user_id: str, updates: Dict[str, Any]) -> bool:
         try:
-            result = await self.db.users.update_one({"id": user_id}, {"$set": updates})
+            async with self.breaker:
+                result = await self.db.users.update_one({"id": user_id}, {"$set": updates})
             return result.modified_count > 0
         except Exception as e:
             logging.error(f"Database error in update_user: {e}")
             return False
+        finally:
+            self.versions.bump(f"users:{user_id}")
     
     # Session operations
     async def create_session(self, session: Session) -> Session:
         try:
-            await self.db.sessions.insert_one(session.dict())
+            async with self.breaker:
+                await self.db.sessions.insert_one(session.dict())
             return session
         except Exception as e:
             logging.error(f"Database error in create_session: {e}")
             return session
+        finally:
+            self.versions.bump(f"sessions:{session.user_id}")
     
     async def get_user_sessions(self, user_id: str, days: int = 7) -> List[Session]:
         try:
             start_date = datetime.utcnow() - timedelta(days=days)
-            sessions_data = await self.db.sessions.find({
-                "user_id": user_id,
-                "date": {"$gte": start_date}
-            }).sort("date", -1).to_list(100)
+            async with self.breaker:
+                sessions_data = await self.db.sessions.find({
+                    "user_id": user_id,
+                    "date": {"$gte": start_date}
+                }).sort("date", -1).to_list(100)
             return [Session(**session) for session in sessions_data]
         except Exception as e:
             logging.error(f"Database error in get_user_sessions: {e}")
             return []
     
+    async def iter_user_sessions(self, user_id: str, days: Optional[int] = None,
+                                 fields: Optional[List[str]] = None,
+                                 batch_size: int = 500) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a user's sessions oldest first as raw documents, fetched `batch_size` at a time."""
+        query: Dict[str, Any] = {"user_id": user_id}
+        if days is not None:
+            query["date"] = {"$gte": datetime.utcnow() - timedelta(days=days)}
+        projection = {"_id": 0, **{field: 1 for field in fields or []}}
+        async with self.breaker:
+            cursor = self.db.sessions.find(query, projection).sort("date", 1).batch_size(batch_size)
+            try:
+                async for session_data in cursor:
+                    yield session_data
+            finally:
+                await cursor.close()
+    
     async def get_latest_session(self, user_id: str) -> Optional[Session]:
         try:
-            session_data = await self.db.sessions.find_one(
-                {"user_id": user_id},
-                sort=[("date", -1)]
-            )
+            async with self.breaker:
+                session_data = await self.db.sessions.find_one(
+                    {"user_id": user_id},
+                    sort=[("date", -1)]
+                )
             return Session(**session_data) if session_data else None
         except Exception as e:
             logging.error(f"Database error in get_latest_session: {e}")
@@ -72,47 +141,99 @@ class Database:
     
     # Appointment operations
     async def create_appointment(self, appointment: Appointment) -> Appointment:
-        await self.db.appointments.insert_one(appointment.dict())
+        try:
+            async with self.breaker:
+                await self.db.appointments.insert_one(appointment.dict())
+        finally:
+            self.versions.bump(f"appointments:{appointment.user_id}")
         return appointment
     
     async def get_user_appointments(self, user_id: str) -> List[Appointment]:
-        appointments_data = await self.db.appointments.find({
-            "user_id": user_id,
-            "status": {"$ne": "cancelled"}
-        }).sort("date", 1).to_list(50)
+        async with self.breaker:
+            appointments_data = await self.db.appointments.find({
+                "user_id": user_id,
+                "status": {"$ne": "cancelled"}
+            }).sort("date", 1).to_list(50)
         return [Appointment(**appointment) for appointment in appointments_data]
     
     # Community operations
     async def create_post(self, post: CommunityPost) -> CommunityPost:
-        await self.db.community_posts.insert_one(post.dict())
+        # Store what Mongo can represent so cached and queried copies sort identically
+        post.timestamp = normalize_timestamp(post.timestamp)
+        try:
+            async with self.breaker:
+                await self.db.community_posts.insert_one(post.dict())
+        finally:
+            self.versions.bump("community_posts")
+        self.feed.add(post)
         return post
     
+    async def get_community_page(self, limit: int = 20,
+                                 cursor: Optional[str] = None) -> Tuple[List[CommunityPost], Optional[str]]:
+        """One feed page, newest first, and the cursor for the next page (None at the end).
+
+        Pages within the cached head of the feed are served from memory; deeper pages
+        use a keyset query on (timestamp, id). Raises ValueError for a malformed cursor.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        cached = self.feed.page(limit, after)
+        if cached is not None:
+            return cached
+
+        if after is None and limit <= self.feed.capacity:
+            writes_at_start = self.feed.writes
+            async with self.breaker:
+                posts_data = await self.db.community_posts.find().sort(FEED_SORT).limit(
+                    self.feed.capacity).to_list(self.feed.capacity)
+            self.feed.load([CommunityPost(**post) for post in posts_data], writes_at_start)
+            cached = self.feed.page(limit)
+            if cached is not None:
+                return cached
+
+        query = keyset_filter(after) if after else {}
+        async with self.breaker:
+            posts_data = await self.db.community_posts.find(query).sort(FEED_SORT).limit(limit + 1).to_list(limit + 1)
+        posts = [CommunityPost(**post) for post in posts_data[:limit]]
+        return posts, encode_cursor(posts[-1]) if len(posts_data) > limit else None
+    
     async def get_community_posts(self, limit: int = 20) -> List[CommunityPost]:
-        posts_data = await self.db.community_posts.find().sort("timestamp", -1).limit(limit).to_list(limit)
-        return [CommunityPost(**post) for post in posts_data]
+        posts, _ = await self.get_community_page(limit)
+        return posts
     
     async def like_post(self, post_id: str) -> bool:
-        result = await self.db.community_posts.update_one(
-            {"id": post_id},
-            {"$inc": {"likes": 1}}
-        )
+        try:
+            async with self.breaker:
+                result = await self.db.community_posts.update_one(
+                    {"id": post_id},
+                    {"$inc": {"likes": 1}}
+                )
+        finally:
+            self.versions.bump("community_posts")
+        if result.modified_count > 0:
+            self.feed.like(post_id)
         return result.modified_count > 0
     
     # Learning resources operations
     async def get_learning_resources(self, resource_type: Optional[str] = None) -> List[LearningResource]:
         query = {"resource_type": resource_type} if resource_type else {}
-        resources_data = await self.db.learning_resources.find(query).to_list(50)
+        async with self.breaker:
+            resources_data = await self.db.learning_resources.find(query).to_list(50)
         return [LearningResource(**resource) for resource in resources_data]
     
     async def create_learning_resource(self, resource: LearningResource) -> LearningResource:
-        await self.db.learning_resources.insert_one(resource.dict())
+        try:
+            async with self.breaker:
+                await self.db.learning_resources.insert_one(resource.dict())
+        finally:
+            self.versions.bump("learning_resources")
         return resource
 
     # Initialize sample data
     async def init_sample_data(self):
         """Initialize database with sample data."""
         # Check if data already exists
-        existing_users = await self.db.users.count_documents({})
+        async with self.breaker:
+            existing_users = await self.db.users.count_documents({})
         if existing_users > 0:
             return
         
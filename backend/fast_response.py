@@ -0,0 +1,56 @@
+from typing import Optional
+
+from fastapi import Response
+from pydantic import BaseModel
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional; clients asking for it get JSON
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_ACCEPT = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+def negotiate_media_type(accept: Optional[str]) -> str:
+    """Pick MessagePack when the client accepts it and msgpack is installed, else JSON."""
+    if msgpack is None or not accept:
+        return JSON_MEDIA_TYPE
+    for media_range in accept.split(","):
+        media_type, *params = media_range.split(";")
+        if media_type.strip().lower() not in _MSGPACK_ACCEPT:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            return MSGPACK_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+
+def encode_model(model: BaseModel, media_type: str = JSON_MEDIA_TYPE) -> bytes:
+    """Serialize a model without revalidating it.
+
+    JSON goes through pydantic-core's serializer, which produces the same bytes as the
+    response_model path at a fraction of the cost. MessagePack carries the same
+    JSON-mode values, so both encodings share one schema.
+    """
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return msgpack.packb(model.model_dump(mode="json"))
+    return model.model_dump_json().encode("utf-8")
+
+
+def encoded_response(body: bytes, media_type: str = JSON_MEDIA_TYPE) -> Response:
+    """Wrap an already encoded body; varies on Accept because the encoding is negotiated."""
+    return Response(content=body, media_type=media_type, headers={"Vary": "Accept"})
+
+
+def model_response(model: BaseModel, media_type: str = JSON_MEDIA_TYPE) -> Response:
+    """Response for a trusted internal model, bypassing response_model revalidation."""
+    return encoded_response(encode_model(model, media_type), media_type)
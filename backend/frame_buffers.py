@@ -0,0 +1,102 @@
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+_MIN_BUCKET = 4096
+
+
+def bucket_size(size: int) -> int:
+    """Round `size` up to one of eight steps per power of two (under 12.5% slack), in 4 KiB steps at least."""
+    # A step of 1/8 of the largest power of two below `size` keeps the slack under 12.5%
+    step = max((1 << (max(size - 1, 1).bit_length() - 1)) // 8, _MIN_BUCKET)
+    return -(-size // step) * step
+
+
+class FrameBufferPool:
+    """Preallocated uint8 buffers, bucketed by size and recycled between frames.
+
+    Frames of one resolution keep hitting the same bucket, so steady-state traffic
+    reuses the same few buffers instead of allocating several megabytes per frame.
+    At most `max_idle_bytes` of released buffers are kept; beyond that they are freed.
+    Thread-safe: buffers are taken on the event loop and filled in the threadpool.
+    """
+
+    def __init__(self, max_idle_bytes: int = 64 * 1024 * 1024):
+        self.max_idle_bytes = max_idle_bytes
+        self._free: Dict[int, List[np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self.idle_bytes = 0
+        self.in_use_bytes = 0
+        self.peak_in_use_bytes = 0
+        self.peak_total_bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'dropped': 0}
+
+    def take(self, size: int) -> np.ndarray:
+        """A flat buffer of at least `size` bytes; hand it back with `give`."""
+        bucket = bucket_size(size)
+        with self._lock:
+            free = self._free.get(bucket)
+            if free:
+                buffer = free.pop()
+                self.idle_bytes -= bucket
+                self.stats['hits'] += 1
+            else:
+                buffer = None
+                self.stats['misses'] += 1
+            self.in_use_bytes += bucket
+            self.peak_in_use_bytes = max(self.peak_in_use_bytes, self.in_use_bytes)
+            self.peak_total_bytes = max(self.peak_total_bytes, self.in_use_bytes + self.idle_bytes)
+        return buffer if buffer is not None else np.empty(bucket, dtype=np.uint8)
+
+    def give(self, buffer: np.ndarray):
+        bucket = buffer.nbytes
+        with self._lock:
+            self.in_use_bytes -= bucket
+            if self.idle_bytes + bucket > self.max_idle_bytes:
+                self.stats['dropped'] += 1
+                return
+            self._free.setdefault(bucket, []).append(buffer)
+            self.idle_bytes += bucket
+
+    def lease(self) -> "FrameLease":
+        return FrameLease(self)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            requests = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                "hit_rate": round(self.stats['hits'] / requests, 4) if requests else 0.0,
+                "in_use_bytes": self.in_use_bytes,
+                "idle_bytes": self.idle_bytes,
+                "peak_in_use_bytes": self.peak_in_use_bytes,
+                "peak_total_bytes": self.peak_total_bytes,
+                "buckets": {size: len(free) for size, free in sorted(self._free.items())}
+            }
+
+
+class FrameLease:
+    """Buffers used while handling one request, all returned to the pool on exit."""
+
+    def __init__(self, pool: FrameBufferPool):
+        self.pool = pool
+        self._buffers: List[np.ndarray] = []
+
+    def array(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """Uninitialized uint8 array of `shape` backed by a pooled buffer."""
+        size = int(np.prod(shape))
+        buffer = self.pool.take(size)
+        self._buffers.append(buffer)
+        return buffer[:size].reshape(shape)
+
+    def close(self):
+        buffers, self._buffers = self._buffers, []
+        for buffer in buffers:
+            self.pool.give(buffer)
+
+    def __enter__(self) -> "FrameLease":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
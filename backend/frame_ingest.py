@@ -0,0 +1,187 @@
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from frame_buffers import FrameLease
+
+# Upload formats accepted by the frame endpoints
+FRAME_FORMATS = ("jpeg", "rgb", "rgba", "nv12", "i420")
+
+_TO_RGB = {
+    'bgr': cv2.COLOR_BGR2RGB,
+    'rgba': cv2.COLOR_RGBA2RGB,
+    'nv12': cv2.COLOR_YUV2RGB_NV12,
+    'i420': cv2.COLOR_YUV2RGB_I420
+}
+_TO_BGR = {
+    'rgb': cv2.COLOR_RGB2BGR,
+    'rgba': cv2.COLOR_RGBA2BGR,
+    'nv12': cv2.COLOR_YUV2BGR_NV12,
+    'i420': cv2.COLOR_YUV2BGR_I420
+}
+_REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+# JPEG start-of-frame markers (SOF0-SOF15 except DHT, JPG and DAC)
+_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+class FrameTooLargeError(ValueError):
+    """Raised for frames with more pixels than the inference path is sized for."""
+
+
+def to_rgb(data: np.ndarray, color: str, dst: Optional[np.ndarray] = None) -> np.ndarray:
+    """RGB view or converted copy of a frame stored in `color` layout, written into `dst` if given."""
+    if color == 'rgb':
+        return data
+    return cv2.cvtColor(data, _TO_RGB[color], dst=dst)
+
+
+def to_bgr(data: np.ndarray, color: str, dst: Optional[np.ndarray] = None) -> np.ndarray:
+    """BGR image of a frame stored in `color` layout (the frame itself when already BGR)."""
+    if color == 'bgr':
+        return data
+    return cv2.cvtColor(data, _TO_BGR[color], dst=dst)
+
+
+def frame_shape(color: str, width: int, height: int) -> Tuple[int, ...]:
+    """Array shape of a raw frame; YUV 4:2:0 stores chroma below the luma plane."""
+    if color in ('nv12', 'i420'):
+        return (height * 3 // 2, width)
+    return (height, width, 4 if color == 'rgba' else 3)
+
+
+def max_frame_bytes(max_pixels: int) -> int:
+    """Size of the largest frame array decode_frame returns within `max_pixels` (raw RGBA, 4 bytes a pixel)."""
+    return max_pixels * 4
+
+
+def jpeg_size(contents: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from a JPEG header without decoding, or None if not a JPEG."""
+    if len(contents) < 4 or contents[0] != 0xFF or contents[1] != 0xD8:
+        return None
+    offset = 2
+    while offset + 9 <= len(contents):
+        if contents[offset] != 0xFF:
+            return None
+        marker = contents[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker in _SOF_MARKERS:
+            height = int.from_bytes(contents[offset + 5:offset + 7], 'big')
+            width = int.from_bytes(contents[offset + 7:offset + 9], 'big')
+            return width, height
+        offset += 2 + int.from_bytes(contents[offset + 2:offset + 4], 'big')
+    return None
+
+
+def reduction_factor(width: int, height: int, inference_size: Optional[int],
+                     max_pixels: Optional[int] = None) -> int:
+    """libjpeg scale-down (1, 2, 4 or 8) for decoding a `width` x `height` JPEG.
+
+    The largest factor that keeps the long side at or above `inference_size`, raised
+    if needed until the decoded image has at most `max_pixels` pixels. Raises
+    FrameTooLargeError when even 1/8 scale is too large.
+    """
+    factor = 1
+    if inference_size:
+        for candidate, _ in _REDUCED_FLAGS:
+            if max(width, height) // candidate >= inference_size:
+                factor = candidate
+                break
+    if not max_pixels:
+        return factor
+    for candidate in (1, 2, 4, 8):
+        # libjpeg rounds reduced sizes up
+        if candidate >= factor and -(-width // candidate) * -(-height // candidate) <= max_pixels:
+            return candidate
+    raise FrameTooLargeError(f"{width}x{height} image exceeds {max_pixels} pixels even at 1/8 scale")
+
+
+def _check_pixels(width: int, height: int, max_pixels: Optional[int]):
+    if max_pixels and width * height > max_pixels:
+        raise FrameTooLargeError(f"{width}x{height} frame exceeds the {max_pixels} pixel limit")
+
+
+class IngestedFrame:
+    """Uploaded frame in its native layout, with RGB/BGR produced only on demand.
+
+    `scale` maps pixel coordinates in this frame back to the uploaded resolution
+    (greater than 1 after a reduced JPEG decode). With a `buffers` lease, conversions
+    and scratch images are written into pooled buffers that live as long as the lease.
+    """
+
+    def __init__(self, data: np.ndarray, color: str, scale: float = 1.0, buffers: Optional[FrameLease] = None):
+        self.data = data
+        self.color = color
+        self.scale = scale
+        self.buffers = buffers
+        self._rgb = None
+
+    @property
+    def width(self) -> int:
+        return self.data.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.data.shape[0] * 2 // 3 if self.color in ('nv12', 'i420') else self.data.shape[0]
+
+    def scratch(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """Uninitialized uint8 image, pooled when the frame has a lease."""
+        return self.buffers.array(shape) if self.buffers is not None else np.empty(shape, dtype=np.uint8)
+
+    def rgb(self) -> np.ndarray:
+        if self._rgb is None:
+            dst = None if self.color == 'rgb' else self.scratch((self.height, self.width, 3))
+            self._rgb = to_rgb(self.data, self.color, dst)
+        return self._rgb
+
+    def bgr(self) -> np.ndarray:
+        """Writable BGR image for drawing."""
+        if self.color == 'bgr':
+            return self.data if self.data.flags.writeable else self.data.copy()
+        return to_bgr(self.data, self.color, self.scratch((self.height, self.width, 3)))
+
+
+def decode_frame(contents: bytes, frame_format: str = "jpeg", width: Optional[int] = None,
+                 height: Optional[int] = None, inference_size: Optional[int] = None,
+                 buffers: Optional[FrameLease] = None, max_pixels: Optional[int] = None) -> IngestedFrame:
+    """Decode an uploaded frame (any bytes-like `contents`).
+
+    Compressed images go through cv2.imdecode; JPEGs are decoded at 1/2, 1/4 or 1/8 scale
+    when the long side still covers `inference_size` pixels, or when that is needed to
+    stay within `max_pixels`. Raw formats need `width` and `height` and are wrapped without
+    copying. Raises ValueError for undecodable or mis-sized input, and FrameTooLargeError
+    for frames over `max_pixels` that cannot be decoded smaller.
+    """
+    if frame_format not in FRAME_FORMATS:
+        raise ValueError(f"Unsupported frame format '{frame_format}', expected one of {', '.join(FRAME_FORMATS)}")
+
+    if frame_format == "jpeg":
+        buffer = np.frombuffer(contents, np.uint8)
+        factor = 1
+        size = jpeg_size(contents) if inference_size or max_pixels else None
+        if size is not None:
+            factor = reduction_factor(size[0], size[1], inference_size, max_pixels)
+        flag = dict(_REDUCED_FLAGS).get(factor, cv2.IMREAD_COLOR)
+        image = cv2.imdecode(buffer, flag)
+        if image is None:
+            raise ValueError("Invalid image format")
+        if size is None:
+            _check_pixels(image.shape[1], image.shape[0], max_pixels)
+        if size is not None and factor > 1:
+            # libjpeg rounds reduced sizes up, so derive the exact scale. imdecode applies
+            # EXIF orientation, which may swap the axes, so compare the long sides.
+            return IngestedFrame(image, 'bgr', max(size) / max(image.shape[:2]), buffers)
+        return IngestedFrame(image, 'bgr', buffers=buffers)
+
+    if not width or not height or width <= 0 or height <= 0:
+        raise ValueError(f"Raw {frame_format} frames require positive width and height")
+    if frame_format in ('nv12', 'i420') and (width % 2 or height % 2):
+        raise ValueError(f"{frame_format} frames require even width and height")
+    _check_pixels(width, height, max_pixels)
+    shape = frame_shape(frame_format, width, height)
+    expected = int(np.prod(shape))
+    if len(contents) != expected:
+        raise ValueError(f"Expected {expected} bytes for a {width}x{height} {frame_format} frame, got {len(contents)}")
+    return IngestedFrame(np.frombuffer(contents, np.uint8).reshape(shape), frame_format, buffers=buffers)
@@ -0,0 +1,118 @@
+import gzip
+import hashlib
+import os
+import time
+from typing import Dict, Iterable, Optional
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; clients asking for it get gzip
+    brotli = None
+
+_GZIP_LEVEL = 6
+_BROTLI_QUALITY = 5
+
+
+class VersionStamps:
+    """Counters bumped on every write to a scope ("community_posts", "sessions:<user>").
+
+    An ETag built from the stamps of the scopes a response reads changes whenever
+    that data may have changed, without hashing the body. The epoch is random per
+    process, so ETags issued before a restart never validate.
+    """
+
+    def __init__(self):
+        self.epoch = os.urandom(4).hex()
+        self._versions: Dict[str, int] = {}
+
+    def bump(self, *scopes: str):
+        for scope in scopes:
+            self._versions[scope] = self._versions.get(scope, 0) + 1
+
+    def get(self, scope: str) -> int:
+        return self._versions.get(scope, 0)
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self._versions)
+
+
+def make_etag(stamps: VersionStamps, scopes: Iterable[str], request: Request, max_age: float = 0) -> str:
+    """Weak ETag for `request` given the current stamps of the scopes it reads.
+
+    The path and query are hashed in, since one scope backs many distinct responses.
+    With `max_age` the tag also rolls over every `max_age` seconds, bounding staleness
+    from writes made by other processes and from time-windowed queries.
+    """
+    versions = ".".join(str(stamps.get(scope)) for scope in scopes)
+    if max_age > 0:
+        versions += f"-{int(time.time() // max_age)}"
+    target = hashlib.blake2b(f"{request.url.path}?{request.url.query}".encode("utf-8"), digest_size=6).hexdigest()
+    return f'W/"{stamps.epoch}-{versions}-{target}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check using weak comparison."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick br (when installed) or gzip from Accept-Encoding, or None for identity."""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for coding in accept_encoding.split(","):
+        name, *params = coding.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=_GZIP_LEVEL)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=_validator_headers(etag))
+
+
+def compressed_response(request: Request, body: bytes, media_type: str, etag: Optional[str] = None,
+                        min_size: int = 1024) -> Response:
+    """Response compressed per Accept-Encoding when the body is at least `min_size` bytes."""
+    headers = _validator_headers(etag) if etag else {"Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(request.headers.get("accept-encoding")) if len(body) >= min_size else None
+    if encoding:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def _validator_headers(etag: str) -> Dict[str, str]:
+    # no-cache: clients may keep the body but must revalidate before reusing it
+    return {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
@@ -0,0 +1,400 @@
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import time
+import zlib
+import multiprocessing as mp
+from collections import OrderedDict, deque
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from frame_ingest import FrameTooLargeError
+
+logger = logging.getLogger(__name__)
+
+# Worker modes
+MODE_ANALYZE = "analyze"      # Single image, analysis only
+MODE_JSON = "json"            # Live frame, analysis plus session tracking
+MODE_ANNOTATE = "annotate"    # Live frame, annotated JPEG written back to the slot
+MODE_MULTI = "multi"          # Live frame, every person analyzed and tracked
+MODE_END = "end"              # Session over: drop its state and close its recording (no frame, no reply)
+
+
+class WorkerCrashedError(RuntimeError):
+    """Raised for requests that were in flight when their worker died."""
+
+
+def _worker_main(worker_id: int, shm_name: str, slot_bytes: int, max_sessions: int,
+                 requests_conn, results_conn):
+    """Inference worker loop: one PostureAnalyzer per session, frames read from shared memory."""
+    # Imported here so only the workers pay for loading the pose model
+    from posture_analyzer import PostureAnalyzer
+    from landmark_recording import recording_path
+    from fast_response import JSON_MEDIA_TYPE, encode_model
+    from frame_ingest import to_bgr, to_rgb
+    from session_aggregator import frame_summary
+    from frame_buffers import FrameBufferPool
+    from multi_pose import MultiPersonAnalyzer
+
+    # Spawned workers do not import server, so set up logging the same way here
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    recording_dir = os.environ.get('LANDMARK_RECORDING_DIR')
+    shm = shared_memory.SharedMemory(name=shm_name)
+    analyzers: "OrderedDict[str, PostureAnalyzer]" = OrderedDict()
+    multi_analyzers: "OrderedDict[str, MultiPersonAnalyzer]" = OrderedDict()
+    fps_counter = deque(maxlen=30)
+    frame_count = 0
+    # Conversion and overlay scratch images are recycled across requests
+    buffers = FrameBufferPool(max_idle_bytes=max(4 * slot_bytes, 16 * 1024 * 1024))
+
+    def close_analyzer(session_id: str, analyzer: PostureAnalyzer):
+        if analyzer.roi is not None:
+            logger.info(f"Inference worker {worker_id} session {session_id} ROI stats: {analyzer.roi.get_stats()}")
+        analyzer.stop_recording()
+        analyzer.pose.close()
+
+    def get_analyzer(session_id: str) -> PostureAnalyzer:
+        analyzer = analyzers.get(session_id)
+        if analyzer is None:
+            if len(analyzers) >= max_sessions:
+                evicted_id, evicted = analyzers.popitem(last=False)
+                close_analyzer(evicted_id, evicted)
+            analyzer = PostureAnalyzer()
+            if recording_dir:
+                analyzer.start_recording(recording_path(recording_dir, session_id),
+                                         metadata={"session_id": session_id})
+            analyzers[session_id] = analyzer
+        analyzers.move_to_end(session_id)
+        return analyzer
+
+    def get_multi_analyzer(session_id: str) -> MultiPersonAnalyzer:
+        analyzer = multi_analyzers.get(session_id)
+        if analyzer is None:
+            if len(multi_analyzers) >= max_sessions:
+                _, evicted = multi_analyzers.popitem(last=False)
+                evicted.close()
+            analyzer = multi_analyzers[session_id] = MultiPersonAnalyzer()
+        multi_analyzers.move_to_end(session_id)
+        return analyzer
+
+    while True:
+        try:
+            message = requests_conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+
+        request_id, session_id, mode, slot, shape, options = message
+        if mode == MODE_END:
+            analyzer = analyzers.pop(session_id, None)
+            if analyzer is not None:
+                close_analyzer(session_id, analyzer)
+            multi_analyzer = multi_analyzers.pop(session_id, None)
+            if multi_analyzer is not None:
+                multi_analyzer.close()
+            continue
+
+        frame_start_time = time.time()
+        offset = slot * slot_bytes
+        lease = buffers.lease()
+        try:
+            image = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+            # Frames arrive in their upload layout; conversion happens here, off the API process
+            color = options.get("color", "bgr")
+            height = shape[0] * 2 // 3 if color in ('nv12', 'i420') else shape[0]
+            image_rgb = to_rgb(image, color, None if color == 'rgb' else lease.array((height, shape[1], 3)))
+            media_type = options.get("media_type", JSON_MEDIA_TYPE)
+
+            if mode == MODE_MULTI:
+                multi_analyzer = get_multi_analyzer(session_id)
+                people = multi_analyzer.analyze(image_rgb, options.get("scale", 1.0))
+                payload = {"body": encode_model(multi_analyzer.build_response(people), media_type)}
+                results_conn.send((request_id, True, payload))
+                continue
+
+            analyzer = get_analyzer(session_id)
+            landmarks = analyzer.detect_landmarks(image_rgb, options.get("scale", 1.0))
+            analysis = analyzer.analyze_posture_comprehensive(landmarks) if landmarks else None
+
+            if mode == MODE_ANALYZE:
+                payload = {"pose": landmarks is not None,
+                           "body": encode_model(analysis, media_type) if analysis is not None else None}
+            else:
+                if analysis is not None:
+                    analyzer.update_session_stats(analysis)
+                # Live frames also feed the API process's session aggregate
+                frame = frame_summary(analysis) if analysis is not None else None
+
+                if mode == MODE_JSON:
+                    # Serialize here so the API process only forwards bytes
+                    payload = {"pose": landmarks is not None, "frame": frame,
+                               "body": encode_model(analyzer.build_analysis_response(
+                                   analysis, options.get("history_cursor")), media_type)
+                               if analysis is not None else None}
+                else:
+                    image = to_bgr(image, color, None if color == 'bgr' else lease.array((height, shape[1], 3)))
+                    if landmarks is None:
+                        cv2.putText(image, "No pose detected", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
+                    else:
+                        analyzer.draw_enhanced_skeleton(image, landmarks, scale=1 / options.get("scale", 1.0))
+                        frame_end_time = time.time()
+                        if frame_end_time > frame_start_time:
+                            fps_counter.append(1.0 / (frame_end_time - frame_start_time))
+                        frame_count += 1
+                        if analysis is not None:
+                            avg_fps = sum(fps_counter) / len(fps_counter) if fps_counter else 0
+                            analyzer.draw_enhanced_ui(image, analysis, {"fps": avg_fps, "frame_count": frame_count},
+                                                      overlay=lease.array(image.shape))
+
+                    # Write the JPEG back into the same slot so it never crosses the pipe
+                    _, img_encoded = cv2.imencode('.jpg', image)
+                    del image
+                    encoded_size = img_encoded.nbytes
+                    if encoded_size <= slot_bytes:
+                        # Flattened: OpenCV 4.x returns an (N, 1) array, which does not copy into a flat buffer
+                        shm.buf[offset:offset + encoded_size] = img_encoded.reshape(-1).data
+                        payload = {"jpeg_size": encoded_size, "frame": frame}
+                    else:
+                        payload = {"jpeg": img_encoded.tobytes(), "frame": frame}
+            results_conn.send((request_id, True, payload))
+        except Exception as e:
+            logger.error(f"Inference worker {worker_id} failed on request {request_id}: {e}")
+            results_conn.send((request_id, False, str(e)))
+        finally:
+            image = image_rgb = None
+            lease.close()
+
+    for session_id, analyzer in analyzers.items():
+        close_analyzer(session_id, analyzer)
+    for multi_analyzer in multi_analyzers.values():
+        multi_analyzer.close()
+    shm.close()
+
+
+class _Worker:
+    """Parent-side handle for one inference process and its shared-memory ring."""
+
+    def __init__(self, index: int, slots: int, slot_bytes: int):
+        self.index = index
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self.process = None
+        self.requests_conn = None
+        self.results_conn = None
+        self.reader = None
+        self.free_slots: Optional[asyncio.Queue] = None
+        self.pending: Dict[int, Tuple[asyncio.Future, int]] = {}
+        self.restarts = 0
+
+    def slot_view(self, slot: int, size: int) -> memoryview:
+        offset = slot * self.slot_bytes
+        return self.shm.buf[offset:offset + size]
+
+
+class InferencePool:
+    """Pool of inference processes with sticky session routing and shared-memory frame transfer.
+
+    Frames are copied once into a per-worker ring of shared-memory slots; only a small
+    tuple describing the slot travels over the pipe. Each session always lands on the same
+    worker so its tracker and history survive between frames. Workers that die are
+    restarted automatically and their in-flight requests fail with WorkerCrashedError.
+    """
+
+    def __init__(self, num_workers: int, slots_per_worker: int = 4,
+                 max_frame_bytes: int = 1920 * 1080 * 3, max_sessions_per_worker: int = 16):
+        self.num_workers = num_workers
+        self.slots_per_worker = slots_per_worker
+        self.max_frame_bytes = max_frame_bytes
+        self.max_sessions_per_worker = max_sessions_per_worker
+        self._ctx = mp.get_context("spawn")
+        self._workers: List[_Worker] = []
+        self._request_ids = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing = False
+
+    async def start(self):
+        """Create the shared-memory rings and spawn all workers."""
+        self._loop = asyncio.get_running_loop()
+        for index in range(self.num_workers):
+            worker = _Worker(index, self.slots_per_worker, self.max_frame_bytes)
+            worker.free_slots = asyncio.Queue()
+            for slot in range(worker.slots):
+                worker.free_slots.put_nowait(slot)
+            self._workers.append(worker)
+            self._spawn(worker)
+        logger.info(f"Inference pool started with {self.num_workers} workers")
+
+    def _spawn(self, worker: _Worker):
+        requests_recv, requests_send = self._ctx.Pipe(duplex=False)
+        results_recv, results_send = self._ctx.Pipe(duplex=False)
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker.index, worker.shm.name, worker.slot_bytes, self.max_sessions_per_worker,
+                  requests_recv, results_send),
+            name=f"physiolens-inference-{worker.index}",
+            daemon=True
+        )
+        worker.process.start()
+        # Drop the parent's copies of the child ends so a dead worker shows up as EOF
+        requests_recv.close()
+        results_send.close()
+        worker.requests_conn = requests_send
+        worker.results_conn = results_recv
+        worker.reader = threading.Thread(target=self._read_results, args=(worker, worker.process, results_recv),
+                                         name=f"physiolens-inference-reader-{worker.index}", daemon=True)
+        worker.reader.start()
+
+    def _read_results(self, worker: _Worker, process, conn):
+        """Forward worker results to the event loop until the pipe closes."""
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            try:
+                self._loop.call_soon_threadsafe(self._resolve, worker, message)
+            except RuntimeError:
+                return  # Event loop already closed
+        if not self._closing:
+            # Reap the dead worker here, off the event loop, so it does not linger as a zombie
+            process.join(5)
+            if process.is_alive():
+                process.kill()
+                process.join()
+            try:
+                self._loop.call_soon_threadsafe(self._handle_crash, worker, conn)
+            except RuntimeError:
+                pass
+
+    def _resolve(self, worker: _Worker, message):
+        request_id, ok, payload = message
+        entry = worker.pending.pop(request_id, None)
+        if entry is None:
+            return
+        future, slot = entry
+        if future.cancelled():
+            # The caller gave up; the slot is only safe to reuse now the worker is done with it
+            worker.free_slots.put_nowait(slot)
+            return
+        if ok:
+            future.set_result(payload)
+        else:
+            future.set_exception(RuntimeError(payload))
+
+    def _handle_crash(self, worker: _Worker, conn):
+        if self._closing or conn is not worker.results_conn:
+            return
+        exitcode = worker.process.exitcode if worker.process else None
+        logger.error(f"Inference worker {worker.index} died (exit code {exitcode}), restarting")
+        for future, slot in list(worker.pending.values()):
+            if future.cancelled():
+                worker.free_slots.put_nowait(slot)
+            else:
+                future.set_exception(WorkerCrashedError(f"Inference worker {worker.index} crashed"))
+        worker.pending.clear()
+        try:
+            worker.requests_conn.close()
+            worker.results_conn.close()
+        except OSError:
+            pass
+        worker.restarts += 1
+        self._spawn(worker)
+
+    def route(self, session_id: str) -> int:
+        """Map a session to its worker index."""
+        return zlib.crc32(session_id.encode("utf-8")) % self.num_workers
+
+    async def submit(self, session_id: str, image: np.ndarray, mode: str,
+                     options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Run one frame through the session's worker and return the worker payload.
+
+        Frames are BGR unless `options["color"]` names another frame_ingest layout. Raises
+        FrameTooLargeError for frames that do not fit in a slot.
+        """
+        if image.nbytes > self.max_frame_bytes:
+            raise FrameTooLargeError(f"Frame of {image.nbytes} bytes exceeds the {self.max_frame_bytes} byte slot size")
+
+        worker = self._workers[self.route(session_id)]
+        slot = await worker.free_slots.get()
+        request_id = next(self._request_ids)
+        future = self._loop.create_future()
+        try:
+            frame = np.ndarray(image.shape, dtype=np.uint8, buffer=worker.shm.buf,
+                               offset=slot * worker.slot_bytes)
+            np.copyto(frame, image)
+            del frame
+            worker.pending[request_id] = (future, slot)
+            worker.requests_conn.send((request_id, session_id, mode, slot, image.shape, options or {}))
+        except BaseException:
+            worker.pending.pop(request_id, None)
+            worker.free_slots.put_nowait(slot)
+            raise
+
+        # On cancellation the worker still owns the slot and _resolve hands it back later
+        try:
+            payload = await future
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            worker.free_slots.put_nowait(slot)
+            raise
+
+        try:
+            if "jpeg_size" in payload:
+                payload = {"jpeg": bytes(worker.slot_view(slot, payload["jpeg_size"])), "frame": payload["frame"]}
+            return payload
+        finally:
+            worker.free_slots.put_nowait(slot)
+
+    def end_session(self, session_id: str):
+        """Have the session's worker close its analyzer, flushing its landmark recording."""
+        worker = self._workers[self.route(session_id)]
+        try:
+            worker.requests_conn.send((None, session_id, MODE_END, None, None, {}))
+        except (OSError, ValueError):
+            pass  # A crashed worker has already dropped the session
+
+    def stats(self) -> Dict[str, Any]:
+        """Report worker liveness, restarts and queue usage."""
+        return {
+            "workers": [
+                {
+                    "index": worker.index,
+                    "pid": worker.process.pid if worker.process else None,
+                    "alive": bool(worker.process and worker.process.is_alive()),
+                    "restarts": worker.restarts,
+                    "in_flight": len(worker.pending),
+                    "free_slots": worker.free_slots.qsize() if worker.free_slots else 0
+                }
+                for worker in self._workers
+            ]
+        }
+
+    async def stop(self):
+        """Stop all workers and release their shared memory."""
+        self._closing = True
+        for worker in self._workers:
+            try:
+                worker.requests_conn.send(None)
+            except (OSError, ValueError):
+                pass
+        for worker in self._workers:
+            await asyncio.to_thread(worker.process.join, 5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            for conn in (worker.requests_conn, worker.results_conn):
+                try:
+                    conn.close()
+                except OSError:
+                    pass
+            worker.shm.close()
+            worker.shm.unlink()
+        self._workers.clear()
+        logger.info("Inference pool stopped")
@@ -0,0 +1,277 @@
+"""Compact landmark recordings and offline re-analysis.
+
+File layout (little endian):
+
+    header   magic b"PLMK", version u16, dtype code u8, landmark count u8,
+             created f64, metadata length u32, JSON metadata, zero padding to 8 bytes
+    chunk*   magic b"CHNK", frame count u32,
+             timestamps f64[count], points dtype[count, landmarks, 2], zero padding to 8 bytes
+
+Each chunk stores its columns contiguously, so a reader can memory-map the file and
+score one chunk at a time without loading the recording. Recorders append whole
+chunks when their buffer fills, every `flush_interval` seconds and when the session
+ends, so a crash loses at most a few seconds; a partially written trailing chunk is
+ignored on read.
+
+Re-score a recording against a rule profile:
+
+    python landmark_recording.py reanalyze session.plmk --profile clinic.json
+"""
+import argparse
+import json
+import re
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from posture_rules import (
+    LANDMARK_NAMES, BatchEvaluation, CompiledProfile, DEFAULT_PROFILE, landmarks_to_array, load_profile
+)
+
+MAGIC = b"PLMK"
+CHUNK_MAGIC = b"CHNK"
+VERSION = 1
+_HEADER = struct.Struct("<4sHBBdI")
+_CHUNK_HEADER = struct.Struct("<4sI")
+_DTYPE_CODES = {1: np.dtype("<f2"), 2: np.dtype("<f4")}
+_DTYPE_IDS = {dtype: code for code, dtype in _DTYPE_CODES.items()}
+
+
+def _padding(size: int) -> int:
+    return -size % 8
+
+
+def recording_path(directory: Union[str, Path], session_id: str) -> Path:
+    """File name for a new recording of a session."""
+    safe_session = re.sub(r"[^A-Za-z0-9_.-]", "_", session_id)
+    return Path(directory) / f"{safe_session}-{time.strftime('%Y%m%d-%H%M%S')}.plmk"
+
+
+class LandmarkRecorder:
+    """Append per-frame landmarks to a recording, one columnar chunk at a time."""
+
+    def __init__(self, path: Union[str, Path], dtype: Any = np.float32, chunk_frames: int = 256,
+                 flush_interval: Optional[float] = 5.0, metadata: Optional[Dict[str, Any]] = None):
+        self.path = Path(path)
+        self.chunk_frames = chunk_frames
+        self.flush_interval = flush_interval
+        self.frames_written = 0
+
+        if self.path.exists() and self.path.stat().st_size > 0:
+            # Append to an existing recording with its own dtype
+            recording = LandmarkRecording(self.path)
+            self.dtype = recording.dtype
+            self.frames_written = len(recording)
+            end = recording.valid_size
+            recording.close()
+            self._file = open(self.path, "r+b")
+            self._file.truncate(end)
+            self._file.seek(end)
+        else:
+            self.dtype = np.dtype(dtype).newbyteorder("<")
+            if self.dtype not in _DTYPE_IDS:
+                raise ValueError(f"Unsupported landmark dtype {self.dtype}; use float16 or float32")
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "wb")
+            meta = json.dumps({"landmarks": LANDMARK_NAMES, **(metadata or {})}).encode("utf-8")
+            self._file.write(_HEADER.pack(MAGIC, VERSION, _DTYPE_IDS[self.dtype], len(LANDMARK_NAMES),
+                                          time.time(), len(meta)))
+            self._file.write(meta + b"\0" * _padding(_HEADER.size + len(meta)))
+            # Readable from the start, even if the process dies before the first chunk
+            self._file.flush()
+
+        self._timestamps = np.empty(chunk_frames, dtype="<f8")
+        self._points = np.empty((chunk_frames, len(LANDMARK_NAMES), 2), dtype=self.dtype)
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+
+    def append(self, landmarks: Union[Dict[str, Tuple[float, float]], np.ndarray],
+               timestamp: Optional[float] = None):
+        """Buffer one frame; a full buffer, or one older than `flush_interval`, is written out as a chunk."""
+        if isinstance(landmarks, dict):
+            landmarks = landmarks_to_array(landmarks)
+        self._timestamps[self._buffered] = time.time() if timestamp is None else timestamp
+        self._points[self._buffered] = landmarks
+        self._buffered += 1
+        if self._buffered == self.chunk_frames or (
+                self.flush_interval is not None and time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write buffered frames as one chunk."""
+        self._last_flush = time.monotonic()
+        if not self._buffered:
+            return
+        count = self._buffered
+        self._file.write(_CHUNK_HEADER.pack(CHUNK_MAGIC, count))
+        self._file.write(self._timestamps[:count].tobytes())
+        points = self._points[:count].tobytes()
+        self._file.write(points)
+        self._file.write(b"\0" * _padding(len(points)))
+        self._file.flush()
+        self.frames_written += count
+        self._buffered = 0
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LandmarkRecording:
+    """Memory-mapped reader for a landmark recording."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._raw = np.memmap(self.path, dtype=np.uint8, mode="r")
+        if len(self._raw) < _HEADER.size:
+            raise ValueError(f"{self.path} is not a landmark recording")
+
+        magic, version, dtype_code, landmark_count, created, meta_length = _HEADER.unpack_from(self._raw, 0)
+        if magic != MAGIC or version != VERSION or dtype_code not in _DTYPE_CODES:
+            raise ValueError(f"{self.path} is not a supported landmark recording")
+        self.dtype = _DTYPE_CODES[dtype_code]
+        self.landmark_count = landmark_count
+        self.created = created
+        meta_end = _HEADER.size + meta_length
+        self.metadata = json.loads(bytes(self._raw[_HEADER.size:meta_end]).decode("utf-8"))
+
+        # Index chunks by reading their small headers only
+        self._chunks: List[Tuple[int, int]] = []
+        offset = meta_end + _padding(meta_end)
+        frame_bytes = landmark_count * 2 * self.dtype.itemsize
+        while offset + _CHUNK_HEADER.size <= len(self._raw):
+            chunk_magic, count = _CHUNK_HEADER.unpack_from(self._raw, offset)
+            points_size = count * frame_bytes
+            end = offset + _CHUNK_HEADER.size + count * 8 + points_size + _padding(points_size)
+            if chunk_magic != CHUNK_MAGIC or end > len(self._raw):
+                break
+            self._chunks.append((offset + _CHUNK_HEADER.size, count))
+            offset = end
+        self.valid_size = offset
+
+    def __len__(self) -> int:
+        return sum(count for _, count in self._chunks)
+
+    def iter_chunks(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield (timestamps, points) views for each chunk without copying."""
+        for offset, count in self._chunks:
+            timestamps = self._raw[offset:offset + count * 8].view("<f8")
+            points_offset = offset + count * 8
+            points_size = count * self.landmark_count * 2 * self.dtype.itemsize
+            points = self._raw[points_offset:points_offset + points_size].view(self.dtype)
+            yield timestamps, points.reshape(count, self.landmark_count, 2)
+
+    def close(self):
+        # The mapping is released once outstanding chunk views are gone
+        self._raw = None
+
+
+def reanalyze(path: Union[str, Path], profile: Optional[CompiledProfile] = None
+              ) -> Iterator[Tuple[np.ndarray, BatchEvaluation]]:
+    """Stream a recording through a rule profile, one chunk-sized batch at a time."""
+    profile = profile or DEFAULT_PROFILE.compile()
+    recording = LandmarkRecording(path)
+    try:
+        for timestamps, points in recording.iter_chunks():
+            yield timestamps, profile.evaluate_points(points)
+    finally:
+        recording.close()
+
+
+def summarize(path: Union[str, Path], profile: Optional[CompiledProfile] = None,
+              frames_out=None) -> Dict[str, Any]:
+    """Re-score a recording and return aggregate results, optionally writing per-frame NDJSON."""
+    profile = profile or DEFAULT_PROFILE.compile()
+    frames = 0
+    score_total = 0
+    best_score = None
+    worst_score = None
+    grade_counts = np.zeros(len(profile.grade_labels), dtype=np.int64)
+    issue_counts = np.zeros(len(profile.rules), dtype=np.int64)
+
+    for timestamps, evaluation in reanalyze(path, profile):
+        if not len(evaluation):
+            continue
+        frames += len(evaluation)
+        score_total += int(evaluation.scores.sum())
+        best_score = max(best_score or 0, int(evaluation.scores.max()))
+        chunk_worst = int(evaluation.scores.min())
+        worst_score = chunk_worst if worst_score is None else min(worst_score, chunk_worst)
+        grade_counts += np.bincount(evaluation.grade_index, minlength=len(grade_counts))
+        issue_counts += evaluation.issue_mask.sum(axis=0)
+
+        if frames_out is not None:
+            for i in range(len(evaluation)):
+                frames_out.write(json.dumps({
+                    "timestamp": float(timestamps[i]),
+                    "score": int(evaluation.scores[i]),
+                    "grade": evaluation.grade_labels[evaluation.grade_index[i]],
+                    "issues": [profile.rules[r].id for r in np.flatnonzero(evaluation.issue_mask[i])]
+                }) + "\n")
+
+    return {
+        "recording": str(path),
+        "profile": profile.profile.name,
+        "frames": frames,
+        "average_score": score_total / frames if frames else 0,
+        "best_score": best_score or 0,
+        "worst_score": worst_score or 0,
+        "grade_distribution": {label: int(count) for label, count in zip(profile.grade_labels, grade_counts) if count},
+        "issue_counts": {rule.id: int(count) for rule, count in zip(profile.rules, issue_counts)}
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="PhysioLens landmark recording tools")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    info = subcommands.add_parser("info", help="Show recording header and frame count")
+    info.add_argument("recording")
+
+    rescore = subcommands.add_parser("reanalyze", help="Re-score a recording against a rule profile")
+    rescore.add_argument("recording")
+    rescore.add_argument("--profile", help="Rule profile JSON (default: built-in profile)")
+    rescore.add_argument("--frames-out", help="Write per-frame results as NDJSON ('-' for stdout)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        recording = LandmarkRecording(args.recording)
+        print(json.dumps({
+            "recording": args.recording,
+            "dtype": str(recording.dtype),
+            "frames": len(recording),
+            "created": recording.created,
+            "metadata": recording.metadata
+        }, indent=2))
+        recording.close()
+        return 0
+
+    profile = load_profile(args.profile).compile() if args.profile else DEFAULT_PROFILE.compile()
+    started = time.perf_counter()
+    if args.frames_out == "-":
+        summary = summarize(args.recording, profile, sys.stdout)
+    elif args.frames_out:
+        with open(args.frames_out, "w") as frames_out:
+            summary = summarize(args.recording, profile, frames_out)
+    else:
+        summary = summarize(args.recording, profile)
+    summary["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    print(json.dumps(summary, indent=2), file=sys.stderr if args.frames_out == "-" else sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+"""Load generator for the PhysioLens API.
+
+Drives the frame endpoints, the dashboard endpoints and optionally the MJPEG live
+stream with a configurable number of clients, then prints a JSON report with
+throughput, latency percentiles and error/shed rates per endpoint.
+
+By default a server is started locally with the in-memory Mongo stand-in and the
+stub pose backend, so a run needs no database or model:
+
+    python loadtest.py --frame-clients 8 --fps 15 --image-size 1280x720 --duration 30
+
+Use --real-pose to load the actual pose model, --workers N for the inference pool,
+or --url to drive a server that is already running.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import httpx
+import numpy as np
+
+FRAME_ENDPOINTS = ("/api/analyze_frame_json", "/api/analyze_frame")
+DASHBOARD_ENDPOINTS = ("/api/user/stats", "/api/progress/chart", "/api/community/posts")
+
+
+class Recorder:
+    """Latency samples and outcomes per endpoint, ignoring requests started during warm-up."""
+
+    def __init__(self, measure_from: float):
+        self.measure_from = measure_from
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.client_skips: Counter = Counter()
+
+    def record(self, endpoint: str, started: float, status: str):
+        if started < self.measure_from:
+            return
+        self.statuses[endpoint][status] += 1
+        if status.startswith("2"):
+            self.latencies[endpoint].append((time.monotonic() - started) * 1000)
+
+
+def make_frame(image_path: Optional[str], width: int, height: int, frame_format: str) -> bytes:
+    """Upload body for one frame: a photo if given, otherwise a synthetic figure."""
+    if image_path:
+        image = cv2.resize(cv2.imread(image_path), (width, height))
+    else:
+        image = np.full((height, width, 3), 200, np.uint8)
+        image[:, :, 0] = np.linspace(120, 220, width, dtype=np.uint8)
+        center_x = width // 2
+        cv2.circle(image, (center_x, height // 8), max(4, height // 16), (80, 80, 80), -1)
+        cv2.line(image, (center_x, height // 5), (center_x, height // 2), (80, 80, 80), max(2, width // 60))
+        cv2.line(image, (center_x, height // 2), (center_x, height * 9 // 10), (80, 80, 80), max(2, width // 60))
+    if frame_format == "jpeg":
+        return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 85])[1].tobytes()
+    if frame_format == "rgb":
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB).tobytes()
+    if frame_format == "i420":
+        return cv2.cvtColor(image, cv2.COLOR_BGR2YUV_I420).tobytes()
+    raise ValueError(f"Unsupported frame format {frame_format}")
+
+
+async def frame_client(client: httpx.AsyncClient, recorder: Recorder, endpoint: str, client_index: int,
+                       frame: bytes, params: Dict[str, Any], fps: float, max_outstanding: int, deadline: float):
+    """One camera: posts a frame every 1/fps seconds, never more than `max_outstanding` at once."""
+    params = {**params, "session_id": f"load-{client_index}"}
+    outstanding = set()
+    interval = 1.0 / fps
+    next_send = time.monotonic() + random.uniform(0, interval)
+
+    async def send():
+        started = time.monotonic()
+        try:
+            response = await client.post(endpoint, params=params, files={"file": ("frame", frame)})
+            await response.aread()
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        recorder.record(endpoint, started, status)
+
+    while True:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+        if next_send > now:
+            await asyncio.sleep(next_send - now)
+        next_send += interval
+        if len(outstanding) >= max_outstanding:
+            # The camera would drop this frame
+            if time.monotonic() >= recorder.measure_from:
+                recorder.client_skips[endpoint] += 1
+            continue
+        task = asyncio.create_task(send())
+        outstanding.add(task)
+        task.add_done_callback(outstanding.discard)
+
+    if outstanding:
+        await asyncio.gather(*outstanding)
+
+
+async def dashboard_client(client: httpx.AsyncClient, recorder: Recorder, rps: float, deadline: float):
+    """Closed-loop dashboard user: one request at a time at roughly `rps`."""
+    interval = 1.0 / rps
+    while time.monotonic() < deadline:
+        endpoint = random.choice(DASHBOARD_ENDPOINTS)
+        started = time.monotonic()
+        try:
+            response = await client.get(endpoint)
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        recorder.record(endpoint, started, status)
+        await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+async def stream_viewer(client: httpx.AsyncClient, results: List[Dict[str, Any]], measure_from: float,
+                        deadline: float):
+    """Watch the MJPEG stream and record frame arrival gaps."""
+    boundary = b"--frame\r\n"
+    arrivals: List[float] = []
+    status = "ok"
+    try:
+        async with client.stream("GET", "/api/stream/live", timeout=None) as response:
+            if response.status_code != 200:
+                status = str(response.status_code)
+            else:
+                tail = b""
+                async for chunk in response.aiter_bytes():
+                    now = time.monotonic()
+                    data = tail + chunk
+                    if now >= measure_from:
+                        arrivals.extend([now] * data.count(boundary))
+                    tail = data[-(len(boundary) - 1):]
+                    if now >= deadline:
+                        break
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    gaps = np.diff(arrivals) * 1000 if len(arrivals) > 1 else np.array([])
+    results.append({"status": status, "frames": len(arrivals), "gaps_ms": gaps})
+
+
+def summarize(recorder: Recorder, measured_seconds: float) -> Dict[str, Any]:
+    endpoints = {}
+    for endpoint in sorted(set(recorder.statuses) | set(recorder.client_skips)):
+        statuses = recorder.statuses[endpoint]
+        total = sum(statuses.values())
+        ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+        shed = statuses.get("503", 0)
+        latencies = np.array(recorder.latencies[endpoint])
+        endpoints[endpoint] = {
+            "requests": total,
+            "ok": ok,
+            "throughput_rps": round(ok / measured_seconds, 2),
+            "latency_ms": {
+                "p50": round(float(np.percentile(latencies, 50)), 2),
+                "p95": round(float(np.percentile(latencies, 95)), 2),
+                "p99": round(float(np.percentile(latencies, 99)), 2),
+                "max": round(float(latencies.max()), 2)
+            } if len(latencies) else None,
+            "shed_rate": round(shed / total, 4) if total else 0.0,
+            "error_rate": round((total - ok - shed) / total, 4) if total else 0.0,
+            "statuses": dict(statuses),
+            "client_dropped_frames": recorder.client_skips.get(endpoint, 0)
+        }
+    total = sum(summary["requests"] for summary in endpoints.values())
+    ok = sum(summary["ok"] for summary in endpoints.values())
+    return {"total_requests": total, "total_throughput_rps": round(ok / measured_seconds, 2), "endpoints": endpoints}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args) -> Tuple[subprocess.Popen, str]:
+    """Run server.py under uvicorn with the offline backends."""
+    port = free_port()
+    env = {
+        **os.environ,
+        "MONGO_URL": "memory://",
+        "INFERENCE_WORKERS": str(args.workers)
+    }
+    if not args.real_pose:
+        env["POSE_BACKEND"] = "stub"
+        env["STUB_POSE_LATENCY_MS"] = str(args.stub_latency_ms)
+    if args.video_source:
+        env["VIDEO_SOURCE"] = args.video_source
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=Path(__file__).parent, env=env
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_ready(url: str, timeout: float = 120.0):
+    async with httpx.AsyncClient(base_url=url) as client:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/api/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"Server at {url} did not become ready within {timeout}s")
+
+
+async def run(args, url: str) -> Dict[str, Any]:
+    width, height = (int(side) for side in args.image_size.lower().split("x"))
+    frame = make_frame(args.image, width, height, args.frame_format)
+    params: Dict[str, Any] = {"frame_format": args.frame_format}
+    if args.frame_format != "jpeg":
+        params.update(width=width, height=height)
+
+    await wait_ready(url)
+    started = time.monotonic()
+    measure_from = started + args.warmup
+    deadline = measure_from + args.duration
+    recorder = Recorder(measure_from)
+    stream_results: List[Dict[str, Any]] = []
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=args.timeout) as client:
+        tasks = []
+        endpoints = [FRAME_ENDPOINTS[0]] if args.frame_endpoint == "json" else \
+            [FRAME_ENDPOINTS[1]] if args.frame_endpoint == "annotate" else list(FRAME_ENDPOINTS)
+        for index in range(args.frame_clients):
+            tasks.append(frame_client(client, recorder, endpoints[index % len(endpoints)], index, frame,
+                                      params, args.fps, args.max_outstanding, deadline))
+        for _ in range(args.dashboard_clients):
+            tasks.append(dashboard_client(client, recorder, args.dashboard_rps, deadline))
+        for _ in range(args.stream_viewers):
+            tasks.append(stream_viewer(client, stream_results, measure_from, deadline))
+        await asyncio.gather(*tasks)
+
+        server_stats = {}
+        for name, path in (("admission", "/api/inference/admission"), ("workers", "/api/inference/workers"),
+                           ("stream", "/api/stream/status"), ("database", "/api/health/database")):
+            try:
+                server_stats[name] = (await client.get(path)).json()
+            except (httpx.HTTPError, ValueError):
+                pass
+
+    report = {
+        "config": {
+            "url": url, "duration_s": args.duration, "warmup_s": args.warmup,
+            "frame_clients": args.frame_clients, "fps": args.fps, "image_size": args.image_size,
+            "frame_format": args.frame_format, "frame_bytes": len(frame),
+            "dashboard_clients": args.dashboard_clients, "dashboard_rps": args.dashboard_rps,
+            "stream_viewers": args.stream_viewers,
+            "pose_backend": "external" if args.url else ("mediapipe" if args.real_pose else "stub"),
+            "stub_latency_ms": None if args.url or args.real_pose else args.stub_latency_ms,
+            "inference_workers": None if args.url else args.workers
+        },
+        **summarize(recorder, args.duration),
+        "server": server_stats
+    }
+    if stream_results:
+        gaps = np.concatenate([result["gaps_ms"] for result in stream_results])
+        report["stream"] = {
+            "viewers": len(stream_results),
+            "statuses": dict(Counter(result["status"] for result in stream_results)),
+            "frames_per_viewer_per_s": round(sum(result["frames"] for result in stream_results)
+                                             / len(stream_results) / args.duration, 2),
+            "frame_gap_ms": {
+                "p50": round(float(np.percentile(gaps, 50)), 2),
+                "p95": round(float(np.percentile(gaps, 95)), 2),
+                "p99": round(float(np.percentile(gaps, 99)), 2)
+            } if len(gaps) else None
+        }
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="PhysioLens API load generator")
+    parser.add_argument("--url", help="Drive an already running server instead of starting one")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Seconds of load before measuring")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--frame-clients", type=int, default=4, help="Simulated cameras")
+    parser.add_argument("--fps", type=float, default=10.0, help="Frames per second per camera")
+    parser.add_argument("--max-outstanding", type=int, default=2,
+                        help="Unanswered frames per camera before it drops frames")
+    parser.add_argument("--frame-endpoint", choices=("json", "annotate", "both"), default="both",
+                        help="Frame endpoint(s); 'both' alternates cameras between them")
+    parser.add_argument("--image-size", default="640x480", help="Frame size WIDTHxHEIGHT")
+    parser.add_argument("--image", help="Photo to send instead of a synthetic frame")
+    parser.add_argument("--frame-format", choices=("jpeg", "rgb", "i420"), default="jpeg")
+    parser.add_argument("--dashboard-clients", type=int, default=2)
+    parser.add_argument("--dashboard-rps", type=float, default=2.0, help="Requests per second per dashboard client")
+    parser.add_argument("--stream-viewers", type=int, default=0, help="MJPEG viewers (server needs a video source)")
+    parser.add_argument("--video-source", help="VIDEO_SOURCE for a locally started server")
+    parser.add_argument("--workers", type=int, default=0, help="INFERENCE_WORKERS for a locally started server")
+    parser.add_argument("--real-pose", action="store_true", help="Use the pose model instead of the stub")
+    parser.add_argument("--stub-latency-ms", type=float, default=20.0, help="Simulated model time per frame")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_server(args)
+    try:
+        report = asyncio.run(run(args, url))
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
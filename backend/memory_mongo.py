@@ -0,0 +1,197 @@
+"""In-memory stand-in for the subset of Motor used by Database.
+
+Selected with MONGO_URL=memory:// so the API runs offline (load tests, demos).
+Data lives in the process and is lost on restart; queries are linear scans.
+"""
+import copy
+import itertools
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+
+def _compare(value: Any, operator: str, operand: Any) -> bool:
+    if operator == "$ne":
+        return value != operand
+    if operator == "$in":
+        return value in operand
+    if operator == "$nin":
+        return value not in operand
+    if value is None:
+        return False
+    if operator == "$gt":
+        return value > operand
+    if operator == "$gte":
+        return value >= operand
+    if operator == "$lt":
+        return value < operand
+    if operator == "$lte":
+        return value <= operand
+    raise NotImplementedError(f"Unsupported query operator {operator}")
+
+
+def matches(document: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a MongoDB filter using equality, comparison operators, $or and $and."""
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(document, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(op.startswith("$") for op in condition):
+            value = document.get(key)
+            if not all(_compare(value, op, operand) for op, operand in condition.items()):
+                return False
+        elif document.get(key) != condition:
+            return False
+    return True
+
+
+def _project(document: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return document
+    included = [field for field, flag in projection.items() if flag and field != "_id"]
+    if included:
+        projected = {field: document[field] for field in included if field in document}
+        if projection.get("_id", 1) and "_id" in document:
+            projected["_id"] = document["_id"]
+        return projected
+    return {field: value for field, value in document.items() if projection.get(field, 1)}
+
+
+def _sort_spec(key_or_list, direction=None):
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    return list(key_or_list)
+
+
+def _sorted(documents: List[Dict[str, Any]], spec) -> List[Dict[str, Any]]:
+    for field, direction in reversed(spec):
+        # None sorts first ascending, as in MongoDB
+        documents.sort(key=lambda doc: (doc.get(field) is not None, doc.get(field)), reverse=direction < 0)
+    return documents
+
+
+class InMemoryCursor:
+    def __init__(self, documents: List[Dict[str, Any]], projection: Optional[Dict[str, Any]] = None):
+        self._documents = documents
+        self._projection = projection
+        self._limit = 0
+        self._iterator = None
+
+    def sort(self, key_or_list, direction=None) -> "InMemoryCursor":
+        _sorted(self._documents, _sort_spec(key_or_list, direction))
+        return self
+
+    def limit(self, limit: int) -> "InMemoryCursor":
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int) -> "InMemoryCursor":
+        return self
+
+    def _results(self):
+        documents = self._documents[:self._limit] if self._limit else self._documents
+        return (copy.deepcopy(_project(document, self._projection)) for document in documents)
+
+    async def to_list(self, length: Optional[int]) -> List[Dict[str, Any]]:
+        results = self._results()
+        return list(itertools.islice(results, length) if length else results)
+
+    def __aiter__(self):
+        self._iterator = self._results()
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def close(self):
+        self._iterator = None
+
+
+class InMemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self._documents: List[Dict[str, Any]] = []
+        self._ids = itertools.count(1)
+
+    async def insert_one(self, document: Dict[str, Any]):
+        stored = copy.deepcopy(document)
+        stored.setdefault("_id", next(self._ids))
+        # MongoDB keeps datetimes at millisecond precision
+        for field, value in stored.items():
+            if isinstance(value, datetime):
+                stored[field] = value.replace(microsecond=value.microsecond // 1000 * 1000)
+        self._documents.append(stored)
+        return SimpleNamespace(inserted_id=stored["_id"], acknowledged=True)
+
+    def find(self, query: Optional[Dict[str, Any]] = None,
+             projection: Optional[Dict[str, Any]] = None) -> InMemoryCursor:
+        return InMemoryCursor([document for document in self._documents if matches(document, query)], projection)
+
+    async def find_one(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None,
+                       sort=None) -> Optional[Dict[str, Any]]:
+        cursor = self.find(query, projection)
+        if sort:
+            cursor.sort(sort)
+        results = await cursor.limit(1).to_list(1)
+        return results[0] if results else None
+
+    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any]):
+        for document in self._documents:
+            if not matches(document, query):
+                continue
+            before = copy.deepcopy(document)
+            for field, value in update.get("$set", {}).items():
+                document[field] = value
+            for field, amount in update.get("$inc", {}).items():
+                document[field] = document.get(field, 0) + amount
+            return SimpleNamespace(matched_count=1, modified_count=int(document != before), acknowledged=True)
+        return SimpleNamespace(matched_count=0, modified_count=0, acknowledged=True)
+
+    async def count_documents(self, query: Dict[str, Any]) -> int:
+        return sum(1 for document in self._documents if matches(document, query))
+
+    async def create_index(self, keys, **kwargs) -> str:
+        return "_".join(f"{field}_{direction}" for field, direction in _sort_spec(keys))
+
+
+class InMemoryDatabase:
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, InMemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = InMemoryCollection(name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> InMemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def command(self, name: str, *args, **kwargs) -> Dict[str, Any]:
+        if name == "ping":
+            return {"ok": 1.0}
+        raise NotImplementedError(f"Unsupported command {name}")
+
+
+class InMemoryMotorClient:
+    """Replaces AsyncIOMotorClient for MONGO_URL=memory://."""
+
+    def __init__(self):
+        self._databases: Dict[str, InMemoryDatabase] = {}
+        self.admin = InMemoryDatabase("admin")
+
+    def __getitem__(self, name: str) -> InMemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = InMemoryDatabase(name)
+        return self._databases[name]
+
+    def close(self):
+        pass
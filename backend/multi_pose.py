@@ -0,0 +1,240 @@
+"""Multi-person posture analysis from one camera.
+
+One detector pass returns every pose in the frame, a lightweight tracker gives each
+person a stable id across frames, and all poses are scored in one batched rule
+evaluation. Each tracked person keeps their own score and angle histories.
+"""
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from posture_analyzer import POSE_LANDMARK_IDS
+from posture_rules import LANDMARK_NAMES, CompiledProfile, get_active_profile
+from schemas import MultiPersonAnalysisResponse, PersonAnalysis, PostureAnalysisResult
+
+# Angle histories kept per person, as for the single-person analyzer
+HISTORY_ANGLES = ('neck', 'shoulder', 'hip', 'knee')
+
+
+def multi_pose_available() -> bool:
+    """Whether a multi-pose detector can be built: a model file is configured or the stub is in use."""
+    return os.environ.get('POSE_BACKEND') == 'stub' or bool(os.environ.get('MULTI_POSE_MODEL'))
+
+
+class MultiPoseLandmarker:
+    """MediaPipe Tasks PoseLandmarker returning up to `max_people` poses per frame.
+
+    Runs in video mode so the model tracks poses between frames; one instance must
+    therefore see the frames of one stream only, in order.
+    """
+
+    def __init__(self, model_path: str, max_people: int = 4, min_detection_confidence: float = 0.5,
+                 min_tracking_confidence: float = 0.5):
+        import mediapipe as mp
+        from mediapipe.tasks.python import BaseOptions, vision
+
+        self._mp = mp
+        self._landmarker = vision.PoseLandmarker.create_from_options(vision.PoseLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=model_path),
+            running_mode=vision.RunningMode.VIDEO,
+            num_poses=max_people,
+            min_pose_detection_confidence=min_detection_confidence,
+            min_pose_presence_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence
+        ))
+        self._timestamp_ms = 0
+
+    def detect(self, image_rgb: np.ndarray) -> List[Sequence]:
+        """Normalized landmark lists (x, y, visibility) of every detected pose."""
+        # Video mode requires strictly increasing timestamps
+        self._timestamp_ms = max(self._timestamp_ms + 1, int(time.monotonic() * 1000))
+        image = self._mp.Image(image_format=self._mp.ImageFormat.SRGB, data=np.ascontiguousarray(image_rgb))
+        return self._landmarker.detect_for_video(image, self._timestamp_ms).pose_landmarks
+
+    def close(self):
+        self._landmarker.close()
+
+
+def create_multi_pose_detector(max_people: int):
+    """Detector for the configured backend (POSE_BACKEND=stub or MULTI_POSE_MODEL)."""
+    if os.environ.get('POSE_BACKEND') == 'stub':
+        from stub_pose import StubMultiPose
+        return StubMultiPose(people=min(int(os.environ.get('STUB_POSE_PEOPLE', '2')), max_people),
+                             latency_ms=float(os.environ.get('STUB_POSE_LATENCY_MS', '0')))
+    model_path = os.environ.get('MULTI_POSE_MODEL')
+    if not model_path:
+        raise ValueError("MULTI_POSE_MODEL is not set")
+    return MultiPoseLandmarker(model_path, max_people)
+
+
+def landmark_boxes(points: np.ndarray, visible: np.ndarray) -> np.ndarray:
+    """(N, 4) x0, y0, x1, y1 boxes around the visible landmarks of a (N, 13, 2) batch."""
+    # People with no confidently visible landmark are boxed by all of them
+    mask = np.where(visible.any(axis=1, keepdims=True), visible, True)[..., np.newaxis]
+    low = np.where(mask, points, np.inf).min(axis=1)
+    high = np.where(mask, points, -np.inf).max(axis=1)
+    return np.concatenate([low, high], axis=1)
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (N, 4) and (M, 4) boxes."""
+    top_left = np.maximum(a[:, np.newaxis, :2], b[np.newaxis, :, :2])
+    bottom_right = np.minimum(a[:, np.newaxis, 2:], b[np.newaxis, :, 2:])
+    intersection = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(axis=1)
+    union = area_a[:, np.newaxis] + area_b[np.newaxis, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+class PersonTrack:
+    """One tracked person: their box and motion, plus their own histories and scores."""
+
+    def __init__(self, person_id: int, box: np.ndarray):
+        self.person_id = person_id
+        self.box = box
+        self.velocity = np.zeros(4)
+        self.missed = 0
+        self.first_seen = time.time()
+        self.frame_count = 0
+        self.score_total = 0
+        self.posture_history: deque = deque(maxlen=100)
+        self.angle_history: Dict[str, deque] = {name: deque(maxlen=50) for name in HISTORY_ANGLES}
+
+    def predicted_box(self) -> np.ndarray:
+        return self.box + self.velocity * (self.missed + 1)
+
+    def update_box(self, box: np.ndarray, smoothing: float = 0.5):
+        # Per-frame motion, averaged over the frames since the last match
+        motion = (box - self.box) / (self.missed + 1)
+        self.velocity = smoothing * self.velocity + (1 - smoothing) * motion
+        self.box = box
+        self.missed = 0
+
+    def record(self, result: PostureAnalysisResult):
+        self.frame_count += 1
+        self.score_total += result.score
+        self.posture_history.append(result.score)
+        for angle_name, angle_value in result.angles.items():
+            history = self.angle_history.get(angle_name.replace('_angle', ''))
+            if history is not None:
+                history.append(angle_value)
+
+    @property
+    def average_score(self) -> float:
+        return self.score_total / self.frame_count if self.frame_count else 0.0
+
+
+class PersonTracker:
+    """Assigns stable person ids to the poses of consecutive frames.
+
+    Each track's box is moved by its recent velocity, then tracks and detections
+    are matched greedily by IoU, highest first. Unmatched detections start new
+    tracks; tracks unmatched for more than `max_missed` frames are dropped, so a
+    person briefly occluded or missed by the detector keeps their id.
+    """
+
+    def __init__(self, min_iou: float = 0.2, max_missed: int = 15):
+        self.min_iou = min_iou
+        self.max_missed = max_missed
+        self.tracks: List[PersonTrack] = []
+        self._next_id = 1
+        self.stats = {'tracks_started': 0, 'tracks_dropped': 0}
+
+    def update(self, boxes: np.ndarray) -> List[PersonTrack]:
+        """Track for each of the (N, 4) detection boxes, in detection order."""
+        assigned: List[Optional[PersonTrack]] = [None] * len(boxes)
+        matched = set()
+        if self.tracks and len(boxes):
+            iou = box_iou(np.array([track.predicted_box() for track in self.tracks]), boxes)
+            for flat in np.argsort(iou, axis=None)[::-1]:
+                track_index, detection_index = np.unravel_index(flat, iou.shape)
+                if iou[track_index, detection_index] < self.min_iou:
+                    break
+                if track_index in matched or assigned[detection_index] is not None:
+                    continue
+                matched.add(track_index)
+                assigned[detection_index] = self.tracks[track_index]
+                self.tracks[track_index].update_box(boxes[detection_index])
+
+        kept = []
+        for track_index, track in enumerate(self.tracks):
+            if track_index not in matched:
+                track.missed += 1
+                if track.missed > self.max_missed:
+                    self.stats['tracks_dropped'] += 1
+                    continue
+            kept.append(track)
+        for detection_index, track in enumerate(assigned):
+            if track is None:
+                track = assigned[detection_index] = PersonTrack(self._next_id, boxes[detection_index])
+                self._next_id += 1
+                self.stats['tracks_started'] += 1
+                kept.append(track)
+        self.tracks = kept
+        return assigned
+
+
+class MultiPersonAnalyzer:
+    """Posture analysis of every person in a stream of frames from one camera."""
+
+    def __init__(self, detector=None, rule_profile: Optional[CompiledProfile] = None,
+                 tracker: Optional[PersonTracker] = None, min_visibility: float = 0.5):
+        # Defaults come from MULTI_POSE_MAX_PEOPLE, MULTI_POSE_MIN_IOU and MULTI_POSE_MAX_MISSED_FRAMES
+        self.detector = detector or create_multi_pose_detector(int(os.environ.get('MULTI_POSE_MAX_PEOPLE', '4')))
+        self.rule_profile = rule_profile or get_active_profile()
+        self.tracker = tracker or PersonTracker(
+            min_iou=float(os.environ.get('MULTI_POSE_MIN_IOU', '0.2')),
+            max_missed=int(os.environ.get('MULTI_POSE_MAX_MISSED_FRAMES', '15'))
+        )
+        self.min_visibility = min_visibility
+        self.frame_count = 0
+
+    def detect_people(self, image_rgb: np.ndarray, scale: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+        """(N, 13, 2) full-frame pixel landmarks and (N, 13) visibilities of every detected person."""
+        poses = self.detector.detect(image_rgb)
+        height, width = image_rgb.shape[:2]
+        values = np.array([[(pose[landmark_id].x, pose[landmark_id].y, pose[landmark_id].visibility or 0.0)
+                            for landmark_id in POSE_LANDMARK_IDS] for pose in poses],
+                          dtype=np.float64).reshape(len(poses), len(LANDMARK_NAMES), 3)
+        points = values[..., :2] * (np.array([width, height]) * scale)
+        return points, values[..., 2]
+
+    def analyze(self, image_rgb: np.ndarray, scale: float = 1.0) -> List[Tuple[PersonTrack, PostureAnalysisResult]]:
+        """Detect, track and score everyone in the frame with one model pass and one rule evaluation."""
+        self.frame_count += 1
+        points, visibility = self.detect_people(image_rgb, scale)
+        tracks = self.tracker.update(landmark_boxes(points, visibility >= self.min_visibility))
+        if not tracks:
+            return []
+        evaluation = self.rule_profile.evaluate_points(points)
+        people = []
+        for index, track in enumerate(tracks):
+            result = self.rule_profile.result(evaluation, index)
+            track.record(result)
+            people.append((track, result))
+        people.sort(key=lambda person: person[0].person_id)
+        return people
+
+    def build_response(self, people: List[Tuple[PersonTrack, PostureAnalysisResult]]) -> MultiPersonAnalysisResponse:
+        """Per-person results with each person's histories; constructed without validation."""
+        return MultiPersonAnalysisResponse.model_construct(
+            people=[PersonAnalysis.model_construct(
+                person_id=track.person_id,
+                analysis=result,
+                box=[round(float(value), 1) for value in track.box],
+                frame_count=track.frame_count,
+                average_score=track.average_score,
+                posture_history=[float(value) for value in track.posture_history],
+                angle_history={name: list(history) for name, history in track.angle_history.items()}
+            ) for track, result in people],
+            person_count=len(people),
+            tracked_people=len(self.tracker.tracks),
+            frame_count=self.frame_count
+        )
+
+    def close(self):
+        self.detector.close()
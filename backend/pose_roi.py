@@ -0,0 +1,124 @@
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class PoseRegionOfInterest:
+    """Crop window around the previous frame's pose.
+
+    The window is the padded bounding box of the last landmarks and is kept fixed while
+    the pose stays well inside it, so the pose tracker sees a stable image. It is
+    dropped (next frame runs on the full image) when the pose gets close to a crop edge
+    that is not also a frame edge, or when too few landmarks are confidently visible.
+    """
+
+    def __init__(self, padding: float = 0.3, edge_margin: float = 0.03, min_visibility: float = 0.5,
+                 min_visible_landmarks: int = 8, min_size: float = 0.2, max_side: Optional[int] = None):
+        self.padding = padding              # Fraction of the pose box added on each side
+        self.edge_margin = edge_margin      # Fraction of the crop treated as "touching the edge"
+        self.min_visibility = min_visibility
+        self.min_visible_landmarks = min_visible_landmarks
+        self.min_size = min_size            # Minimum crop side as a fraction of the frame side
+        self.max_side = max_side            # Downscale crops whose longest side exceeds this
+        self.region: Optional[Tuple[int, int, int, int]] = None
+        self.frame_shape: Optional[Tuple[int, int]] = None
+        self.stats = {'roi_frames': 0, 'full_frames': 0, 'fallbacks': 0, 'retries': 0}
+
+    def reset(self):
+        self.region = None
+
+    def lost(self):
+        """The pose was not found inside the crop; the frame is retried on the full image."""
+        self.stats['retries'] += 1
+        self.region = None
+
+    def crop(self, image: np.ndarray) -> Tuple[np.ndarray, int, int]:
+        """Return the region to run inference on and its offset in the frame."""
+        height, width = image.shape[:2]
+        if self.frame_shape != (height, width):
+            self.frame_shape = (height, width)
+            self.region = None
+        if self.region is None:
+            self.stats['full_frames'] += 1
+            return image, 0, 0
+        self.stats['roi_frames'] += 1
+        x0, y0, x1, y1 = self.region
+        return image[y0:y1, x0:x1], x0, y0
+
+    def prepare(self, crop: np.ndarray) -> np.ndarray:
+        """Contiguous, optionally downscaled model input; landmarks are normalized so scale cancels out."""
+        height, width = crop.shape[:2]
+        if self.max_side and max(height, width) > self.max_side:
+            scale = self.max_side / max(height, width)
+            return cv2.resize(crop, (max(1, int(width * scale)), max(1, int(height * scale))),
+                              interpolation=cv2.INTER_LINEAR)
+        return np.ascontiguousarray(crop)
+
+    def update(self, pose_landmarks, crop_width: int, crop_height: int, offset_x: int, offset_y: int):
+        """Choose the next frame's region from this frame's landmarks."""
+        values = np.array([(lm.x, lm.y, lm.visibility) for lm in pose_landmarks.landmark], dtype=np.float64)
+        # Only confidently placed landmarks shape the window (legs are often out of shot)
+        values = values[values[:, 2] >= self.min_visibility]
+        if len(values) < self.min_visible_landmarks:
+            self._fallback()
+            return
+
+        frame_height, frame_width = self.frame_shape
+        if self.region is not None:
+            # Landmarks pressed against a crop edge may be cut off: look at the full frame next
+            margin = self.edge_margin
+            x0, y0, x1, y1 = self.region
+            if ((x0 > 0 and values[:, 0].min() < margin) or
+                    (x1 < frame_width and values[:, 0].max() > 1 - margin) or
+                    (y0 > 0 and values[:, 1].min() < margin) or
+                    (y1 < frame_height and values[:, 1].max() > 1 - margin)):
+                self._fallback()
+                return
+
+        xs = np.clip(values[:, 0] * crop_width + offset_x, 0, frame_width)
+        ys = np.clip(values[:, 1] * crop_height + offset_y, 0, frame_height)
+        box = (xs.min(), ys.min(), xs.max(), ys.max())
+
+        if self.region is not None and self._keeps(box):
+            return
+        self.region = self._padded(box)
+
+    def _fallback(self):
+        if self.region is not None:
+            self.stats['fallbacks'] += 1
+        self.region = None
+
+    def _keeps(self, box) -> bool:
+        """Keep the current region while the pose stays clear of its padding band."""
+        frame_height, frame_width = self.frame_shape
+        x0, y0, x1, y1 = self.region
+        # Half of the padding band may be used before the region is re-centered
+        slack_x = (x1 - x0) * self.padding / (1 + 2 * self.padding) / 2
+        slack_y = (y1 - y0) * self.padding / (1 + 2 * self.padding) / 2
+        inside = ((x0 == 0 or box[0] >= x0 + slack_x) and (x1 == frame_width or box[2] <= x1 - slack_x) and
+                  (y0 == 0 or box[1] >= y0 + slack_y) and (y1 == frame_height or box[3] <= y1 - slack_y))
+        # Re-center when the pose has shrunk to a small part of the region
+        large_enough = (box[2] - box[0]) * (box[3] - box[1]) >= 0.25 * (x1 - x0 - 4 * slack_x) * (y1 - y0 - 4 * slack_y)
+        return inside and large_enough
+
+    def _padded(self, box) -> Optional[Tuple[int, int, int, int]]:
+        frame_height, frame_width = self.frame_shape
+        box_width = max(box[2] - box[0], self.min_size * frame_width)
+        box_height = max(box[3] - box[1], self.min_size * frame_height)
+        center_x = (box[0] + box[2]) / 2
+        center_y = (box[1] + box[3]) / 2
+        half_width = box_width * (0.5 + self.padding)
+        half_height = box_height * (0.5 + self.padding)
+        x0 = int(max(0, center_x - half_width))
+        y0 = int(max(0, center_y - half_height))
+        x1 = int(min(frame_width, center_x + half_width))
+        y1 = int(min(frame_height, center_y + half_height))
+        if x0 == 0 and y0 == 0 and x1 == frame_width and y1 == frame_height:
+            return None  # The pose fills the frame; cropping would not save anything
+        return x0, y0, x1, y1
+
+    def get_stats(self) -> Dict[str, float]:
+        """Frame counts by input (crop or full frame), fallbacks, retries and the crop hit rate."""
+        frames = self.stats['roi_frames'] + self.stats['full_frames']
+        return {**self.stats, 'hit_rate': self.stats['roi_frames'] / frames if frames else 0.0}
@@ -2,67 +2,161 @@ import cv2
 import numpy as np
 import mediapipe as mp
 import math
+import os
+import time
 from collections import deque
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
-from schemas import PostureAnalysisResult, SessionStats
+from schemas import PostureAnalysisResult, SessionStats, AnalysisResponse
+from posture_rules import CompiledProfile, DEFAULT_ISSUE_PENALTY, LANDMARK_NAMES, get_active_profile, landmarks_to_array
+from landmark_recording import LandmarkRecorder
+from pose_roi import PoseRegionOfInterest
+from skeleton import DEFAULT_MIN_VISIBILITY, SKELETON
+
+# MediaPipe landmark index for each of the tracked landmarks, in LANDMARK_NAMES order
+POSE_LANDMARK_IDS = [mp.solutions.pose.PoseLandmark[name.upper()].value for name in LANDMARK_NAMES]
+
+class HistorySeries(deque):
+    """Bounded history that numbers each appended sample from a shared sequence."""
+
+    def __init__(self, maxlen: int, sequence: List[int]):
+        super().__init__(maxlen=maxlen)
+        self.sequence = sequence
+        self.sequence_numbers = deque(maxlen=maxlen)
+        # Cursors from before this series existed can't be served as a delta
+        self.evicted_through = sequence[0]
+
+    def append(self, value):
+        if len(self.sequence_numbers) == self.maxlen:
+            self.evicted_through = self.sequence_numbers[0]
+        self.sequence[0] += 1
+        self.sequence_numbers.append(self.sequence[0])
+        super().append(value)
+
+    def since(self, cursor: int) -> Optional[List[float]]:
+        """Samples appended after `cursor`, or None if some were already evicted."""
+        if cursor < self.evicted_through:
+            return None
+        new_samples = []
+        for value, number in zip(reversed(self), reversed(self.sequence_numbers)):
+            if number <= cursor:
+                break
+            new_samples.append(value)
+        new_samples.reverse()
+        return new_samples
+
 
 class PostureAnalyzer:
-    def __init__(self):
+    def __init__(self, rule_profile: Optional[CompiledProfile] = None,
+                 roi: Optional[PoseRegionOfInterest] = None):
         self.mp_pose = mp.solutions.pose
         self.mp_drawing = mp.solutions.drawing_utils
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=1,
-            enable_segmentation=False,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        if os.environ.get('POSE_BACKEND') == 'stub':
+            # Synthetic landmarks for load tests (STUB_POSE_LATENCY_MS simulates model cost)
+            from stub_pose import StubPose
+            self.pose = StubPose(latency_ms=float(os.environ.get('STUB_POSE_LATENCY_MS', '0')))
+        else:
+            self.pose = self.mp_pose.Pose(
+                static_image_mode=False,
+                model_complexity=1,
+                enable_segmentation=False,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            )
+        self.rule_profile = rule_profile or get_active_profile()
+        self.recorder: Optional[LandmarkRecorder] = None
+
+        # Visibility of each landmark in the last detection, for skipping hidden joints when drawing
+        self.landmark_visibility: Optional[np.ndarray] = None
+        self.skeleton_min_visibility = float(os.environ.get('SKELETON_MIN_VISIBILITY', DEFAULT_MIN_VISIBILITY))
+
+        # Crop inference to the previous pose (POSE_ROI=1, optional POSE_ROI_MAX_SIDE downscale)
+        if roi is None and os.environ.get('POSE_ROI', '0') == '1':
+            max_side = os.environ.get('POSE_ROI_MAX_SIDE')
+            roi = PoseRegionOfInterest(max_side=int(max_side) if max_side else None)
+        self.roi = roi
         
-        # Session tracking
-        self.posture_history = deque(maxlen=100)
+        # Session tracking; every history sample gets a number from one shared sequence.
+        # Seeding it from the clock makes cursors from another session or process resync.
+        self._history_sequence = [time.time_ns() // 1000]
+        self.posture_history = HistorySeries(100, self._history_sequence)
         self.angle_history = {
-            'neck': deque(maxlen=50),
-            'shoulder': deque(maxlen=50),
-            'hip': deque(maxlen=50),
-            'knee': deque(maxlen=50)
+            'neck': HistorySeries(50, self._history_sequence),
+            'shoulder': HistorySeries(50, self._history_sequence),
+            'hip': HistorySeries(50, self._history_sequence),
+            'knee': HistorySeries(50, self._history_sequence)
         }
         
         self.session_stats = {
             'start_time': datetime.utcnow(),
             'frame_count': 0,
             'average_score': 0.0,
-            'improvement_trend': 0.0,
+            'improvement_trend': '0%',
             'duration': '00:00:00'
         }
 
-    def extract_landmarks(self, pose_landmarks, width: int, height: int) -> Dict[str, Tuple[float, float]]:
-        """Extract key landmarks from MediaPipe pose detection."""
+    def extract_landmarks(self, pose_landmarks, width: int, height: int,
+                          offset_x: float = 0, offset_y: float = 0,
+                          scale: float = 1.0) -> Dict[str, Tuple[float, float]]:
+        """Extract key landmarks from MediaPipe pose detection.
+
+        `width`/`height` are the size of the image the pose was detected in, the
+        offsets place that image within the full frame and `scale` maps the frame
+        back to the uploaded resolution.
+        """
         landmarks = {}
-        
-        # Define key landmarks
-        key_points = {
-            'nose': self.mp_pose.PoseLandmark.NOSE,
-            'left_ear': self.mp_pose.PoseLandmark.LEFT_EAR,
-            'right_ear': self.mp_pose.PoseLandmark.RIGHT_EAR,
-            'left_shoulder': self.mp_pose.PoseLandmark.LEFT_SHOULDER,
-            'right_shoulder': self.mp_pose.PoseLandmark.RIGHT_SHOULDER,
-            'left_elbow': self.mp_pose.PoseLandmark.LEFT_ELBOW,
-            'right_elbow': self.mp_pose.PoseLandmark.RIGHT_ELBOW,
-            'left_hip': self.mp_pose.PoseLandmark.LEFT_HIP,
-            'right_hip': self.mp_pose.PoseLandmark.RIGHT_HIP,
-            'left_knee': self.mp_pose.PoseLandmark.LEFT_KNEE,
-            'right_knee': self.mp_pose.PoseLandmark.RIGHT_KNEE,
-            'left_ankle': self.mp_pose.PoseLandmark.LEFT_ANKLE,
-            'right_ankle': self.mp_pose.PoseLandmark.RIGHT_ANKLE
-        }
-        
-        for name, landmark_id in key_points.items():
-            landmark = pose_landmarks.landmark[landmark_id.value]
-            landmarks[name] = (landmark.x * width, landmark.y * height)
-            
+        visibility = np.empty(len(LANDMARK_NAMES))
+        for index, (name, landmark_id) in enumerate(zip(LANDMARK_NAMES, POSE_LANDMARK_IDS)):
+            landmark = pose_landmarks.landmark[landmark_id]
+            landmarks[name] = ((landmark.x * width + offset_x) * scale, (landmark.y * height + offset_y) * scale)
+            visibility[index] = landmark.visibility
+        self.landmark_visibility = visibility
         return landmarks
 
+    def detect_landmarks(self, image_rgb: np.ndarray, scale: float = 1.0) -> Optional[Dict[str, Tuple[float, float]]]:
+        """Run pose inference on an RGB frame and return full-frame pixel landmarks.
+
+        Pass `scale` > 1 for frames decoded below their uploaded resolution so pixel
+        measurements keep their meaning.
+        """
+        if self.roi is None:
+            height, width = image_rgb.shape[:2]
+            results = self.pose.process(image_rgb)
+            if not results.pose_landmarks:
+                return None
+            return self.extract_landmarks(results.pose_landmarks, width, height, scale=scale)
+
+        region, offset_x, offset_y = self.roi.crop(image_rgb)
+        results = self.pose.process(self.roi.prepare(region))
+        if not results.pose_landmarks and region is not image_rgb:
+            # Lost the pose inside the crop: retry on the full frame right away
+            self.roi.lost()
+            region, offset_x, offset_y = image_rgb, 0, 0
+            results = self.pose.process(self.roi.prepare(region))
+        if not results.pose_landmarks:
+            self.roi.reset()
+            return None
+
+        height, width = region.shape[:2]
+        self.roi.update(results.pose_landmarks, width, height, offset_x, offset_y)
+        return self.extract_landmarks(results.pose_landmarks, width, height, offset_x, offset_y, scale)
+
+    def start_recording(self, path, **recorder_options):
+        """Persist landmarks of every analyzed frame to a recording file."""
+        self.stop_recording()
+        self.recorder = LandmarkRecorder(path, **recorder_options)
+
+    def stop_recording(self):
+        """Flush and close the active recording, if any."""
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def flush_recording(self):
+        """Write landmarks buffered by the active recording to disk, if any."""
+        if self.recorder is not None:
+            self.recorder.flush()
+
     def calculate_angle(self, point1: Tuple[float, float], point2: Tuple[float, float], 
                        point3: Tuple[float, float]) -> float:
         """Calculate angle between three points."""
@@ -87,113 +181,21 @@ class PostureAnalyzer:
     def analyze_posture_comprehensive(self, landmarks: Dict[str, Tuple[float, float]]) -> Optional[PostureAnalysisResult]:
         """Comprehensive posture analysis."""
         try:
-            issues = []
-            detailed_issues = {}
-            recommendations = []
-            angles = {}
-            measurements = {}
-            
-            # Calculate key angles
-            # Neck angle (head tilt)
-            if all(k in landmarks for k in ['nose', 'left_ear', 'right_ear', 'left_shoulder', 'right_shoulder']):
-                ear_center = ((landmarks['left_ear'][0] + landmarks['right_ear'][0]) / 2,
-                             (landmarks['left_ear'][1] + landmarks['right_ear'][1]) / 2)
-                shoulder_center = ((landmarks['left_shoulder'][0] + landmarks['right_shoulder'][0]) / 2,
-                                 (landmarks['left_shoulder'][1] + landmarks['right_shoulder'][1]) / 2)
-                
-                # Calculate forward head posture
-                head_forward = abs(ear_center[0] - shoulder_center[0])
-                vertical_distance = abs(ear_center[1] - shoulder_center[1])
-                
-                if vertical_distance > 0:
-                    neck_angle = math.degrees(math.atan(head_forward / vertical_distance))
-                    angles['neck_angle'] = round(neck_angle, 1)
-                    
-                    if neck_angle > 15:
-                        issues.append("Forward head posture detected")
-                        detailed_issues['forward_head'] = f"Head is {neck_angle:.1f}° forward"
-                        recommendations.append("Practice chin tucks and neck strengthening exercises")
-
-            # Shoulder alignment
-            if 'left_shoulder' in landmarks and 'right_shoulder' in landmarks:
-                shoulder_diff = abs(landmarks['left_shoulder'][1] - landmarks['right_shoulder'][1])
-                shoulder_angle = math.degrees(math.atan2(shoulder_diff, 
-                    abs(landmarks['left_shoulder'][0] - landmarks['right_shoulder'][0])))
-                angles['shoulder_angle'] = round(180 - shoulder_angle, 1)
-                
-                if shoulder_diff > 20:  # pixels
-                    issues.append("Uneven shoulder height")
-                    detailed_issues['shoulder_imbalance'] = f"Shoulder height difference: {shoulder_diff:.1f}px"
-                    recommendations.append("Focus on shoulder blade exercises and posture awareness")
-
-            # Hip alignment
-            if 'left_hip' in landmarks and 'right_hip' in landmarks:
-                hip_diff = abs(landmarks['left_hip'][1] - landmarks['right_hip'][1])
-                hip_angle = 180 - math.degrees(math.atan2(hip_diff,
-                    abs(landmarks['left_hip'][0] - landmarks['right_hip'][0])))
-                angles['hip_angle'] = round(hip_angle, 1)
-                
-                if hip_diff > 15:
-                    issues.append("Hip misalignment detected")
-                    detailed_issues['hip_tilt'] = f"Hip height difference: {hip_diff:.1f}px"
-                    recommendations.append("Strengthen core muscles and practice pelvic tilts")
-
-            # Knee alignment
-            if all(k in landmarks for k in ['left_hip', 'left_knee', 'left_ankle']):
-                knee_angle = self.calculate_angle(landmarks['left_hip'], landmarks['left_knee'], landmarks['left_ankle'])
-                angles['knee_angle'] = round(knee_angle, 1)
-                
-                if knee_angle < 160:
-                    issues.append("Knee flexion while standing")
-                    detailed_issues['knee_bend'] = f"Knee angle: {knee_angle:.1f}°"
-                    recommendations.append("Focus on standing posture and leg strengthening")
-
-            # Overall spinal alignment
-            if all(k in landmarks for k in ['nose', 'left_shoulder', 'right_shoulder', 'left_hip', 'right_hip']):
-                head_center = landmarks['nose']
-                shoulder_center = ((landmarks['left_shoulder'][0] + landmarks['right_shoulder'][0]) / 2,
-                                 (landmarks['left_shoulder'][1] + landmarks['right_shoulder'][1]) / 2)
-                hip_center = ((landmarks['left_hip'][0] + landmarks['right_hip'][0]) / 2,
-                             (landmarks['left_hip'][1] + landmarks['right_hip'][1]) / 2)
-                
-                # Check vertical alignment
-                head_hip_offset = abs(head_center[0] - hip_center[0])
-                shoulder_hip_offset = abs(shoulder_center[0] - hip_center[0])
-                
-                measurements['head_hip_offset'] = head_hip_offset
-                measurements['shoulder_hip_offset'] = shoulder_hip_offset
-                
-                if head_hip_offset > 30:
-                    issues.append("Poor overall spinal alignment")
-                    recommendations.append("Focus on whole-body postural awareness")
+            # Evaluate the rule profile on a batch of one frame
+            points = landmarks_to_array(landmarks)
+            evaluation = self.rule_profile.evaluate_points(points[np.newaxis])
+            result = self.rule_profile.result(evaluation, 0)
+
+            if self.recorder is not None:
+                self.recorder.append(points)
 
-            # Calculate overall score
-            score = self.calculate_posture_score(angles, measurements, len(issues))
-            grade = self.get_posture_grade(score)
-            
             # Update tracking data
-            self.posture_history.append(score)
-            for angle_name, angle_value in angles.items():
+            self.posture_history.append(result.score)
+            for angle_name, angle_value in result.angles.items():
                 if angle_name.replace('_angle', '') in self.angle_history:
                     self.angle_history[angle_name.replace('_angle', '')].append(angle_value)
-            
-            # Add generic recommendations if no specific issues found
-            if not recommendations:
-                recommendations = [
-                    "Maintain current good posture",
-                    "Regular movement breaks recommended",
-                    "Continue monitoring posture throughout the day"
-                ]
-
-            return PostureAnalysisResult(
-                score=score,
-                grade=grade,
-                issues=issues,
-                detailed_issues=detailed_issues,
-                angles=angles,
-                measurements=measurements,
-                recommendations=recommendations
-            )
+
+            return result
             
         except Exception as e:
             print(f"Error in posture analysis: {e}")
@@ -202,45 +204,11 @@ class PostureAnalyzer:
     def calculate_posture_score(self, angles: Dict[str, float], measurements: Dict[str, float], 
                                issue_count: int) -> int:
         """Calculate overall posture score based on measurements and issues."""
-        base_score = 100
-        
-        # Deduct points for issues
-        base_score -= (issue_count * 15)
-        
-        # Angle-based deductions
-        if 'neck_angle' in angles:
-            neck_penalty = max(0, (angles['neck_angle'] - 10) * 2)
-            base_score -= neck_penalty
-            
-        if 'shoulder_angle' in angles:
-            shoulder_penalty = max(0, abs(angles['shoulder_angle'] - 180) * 0.5)
-            base_score -= shoulder_penalty
-            
-        if 'knee_angle' in angles and angles['knee_angle'] < 170:
-            knee_penalty = (170 - angles['knee_angle']) * 0.5
-            base_score -= knee_penalty
-        
-        # Ensure score is within valid range
-        return max(0, min(100, int(base_score)))
+        return self.rule_profile.score({**measurements, **angles}, issue_count * DEFAULT_ISSUE_PENALTY)
 
     def get_posture_grade(self, score: int) -> str:
         """Convert numeric score to letter grade."""
-        if score >= 95:
-            return "A+"
-        elif score >= 90:
-            return "A"
-        elif score >= 85:
-            return "B+"
-        elif score >= 80:
-            return "B"
-        elif score >= 75:
-            return "C+"
-        elif score >= 70:
-            return "C"
-        elif score >= 60:
-            return "D"
-        else:
-            return "F"
+        return self.rule_profile.grade(score)
 
     def update_session_stats(self, analysis_result: PostureAnalysisResult):
         """Update session statistics."""
@@ -262,83 +230,74 @@ class PostureAnalyzer:
             improvement = ((recent_avg - earlier_avg) / earlier_avg) * 100
             self.session_stats['improvement_trend'] = f"{improvement:+.1f}%"
 
-    def draw_enhanced_skeleton(self, image: np.ndarray, landmarks: Dict[str, Tuple[float, float]]):
-        """Draw enhanced skeleton with posture indicators."""
-        # Define connections with different colors for different body parts
-        head_connections = [
-            ('nose', 'left_ear'),
-            ('nose', 'right_ear')
-        ]
-        
-        torso_connections = [
-            ('left_shoulder', 'right_shoulder'),
-            ('left_shoulder', 'left_hip'),
-            ('right_shoulder', 'right_hip'),
-            ('left_hip', 'right_hip')
-        ]
-        
-        arm_connections = [
-            ('left_shoulder', 'left_elbow'),
-            ('right_shoulder', 'right_elbow'),
-            ('left_elbow', 'left_wrist') if 'left_wrist' in landmarks else None,
-            ('right_elbow', 'right_wrist') if 'right_wrist' in landmarks else None
-        ]
-        
-        leg_connections = [
-            ('left_hip', 'left_knee'),
-            ('right_hip', 'right_knee'),
-            ('left_knee', 'left_ankle'),
-            ('right_knee', 'right_ankle')
-        ]
-        
-        # Draw connections with different colors
-        def draw_connections(connections, color, thickness=3):
-            for connection in connections:
-                if connection is None:
-                    continue
-                start, end = connection
-                if start in landmarks and end in landmarks:
-                    start_point = tuple(map(int, landmarks[start]))
-                    end_point = tuple(map(int, landmarks[end]))
-                    cv2.line(image, start_point, end_point, color, thickness)
-        
-        # Draw different body parts with different colors
-        draw_connections(head_connections, (255, 255, 0), 2)  # Yellow for head
-        draw_connections(torso_connections, (0, 255, 0), 4)   # Green for torso
-        draw_connections(arm_connections, (255, 0, 255), 3)   # Magenta for arms  
-        draw_connections(leg_connections, (0, 255, 255), 3)   # Cyan for legs
-        
-        # Draw key points with different sizes and colors
-        key_points = {
-            'nose': ((255, 255, 255), 6),           # White nose
-            'left_ear': ((255, 255, 0), 5),        # Yellow ears
-            'right_ear': ((255, 255, 0), 5),
-            'left_shoulder': ((0, 255, 0), 8),     # Green shoulders
-            'right_shoulder': ((0, 255, 0), 8),
-            'left_elbow': ((255, 0, 255), 6),      # Magenta elbows
-            'right_elbow': ((255, 0, 255), 6),
-            'left_hip': ((0, 255, 255), 8),        # Cyan hips
-            'right_hip': ((0, 255, 255), 8),
-            'left_knee': ((0, 255, 255), 6),       # Cyan knees
-            'right_knee': ((0, 255, 255), 6),
-            'left_ankle': ((0, 255, 255), 6),      # Cyan ankles
-            'right_ankle': ((0, 255, 255), 6)
-        }
-        
-        for name, (x, y) in landmarks.items():
-            if name in key_points:
-                color, radius = key_points[name]
-                cv2.circle(image, (int(x), int(y)), radius, color, -1)
-                # Add small black outline for better visibility
-                cv2.circle(image, (int(x), int(y)), radius + 1, (0, 0, 0), 2)
+    @property
+    def history_sequence(self) -> int:
+        """Sequence number of the most recent history sample."""
+        return self._history_sequence[0]
+
+    def build_analysis_response(self, analysis: PostureAnalysisResult,
+                                history_cursor: Optional[int] = None) -> AnalysisResponse:
+        """Bundle an analysis with the current session stats and histories.
+
+        With a history cursor only samples newer than the cursor are returned; a cursor
+        that is ahead of this session or older than the retained history gets a full resync.
+        The models are constructed without validation since every value is produced here.
+        """
+        session_stats = SessionStats.model_construct(
+            duration=self.session_stats.get('duration', '00:00:00'),
+            average_score=self.session_stats.get('average_score', 0.0),
+            improvement_trend=self.session_stats.get('improvement_trend', '0%'),
+            start_time=self.session_stats.get('start_time'),
+            frame_count=self.session_stats.get('frame_count', 0)
+        )
+
+        if history_cursor is not None and 0 <= history_cursor <= self.history_sequence:
+            posture_delta = self.posture_history.since(history_cursor)
+            angle_delta = {k: v.since(history_cursor) for k, v in self.angle_history.items()}
+            if posture_delta is not None and all(v is not None for v in angle_delta.values()):
+                return AnalysisResponse.model_construct(
+                    analysis=analysis,
+                    session_stats=session_stats,
+                    posture_history=[float(v) for v in posture_delta],
+                    angle_history=angle_delta,
+                    history_sequence=self.history_sequence,
+                    history_delta=True
+                )
+
+        return AnalysisResponse.model_construct(
+            analysis=analysis,
+            session_stats=session_stats,
+            posture_history=[float(v) for v in self.posture_history],
+            angle_history={k: list(v) for k, v in self.angle_history.items()},
+            history_sequence=self.history_sequence
+        )
+
+    def draw_enhanced_skeleton(self, image: np.ndarray, landmarks: Dict[str, Tuple[float, float]],
+                               scale: float = 1.0, visibility: Optional[np.ndarray] = None):
+        """Draw enhanced skeleton with posture indicators.
+
+        Joints below SKELETON_MIN_VISIBILITY are skipped; `visibility` defaults to that
+        of the last detection. Pass `scale` to draw onto a resized copy of the frame.
+        """
+        if visibility is None:
+            visibility = self.landmark_visibility
+        visible = visibility >= self.skeleton_min_visibility if visibility is not None else None
+        SKELETON.draw(image, landmarks_to_array(landmarks), visible, scale)
 
     def draw_enhanced_ui(self, image: np.ndarray, analysis_result: PostureAnalysisResult, 
-                        frame_stats: Dict):
-        """Draw enhanced UI overlay on the image."""
+                        frame_stats: Dict, overlay: Optional[np.ndarray] = None):
+        """Draw enhanced UI overlay on the image.
+
+        `overlay` is an optional scratch image of the same shape (e.g. a pooled buffer)
+        for the translucent panels; one is allocated when omitted.
+        """
         height, width = image.shape[:2]
         
         # Create semi-transparent overlays
-        overlay = image.copy()
+        if overlay is None:
+            overlay = image.copy()
+        else:
+            np.copyto(overlay, image)
         
         # Draw main score display (top-left)
         score_text = f"POSTURE SCORE: {analysis_result.score}/100"
@@ -0,0 +1,321 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Literal, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from schemas import PostureAnalysisResult
+
+# Landmark order used by every array-based API (recordings, batch scoring, drawing)
+LANDMARK_NAMES = [
+    'nose', 'left_ear', 'right_ear',
+    'left_shoulder', 'right_shoulder',
+    'left_elbow', 'right_elbow',
+    'left_hip', 'right_hip',
+    'left_knee', 'right_knee',
+    'left_ankle', 'right_ankle'
+]
+LANDMARK_INDEX = {name: i for i, name in enumerate(LANDMARK_NAMES)}
+
+# Metrics reported under `angles` (rounded to 0.1°) and `measurements` (raw pixels)
+ANGLE_METRICS = ('neck_angle', 'shoulder_angle', 'hip_angle', 'knee_angle')
+MEASUREMENT_METRICS = ('head_hip_offset', 'shoulder_hip_offset')
+
+# Score points deducted per fired rule unless the rule declares its own penalty
+DEFAULT_ISSUE_PENALTY = 15
+
+
+def landmarks_to_array(landmarks: Dict[str, Tuple[float, float]]) -> np.ndarray:
+    """Pack a landmark dict into a (13, 2) array, NaN where a landmark is missing."""
+    points = np.full((len(LANDMARK_NAMES), 2), np.nan, dtype=np.float64)
+    for name, point in landmarks.items():
+        index = LANDMARK_INDEX.get(name)
+        if index is not None:
+            points[index] = point
+    return points
+
+
+def compute_metrics(points: np.ndarray) -> Dict[str, np.ndarray]:
+    """Compute every posture metric for a (N, 13, 2) batch of landmarks.
+
+    Metrics that cannot be computed for a frame are NaN, which never triggers a rule
+    and contributes no penalty.
+    """
+    points = np.asarray(points, dtype=np.float64)
+
+    def p(name):
+        return points[:, LANDMARK_INDEX[name]]
+
+    ear_center = (p('left_ear') + p('right_ear')) / 2
+    shoulder_center = (p('left_shoulder') + p('right_shoulder')) / 2
+    hip_center = (p('left_hip') + p('right_hip')) / 2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Forward head posture
+        head_forward = np.abs(ear_center[:, 0] - shoulder_center[:, 0])
+        vertical_distance = np.abs(ear_center[:, 1] - shoulder_center[:, 1])
+        neck_angle = np.where(vertical_distance > 0,
+                              np.degrees(np.arctan(head_forward / vertical_distance)), np.nan)
+
+        # Shoulder and hip levelness
+        shoulder_diff = np.abs(p('left_shoulder')[:, 1] - p('right_shoulder')[:, 1])
+        shoulder_angle = 180 - np.degrees(np.arctan2(
+            shoulder_diff, np.abs(p('left_shoulder')[:, 0] - p('right_shoulder')[:, 0])))
+        hip_diff = np.abs(p('left_hip')[:, 1] - p('right_hip')[:, 1])
+        hip_angle = 180 - np.degrees(np.arctan2(
+            hip_diff, np.abs(p('left_hip')[:, 0] - p('right_hip')[:, 0])))
+
+        # Left knee angle (hip-knee-ankle), 0 for degenerate vectors
+        vector1 = p('left_hip') - p('left_knee')
+        vector2 = p('left_ankle') - p('left_knee')
+        magnitude1 = np.linalg.norm(vector1, axis=1)
+        magnitude2 = np.linalg.norm(vector2, axis=1)
+        cos_angle = np.clip(np.sum(vector1 * vector2, axis=1) / (magnitude1 * magnitude2), -1, 1)
+        knee_angle = np.where((magnitude1 == 0) | (magnitude2 == 0), 0.0, np.degrees(np.arccos(cos_angle)))
+        knee_angle = np.where(np.isnan(magnitude1) | np.isnan(magnitude2), np.nan, knee_angle)
+
+    return {
+        'neck_angle': neck_angle,
+        'shoulder_angle': shoulder_angle,
+        'shoulder_diff': shoulder_diff,
+        'hip_angle': hip_angle,
+        'hip_diff': hip_diff,
+        'knee_angle': knee_angle,
+        'head_hip_offset': np.abs(p('nose')[:, 0] - hip_center[:, 0]),
+        # Reported with the head offset only, as both need the whole upper body in view
+        'shoulder_hip_offset': np.where(np.isnan(p('nose')[:, 0]), np.nan,
+                                        np.abs(shoulder_center[:, 0] - hip_center[:, 0]))
+    }
+
+
+class PostureRule(BaseModel):
+    id: str = Field(..., description="Rule identifier, also the detailed_issues key")
+    metric: str = Field(..., description="Metric the rule tests")
+    op: Literal['>', '>=', '<', '<='] = Field(..., description="Comparison against the threshold")
+    threshold: float
+    issue: str = Field(..., description="Issue text added when the rule fires")
+    detail: Optional[str] = Field(default=None, description="detailed_issues text, formatted with {value}")
+    recommendation: Optional[str] = None
+    penalty: float = Field(default=DEFAULT_ISSUE_PENALTY, description="Score points deducted when the rule fires")
+
+
+class PenaltyTerm(BaseModel):
+    metric: str
+    reference: float = Field(..., description="Value at which the penalty starts")
+    weight: float = Field(..., description="Points deducted per unit beyond the reference")
+    direction: Literal['above', 'below', 'both'] = Field(default='above')
+
+
+class GradeBand(BaseModel):
+    min_score: int
+    grade: str
+
+
+class RuleProfile(BaseModel):
+    name: str
+    rules: List[PostureRule]
+    penalty_terms: List[PenaltyTerm] = Field(default=[])
+    grade_bands: List[GradeBand]
+    default_recommendations: List[str] = Field(default=[])
+    max_score: int = Field(default=100)
+
+    def compile(self) -> "CompiledProfile":
+        return CompiledProfile(self)
+
+
+class BatchEvaluation:
+    """Vectorized rule results for a batch of frames."""
+
+    def __init__(self, metrics: Dict[str, np.ndarray], issue_mask: np.ndarray,
+                 scores: np.ndarray, grade_index: np.ndarray, grade_labels: List[str]):
+        self.metrics = metrics
+        self.issue_mask = issue_mask      # (N, rules) bool
+        self.scores = scores              # (N,) int
+        self.grade_index = grade_index    # (N,) index into grade_labels
+        self.grade_labels = grade_labels
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    @property
+    def grades(self) -> List[str]:
+        return [self.grade_labels[i] for i in self.grade_index]
+
+
+class CompiledProfile:
+    """A RuleProfile lowered to NumPy arrays for batch evaluation."""
+
+    _OPS = {'>': np.greater, '>=': np.greater_equal, '<': np.less, '<=': np.less_equal}
+
+    def __init__(self, profile: RuleProfile):
+        self.profile = profile
+        self.rules = profile.rules
+        self.rule_metrics = [rule.metric for rule in self.rules]
+        self.thresholds = np.array([rule.threshold for rule in self.rules], dtype=np.float64)
+        self.rule_penalties = np.array([rule.penalty for rule in self.rules], dtype=np.float64)
+        # Rules grouped by operator so each group is one broadcast comparison
+        self.op_groups = [
+            (self._OPS[op], np.array([i for i, rule in enumerate(self.rules) if rule.op == op], dtype=np.intp))
+            for op in self._OPS
+            if any(rule.op == op for rule in self.rules)
+        ]
+
+        self.term_metrics = [term.metric for term in profile.penalty_terms]
+        self.term_references = np.array([term.reference for term in profile.penalty_terms], dtype=np.float64)
+        self.term_weights = np.array([term.weight for term in profile.penalty_terms], dtype=np.float64)
+        self.term_above = np.array([term.direction in ('above', 'both') for term in profile.penalty_terms])
+        self.term_below = np.array([term.direction in ('below', 'both') for term in profile.penalty_terms])
+
+        # Ascending band edges; scores below the lowest edge get the lowest grade
+        bands = sorted(profile.grade_bands, key=lambda band: band.min_score)
+        self.grade_edges = np.array([band.min_score for band in bands], dtype=np.float64)
+        self.grade_labels = [band.grade for band in bands]
+
+    def _column(self, metrics: Dict[str, np.ndarray], name: str, size: int) -> np.ndarray:
+        column = metrics.get(name)
+        if column is None:
+            return np.full(size, np.nan)
+        return np.asarray(column, dtype=np.float64)
+
+    def _term_penalties(self, metrics: Dict[str, np.ndarray], size: int) -> np.ndarray:
+        if not self.term_metrics:
+            return np.zeros(size)
+        # Penalties use the reported (rounded) angle values
+        term_values = np.column_stack([
+            np.round(self._column(metrics, m, size), 1) if m in ANGLE_METRICS else self._column(metrics, m, size)
+            for m in self.term_metrics
+        ])
+        above = np.where(self.term_above, np.maximum(0, term_values - self.term_references), 0)
+        below = np.where(self.term_below, np.maximum(0, self.term_references - term_values), 0)
+        return np.nan_to_num((above + below) * self.term_weights).sum(axis=1)
+
+    def score(self, values: Dict[str, float], issue_penalty: float = 0.0) -> int:
+        """Score one frame from metric values and an externally computed issue penalty."""
+        metrics = {name: np.array([value], dtype=np.float64) for name, value in values.items()}
+        score = self.profile.max_score - issue_penalty - self._term_penalties(metrics, 1)[0]
+        return int(np.clip(np.trunc(score), 0, self.profile.max_score))
+
+    def evaluate(self, metrics: Dict[str, np.ndarray]) -> BatchEvaluation:
+        """Evaluate all rules and the score over a dict of (N,) metric arrays."""
+        size = len(next(iter(metrics.values()))) if metrics else 0
+
+        values = (np.column_stack([self._column(metrics, m, size) for m in self.rule_metrics])
+                  if self.rules else np.empty((size, 0)))
+        issue_mask = np.zeros(values.shape, dtype=bool)
+        for op, columns in self.op_groups:
+            # NaN compares False, so missing metrics never raise issues
+            issue_mask[:, columns] = op(values[:, columns], self.thresholds[columns])
+
+        score = self.profile.max_score - issue_mask.astype(np.float64) @ self.rule_penalties
+        score -= self._term_penalties(metrics, size)
+        scores = np.clip(np.trunc(score), 0, self.profile.max_score).astype(np.int64)
+        grade_index = np.maximum(np.searchsorted(self.grade_edges, scores, side='right') - 1, 0)
+        return BatchEvaluation(metrics, issue_mask, scores, grade_index, self.grade_labels)
+
+    def evaluate_points(self, points: np.ndarray) -> BatchEvaluation:
+        """Evaluate a (N, 13, 2) batch of landmarks."""
+        return self.evaluate(compute_metrics(points))
+
+    def grade(self, score: float) -> str:
+        index = int(np.searchsorted(self.grade_edges, score, side='right')) - 1
+        return self.grade_labels[max(index, 0)]
+
+    def result(self, evaluation: BatchEvaluation, index: int) -> PostureAnalysisResult:
+        """Materialize one frame of a batch evaluation as a PostureAnalysisResult."""
+        issues = []
+        detailed_issues = {}
+        recommendations = []
+        for rule_index in np.flatnonzero(evaluation.issue_mask[index]):
+            rule = self.rules[rule_index]
+            issues.append(rule.issue)
+            if rule.detail:
+                detailed_issues[rule.id] = rule.detail.format(value=float(evaluation.metrics[rule.metric][index]))
+            if rule.recommendation:
+                recommendations.append(rule.recommendation)
+
+        angles = {}
+        for name in ANGLE_METRICS:
+            value = evaluation.metrics.get(name)
+            if value is not None and not np.isnan(value[index]):
+                angles[name] = round(float(value[index]), 1)
+        measurements = {}
+        for name in MEASUREMENT_METRICS:
+            value = evaluation.metrics.get(name)
+            if value is not None and not np.isnan(value[index]):
+                measurements[name] = float(value[index])
+
+        # Built from already-typed values, so skip validation
+        return PostureAnalysisResult.model_construct(
+            score=int(evaluation.scores[index]),
+            grade=evaluation.grade_labels[evaluation.grade_index[index]],
+            issues=issues,
+            detailed_issues=detailed_issues,
+            angles=angles,
+            measurements=measurements,
+            recommendations=recommendations or list(self.profile.default_recommendations)
+        )
+
+
+DEFAULT_PROFILE = RuleProfile(
+    name="default",
+    rules=[
+        PostureRule(id='forward_head', metric='neck_angle', op='>', threshold=15,
+                    issue="Forward head posture detected",
+                    detail="Head is {value:.1f}° forward",
+                    recommendation="Practice chin tucks and neck strengthening exercises"),
+        PostureRule(id='shoulder_imbalance', metric='shoulder_diff', op='>', threshold=20,
+                    issue="Uneven shoulder height",
+                    detail="Shoulder height difference: {value:.1f}px",
+                    recommendation="Focus on shoulder blade exercises and posture awareness"),
+        PostureRule(id='hip_tilt', metric='hip_diff', op='>', threshold=15,
+                    issue="Hip misalignment detected",
+                    detail="Hip height difference: {value:.1f}px",
+                    recommendation="Strengthen core muscles and practice pelvic tilts"),
+        PostureRule(id='knee_bend', metric='knee_angle', op='<', threshold=160,
+                    issue="Knee flexion while standing",
+                    detail="Knee angle: {value:.1f}°",
+                    recommendation="Focus on standing posture and leg strengthening"),
+        PostureRule(id='spinal_alignment', metric='head_hip_offset', op='>', threshold=30,
+                    issue="Poor overall spinal alignment",
+                    recommendation="Focus on whole-body postural awareness")
+    ],
+    penalty_terms=[
+        PenaltyTerm(metric='neck_angle', reference=10, weight=2, direction='above'),
+        PenaltyTerm(metric='shoulder_angle', reference=180, weight=0.5, direction='both'),
+        PenaltyTerm(metric='knee_angle', reference=170, weight=0.5, direction='below')
+    ],
+    grade_bands=[
+        GradeBand(min_score=95, grade="A+"),
+        GradeBand(min_score=90, grade="A"),
+        GradeBand(min_score=85, grade="B+"),
+        GradeBand(min_score=80, grade="B"),
+        GradeBand(min_score=75, grade="C+"),
+        GradeBand(min_score=70, grade="C"),
+        GradeBand(min_score=60, grade="D"),
+        GradeBand(min_score=0, grade="F")
+    ],
+    default_recommendations=[
+        "Maintain current good posture",
+        "Regular movement breaks recommended",
+        "Continue monitoring posture throughout the day"
+    ]
+)
+
+
+def load_profile(path: str) -> RuleProfile:
+    """Load a rule profile from a JSON file."""
+    return RuleProfile.model_validate(json.loads(Path(path).read_text()))
+
+
+_active_profile: Optional[CompiledProfile] = None
+
+
+def get_active_profile() -> CompiledProfile:
+    """Compiled profile named by POSTURE_RULE_PROFILE, or the default profile."""
+    global _active_profile
+    if _active_profile is None:
+        profile_path = os.environ.get('POSTURE_RULE_PROFILE')
+        _active_profile = (load_profile(profile_path) if profile_path else DEFAULT_PROFILE).compile()
+    return _active_profile
@@ -0,0 +1,182 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+BUCKET_RESOLUTIONS = ("hour", "day", "week")
+RESOLUTIONS = ("auto", "lttb") + BUCKET_RESOLUTIONS
+# Session fields the chart reads
+PROGRESS_FIELDS = ["date", "score", "session_type", "duration", "grade"]
+_EPOCH = datetime(1970, 1, 1)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of `threshold` points chosen by Largest-Triangle-Three-Buckets.
+
+    Keeps the first and last points and, from each bucket in between, the point
+    forming the largest triangle with the previously kept point and the mean of the
+    next bucket, so peaks and dips survive the reduction.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    every = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = kept = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        next_end = min(int((bucket + 2) * every) + 1, n)
+        mean_x = x[end:next_end].mean()
+        mean_y = y[end:next_end].mean()
+        areas = np.abs((x[kept] - mean_x) * (y[start:end] - y[kept])
+                       - (x[kept] - x[start:end]) * (mean_y - y[kept]))
+        kept = start + int(areas.argmax())
+        indices[bucket + 1] = kept
+    indices[-1] = n - 1
+    return indices
+
+
+def _seconds(date: datetime) -> float:
+    # Session dates are naive UTC
+    return (date - _EPOCH).total_seconds()
+
+
+def bucket_start(date: datetime, resolution: str) -> datetime:
+    if resolution == "hour":
+        return date.replace(minute=0, second=0, microsecond=0)
+    day = date.replace(hour=0, minute=0, second=0, microsecond=0)
+    if resolution == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+class _ScoreSummary:
+    """Running totals for the chart summary."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.best = 0
+        self.first: Optional[int] = None
+        self.last: Optional[int] = None
+
+    def add(self, score: int):
+        self.count += 1
+        self.total += score
+        self.best = max(self.best, score)
+        if self.first is None:
+            self.first = score
+        self.last = score
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total_sessions": self.count,
+            "average_score": self.total / self.count if self.count else 0,
+            "best_score": self.best,
+            "improvement": "Positive" if self.count >= 2 and self.last > self.first else "Stable"
+        }
+
+
+async def build_progress_chart(sessions: AsyncIterator[Dict[str, Any]], resolution: str = "auto",
+                               points: int = 200) -> Dict[str, Any]:
+    """Chart payload of at most `points` points, newest first, from sessions oldest first.
+
+    "hour", "day" and "week" aggregate sessions into time buckets with mean, min and
+    max score, so memory grows with buckets rather than sessions; more than `points`
+    buckets are then reduced with LTTB. "lttb" keeps `points` representative sessions.
+    "auto" returns every session when there are at most `points`, otherwise LTTB.
+    """
+    summary = _ScoreSummary()
+    if resolution in BUCKET_RESOLUTIONS:
+        data: List[Dict[str, Any]] = []
+        current: Optional[Dict[str, Any]] = None
+        async for session in sessions:
+            score = session["score"]
+            summary.add(score)
+            start = bucket_start(session["date"], resolution)
+            if current is None or current["start"] != start:
+                current = {"start": start, "total": 0, "sessions": 0, "min_score": score, "max_score": score}
+                data.append(current)
+            current["total"] += score
+            current["sessions"] += 1
+            current["min_score"] = min(current["min_score"], score)
+            current["max_score"] = max(current["max_score"], score)
+        timestamps = [_seconds(bucket["start"]) for bucket in data]
+        data = [{
+            "date": bucket["start"].isoformat(),
+            "score": round(bucket["total"] / bucket["sessions"], 1),
+            "min_score": bucket["min_score"],
+            "max_score": bucket["max_score"],
+            "sessions": bucket["sessions"]
+        } for bucket in data]
+        effective = resolution
+    else:
+        data = []
+        timestamps = []
+        async for session in sessions:
+            summary.add(session["score"])
+            timestamps.append(_seconds(session["date"]))
+            data.append({
+                "date": session["date"].isoformat(),
+                "score": session["score"],
+                "session": session.get("session_type"),
+                "duration": session.get("duration"),
+                "grade": session.get("grade")
+            })
+        effective = "raw" if resolution == "auto" and len(data) <= points else "lttb"
+
+    if len(data) > points:
+        keep = lttb(np.asarray(timestamps, dtype=np.float64),
+                    np.asarray([point["score"] for point in data], dtype=np.float64), points)
+        data = [data[index] for index in keep]
+
+    return {
+        "progress_data": data[::-1],
+        "summary": summary.as_dict(),
+        "resolution": effective,
+        "points": len(data)
+    }
+
+
+def empty_chart(resolution: str = "auto") -> Dict[str, Any]:
+    """Chart with no sessions, served when the database can't be read."""
+    return {
+        "progress_data": [],
+        "summary": _ScoreSummary().as_dict(),
+        "resolution": "raw" if resolution == "auto" else resolution,
+        "points": 0
+    }
+
+
+class ProgressChartCache:
+    """LRU of computed charts, each valid while its data version is current.
+
+    Entries also expire after `ttl` seconds so time windows (`days=N`) move forward.
+    """
+
+    def __init__(self, capacity: int = 256, ttl: float = 60.0):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, Dict[str, Any]]]" = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, key: Hashable, version: int) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version or time.monotonic() - entry[1] >= self.ttl:
+            self.stats['misses'] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return entry[2]
+
+    def put(self, key: Hashable, version: int, chart: Dict[str, Any]):
+        self._entries[key] = (version, time.monotonic(), chart)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), **self.stats}
@@ -24,6 +24,23 @@ class AnalysisResponse(BaseModel):
     session_stats: SessionStats
     posture_history: List[float] = Field(default=[], description="Historical posture scores")
     angle_history: Dict[str, List[float]] = Field(default={}, description="Historical angle measurements")
+    history_sequence: int = Field(default=0, description="Sequence number of the newest history sample")
+    history_delta: bool = Field(default=False, description="Histories hold only samples after the request cursor")
+
+class PersonAnalysis(BaseModel):
+    person_id: int = Field(..., description="Tracker id, stable while the person stays in view")
+    analysis: PostureAnalysisResult
+    box: List[float] = Field(default=[], description="Bounding box of the visible landmarks (x0, y0, x1, y1) in upload pixels")
+    frame_count: int = Field(default=0, description="Frames this person has been analyzed in")
+    average_score: float = Field(default=0.0, description="Average posture score of this person")
+    posture_history: List[float] = Field(default=[], description="This person's recent posture scores")
+    angle_history: Dict[str, List[float]] = Field(default={}, description="This person's recent angle measurements")
+
+class MultiPersonAnalysisResponse(BaseModel):
+    people: List[PersonAnalysis] = Field(default=[], description="One entry per person in the frame, by person id")
+    person_count: int = Field(default=0, description="People detected in this frame")
+    tracked_people: int = Field(default=0, description="People tracked, including those briefly out of view")
+    frame_count: int = Field(default=0, description="Frames analyzed in this session")
 
 class User(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -46,6 +63,7 @@ class Session(BaseModel):
     issues: List[str] = Field(default=[])
     angles: Dict[str, float] = Field(default={})
     session_type: str = Field(default="Real-time Analysis")
+    summary: Optional[Dict[str, Any]] = Field(default=None, description="Frame statistics for server-finalized live sessions")
 
 class Appointment(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -67,6 +85,10 @@ class CommunityPost(BaseModel):
     likes: int = Field(default=0)
     comments: int = Field(default=0)
 
+class CommunityFeedPage(BaseModel):
+    posts: List[CommunityPost]
+    next_cursor: Optional[str] = Field(default=None, description="Cursor for the next page; null at the end of the feed")
+
 class LearningResource(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     title: str
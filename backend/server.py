@@ -1,11 +1,12 @@
-from fastapi import FastAPI, APIRouter, File, UploadFile, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, File, UploadFile, HTTPException, Depends, Header, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse, JSONResponse
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import cv2
-import numpy as np
+import pydantic_core
 import time
-from collections import deque
+from collections import OrderedDict, deque
 from copy import deepcopy
 import os
 import logging
@@ -16,9 +17,24 @@ from contextlib import asynccontextmanager
 
 from posture_analyzer import PostureAnalyzer
 from database import Database
+from inference_pool import InferencePool, MODE_ANALYZE, MODE_JSON, MODE_ANNOTATE, MODE_MULTI
+from landmark_recording import recording_path
+from fast_response import JSON_MEDIA_TYPE, negotiate_media_type, encoded_response, model_response
+from http_cache import compressed_response, etag_matches, make_etag, not_modified
+from frame_ingest import FrameTooLargeError, IngestedFrame, decode_frame, max_frame_bytes
+from frame_buffers import FrameBufferPool, FrameLease
+from upload_limits import UploadLimitMiddleware, UploadLimits
+from video_stream import LiveVideoStream, MJPEG_MEDIA_TYPE, parse_source
+from admission import AdmissionController, AdmissionRejected
+from circuit_breaker import CircuitOpenError
+from session_export import EXPORT_FORMATS, export_sessions, parse_fields
+from skeleton import skeleton_spec
+from multi_pose import MultiPersonAnalyzer, multi_pose_available
+from session_aggregator import LiveSessionTracker, frame_summary
+from progress_series import PROGRESS_FIELDS, RESOLUTIONS, ProgressChartCache, build_progress_chart, empty_chart
 from schemas import (
-    PostureAnalysisResult, AnalysisResponse, User, Session, 
-    Appointment, CommunityPost, LearningResource, SessionStats
+    PostureAnalysisResult, AnalysisResponse, MultiPersonAnalysisResponse, User, Session, 
+    Appointment, CommunityPost, CommunityFeedPage, LearningResource, SessionStats
 )
 
 ROOT_DIR = Path(__file__).parent
@@ -28,18 +44,124 @@ load_dotenv(ROOT_DIR / '.env')
 mongo_url = os.environ['MONGO_URL']
 db_name = os.environ.get('DB_NAME', 'physiolens')
 
+# Motor client settings; the short server selection timeout bounds the wait before the breaker trips
+_MONGO_CLIENT_SETTINGS = {
+    'serverSelectionTimeoutMS': ('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'),
+    'connectTimeoutMS': ('MONGO_CONNECT_TIMEOUT_MS', '5000'),
+    'socketTimeoutMS': ('MONGO_SOCKET_TIMEOUT_MS', None),
+    'maxPoolSize': ('MONGO_MAX_POOL_SIZE', None),
+    'minPoolSize': ('MONGO_MIN_POOL_SIZE', None)
+}
+mongo_client_options = {
+    option: int(os.environ.get(env_name, default))
+    for option, (env_name, default) in _MONGO_CLIENT_SETTINGS.items()
+    if os.environ.get(env_name, default) is not None
+}
+
 # Initialize database
-database = Database(mongo_url, db_name)
+database = Database(
+    mongo_url, db_name,
+    breaker_failure_threshold=int(os.environ.get('MONGO_BREAKER_FAILURES', '3')),
+    breaker_reset_timeout=float(os.environ.get('MONGO_BREAKER_RESET_SECONDS', '10')),
+    feed_cache_size=int(os.environ.get('FEED_CACHE_SIZE', '100')),
+    feed_cache_ttl=float(os.environ.get('FEED_CACHE_TTL_SECONDS', '30')),
+    **mongo_client_options
+)
+
+# Multi-process inference (0 keeps inference in the API process)
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', '0'))
+INFERENCE_SLOTS_PER_WORKER = int(os.environ.get('INFERENCE_SLOTS_PER_WORKER', '4'))
+# Largest frame, in pixels, the workers' shared-memory slots are sized for. Bigger JPEGs
+# are decoded at a reduced scale to fit; other bigger frames get 413.
+INFERENCE_MAX_FRAME_PIXELS = int(os.environ.get('INFERENCE_MAX_FRAME_PIXELS', str(1920 * 1080)))
+inference_pool: Optional[InferencePool] = None
+
+# Directory for per-session landmark recordings (unset disables recording)
+LANDMARK_RECORDING_DIR = os.environ.get('LANDMARK_RECORDING_DIR')
+
+# Admission control for the inference endpoints. In-process inference shares one
+# analyzer, so it is limited to one request at a time whatever the setting.
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', str(INFERENCE_WORKERS * INFERENCE_SLOTS_PER_WORKER)))
+ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', '32'))
+ADMISSION_QUEUE_TIMEOUT_MS = int(os.environ.get('ADMISSION_QUEUE_TIMEOUT_MS', '500'))
+admission = AdmissionController(
+    ADMISSION_MAX_IN_FLIGHT if INFERENCE_WORKERS > 0 else 1,
+    max_queue=ADMISSION_MAX_QUEUE,
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT_MS / 1000
+)
+
+# Server-side video source for the MJPEG live stream (device index, RTSP URL or file; unset disables it)
+VIDEO_SOURCE = os.environ.get('VIDEO_SOURCE')
+VIDEO_STREAM_JPEG_QUALITY = int(os.environ.get('VIDEO_STREAM_JPEG_QUALITY', '80'))
+live_stream: Optional[LiveVideoStream] = None
+
+# Dashboard polling: ETags roll over at least this often (0 = only on writes), and JSON
+# bodies at least this large are gzip/brotli compressed
+ETAG_MAX_AGE_SECONDS = float(os.environ.get('ETAG_MAX_AGE_SECONDS', '60'))
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', '1024'))
+
+# Live sessions are finalized server-side on /sessions/{id}/end or after this many idle seconds;
+# sessions with fewer pose frames than the minimum are not saved
+LIVE_SESSION_IDLE_SECONDS = float(os.environ.get('LIVE_SESSION_IDLE_SECONDS', '120'))
+LIVE_SESSION_MIN_FRAMES = int(os.environ.get('LIVE_SESSION_MIN_FRAMES', '10'))
+
+# Downsampled progress charts, cached per (user, range, resolution, points)
+progress_charts = ProgressChartCache(
+    capacity=int(os.environ.get('PROGRESS_CHART_CACHE_SIZE', '256')),
+    ttl=float(os.environ.get('PROGRESS_CHART_CACHE_TTL_SECONDS', '60'))
+)
+
+# Request body limits (bytes, 0 = unlimited): frame endpoints default to MAX_FRAME_UPLOAD_BYTES
+# and can be set one by one; every other endpoint gets MAX_REQUEST_BYTES
+MAX_REQUEST_BYTES = int(os.environ.get('MAX_REQUEST_BYTES', str(1024 * 1024)))
+MAX_FRAME_UPLOAD_BYTES = int(os.environ.get('MAX_FRAME_UPLOAD_BYTES', str(16 * 1024 * 1024)))
+upload_limits = UploadLimits(MAX_REQUEST_BYTES, {
+    f'/api/{endpoint}': int(os.environ.get(f'MAX_UPLOAD_BYTES_{endpoint.upper()}', str(MAX_FRAME_UPLOAD_BYTES)))
+    for endpoint in ('analyze', 'analyze_frame', 'analyze_frame_json', 'analyze_frame_multi')
+})
+
+# Pooled frame buffers for uploads, colour conversion and overlays; idle buffers are capped at this size
+FRAME_BUFFER_POOL_MB = int(os.environ.get('FRAME_BUFFER_POOL_MB', '64'))
+frame_buffers = FrameBufferPool(max_idle_bytes=FRAME_BUFFER_POOL_MB * 1024 * 1024)
+# Uploads above this size are spooled to disk by the multipart parser
+_SPOOL_MAX_SIZE = 1024 * 1024
+
+# Multi-person analysis keeps one detector and tracker per session; least recently used ones are closed
+MULTI_POSE_MAX_SESSIONS = int(os.environ.get('MULTI_POSE_MAX_SESSIONS', '4'))
+
+# Default long side JPEGs are decoded down to for analysis-only endpoints (0 decodes at full size)
+INFERENCE_INPUT_SIZE = int(os.environ.get('INFERENCE_INPUT_SIZE', '0'))
 
 # Lifespan handler replacing deprecated @app.on_event
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global inference_pool, live_stream
+
     # Startup tasks
     try:
+        await database.ensure_indexes()
         await database.init_sample_data()
         logging.getLogger(__name__).info("Database initialized with sample data")
     except Exception as e:
         logging.getLogger(__name__).warning(f"Database initialization failed: {e}. Running without database.")
+
+    if LANDMARK_RECORDING_DIR and INFERENCE_WORKERS == 0:
+        analyzer.start_recording(recording_path(LANDMARK_RECORDING_DIR, "default"),
+                                 metadata={"session_id": "default"})
+
+    if INFERENCE_WORKERS > 0:
+        inference_pool = InferencePool(
+            INFERENCE_WORKERS,
+            slots_per_worker=INFERENCE_SLOTS_PER_WORKER,
+            max_frame_bytes=max_frame_bytes(INFERENCE_MAX_FRAME_PIXELS)
+        )
+        await inference_pool.start()
+
+    live_sessions.start()
+
+    if VIDEO_SOURCE:
+        live_stream = LiveVideoStream(parse_source(VIDEO_SOURCE), jpeg_quality=VIDEO_STREAM_JPEG_QUALITY)
+        live_stream.start()
     
     try:
         yield
@@ -47,6 +169,20 @@ async def lifespan(app: FastAPI):
         logging.getLogger(__name__).error(f"Lifespan error: {e}")
     finally:
         # Shutdown tasks
+        if live_stream is not None:
+            await live_stream.stop()
+            live_stream = None
+        if inference_pool is not None:
+            try:
+                await inference_pool.stop()
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Inference pool shutdown failed: {e}")
+            inference_pool = None
+        analyzer.stop_recording()
+        for multi_analyzer in multi_analyzers.values():
+            multi_analyzer.close()
+        multi_analyzers.clear()
+        await live_sessions.stop()
         try:
             await database.close()
             logging.getLogger(__name__).info("Database connection closed")
@@ -56,12 +192,32 @@ async def lifespan(app: FastAPI):
 # Create the main app (with lifespan)
 app = FastAPI(title="PhysioLens API", description="AI-Powered Posture Analysis Platform", version="1.0.0", lifespan=lifespan)
 
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Shed requests fail fast so clients send a fresh frame instead of waiting on a stale one."""
+    return JSONResponse(status_code=503, content={"detail": f"Inference busy ({exc.reason})"},
+                        headers={"Retry-After": str(exc.retry_after)})
+
+@app.exception_handler(FrameTooLargeError)
+async def frame_too_large_handler(request: Request, exc: FrameTooLargeError):
+    """Frames the inference workers have no room for."""
+    return JSONResponse(status_code=413, content={"detail": str(exc)})
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    """Database endpoints without a fallback fail fast while the breaker is open."""
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": str(exc.retry_after)})
+
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
 # Initialize posture analyzer
 analyzer = PostureAnalyzer()
 
+# In-process multi-person analyzers by session, least recently used first
+multi_analyzers: "OrderedDict[str, MultiPersonAnalyzer]" = OrderedDict()
+
 # Simple performance tracking for UI
 _fps_counter = deque(maxlen=30)
 _frame_count = 0
@@ -69,168 +225,399 @@ _frame_count = 0
 # Sample user ID for demo (in production, this would come from authentication)
 DEMO_USER_ID = "demo-user-123"
 
+def flush_session_recording(session_id: str):
+    """Write out a finished session's landmarks instead of waiting for the next chunk."""
+    if inference_pool is not None:
+        inference_pool.end_session(session_id)
+    else:
+        # In-process frames all go to the one "default" recording
+        analyzer.flush_recording()
+
+# Per-session aggregates of live frames, saved as Sessions when each session ends
+live_sessions = LiveSessionTracker(
+    database.create_session, DEMO_USER_ID, analyzer.get_posture_grade,
+    idle_timeout=LIVE_SESSION_IDLE_SECONDS, min_frames=LIVE_SESSION_MIN_FRAMES,
+    on_end=flush_session_recording
+)
+
 @api_router.get("/health")
 async def health():
     """Health check endpoint."""
     return {"status": "ok", "message": "PhysioLens API is running"}
 
+@api_router.get("/health/database")
+async def database_health():
+    """Database circuit breaker state and client timeouts."""
+    return database.get_status()
+
+@api_router.get("/inference/workers")
+async def inference_workers():
+    """Inference worker pool status."""
+    if inference_pool is None:
+        return {"enabled": False, "workers": []}
+    return {"enabled": True, **inference_pool.stats()}
+
+@api_router.get("/inference/buffers")
+async def inference_buffers():
+    """Frame buffer pool hit rate and memory, and upload limit rejections."""
+    return {"pool": frame_buffers.get_stats(), "upload_limits": upload_limits.get_stats()}
+
+@api_router.get("/inference/roi")
+async def inference_roi():
+    """Region-of-interest crop counters of the in-process analyzer (POSE_ROI=1).
+
+    Pool workers keep one analyzer per session and log its counters when the session
+    is evicted or the worker stops.
+    """
+    if analyzer.roi is None:
+        return {"enabled": False}
+    return {"enabled": True, **analyzer.roi.get_stats()}
+
+@api_router.get("/inference/admission")
+async def inference_admission():
+    """Admission control limits and shed counters."""
+    return admission.get_stats()
+
+@api_router.get("/stream/live")
+async def stream_live():
+    """MJPEG stream of the annotated server-side video source."""
+    if live_stream is None:
+        raise HTTPException(status_code=404, detail="No video source configured")
+    return StreamingResponse(live_stream.parts(), media_type=MJPEG_MEDIA_TYPE,
+                             headers={"Cache-Control": "no-cache, no-store"})
+
+@api_router.get("/stream/status")
+async def stream_status():
+    """Live stream capture and viewer statistics."""
+    if live_stream is None:
+        return {"enabled": False}
+    return {"enabled": True, **live_stream.get_stats()}
+
+@api_router.get("/skeleton")
+async def skeleton():
+    """Skeleton overlay spec (landmark order, line groups, joint styles) for client-side rendering."""
+    return skeleton_spec(analyzer.skeleton_min_visibility)
+
+def _etag_for(request: Request, *scopes: str) -> str:
+    """ETag from the database version stamps of the scopes a response reads."""
+    return make_etag(database.versions, scopes, request, ETAG_MAX_AGE_SECONDS)
+
+def _client_has(request: Request, etag: str) -> bool:
+    return etag_matches(request.headers.get("if-none-match"), etag)
+
+def _json_response(request: Request, content, etag: Optional[str] = None):
+    """JSON body with an optional ETag, compressed when large enough."""
+    return compressed_response(request, pydantic_core.to_json(content), JSON_MEDIA_TYPE, etag,
+                               RESPONSE_COMPRESSION_MIN_BYTES)
+
+def _no_pose_result() -> PostureAnalysisResult:
+    """Result returned when no pose is found in the frame."""
+    return PostureAnalysisResult(
+        score=0,
+        grade="F",
+        issues=["No pose detected"],
+        detailed_issues={},
+        angles={},
+        measurements={},
+        recommendations=["Ensure full body is visible and well-lit"]
+    )
+
 @api_router.get("/")
 async def root():
     """Root endpoint."""
     return {"message": "PhysioLens API - Transform Your Posture Health"}
 
+async def _read_upload(file: UploadFile, buffers: FrameLease):
+    """Upload body read straight into a pooled buffer when its size is known."""
+    if file.size is None:
+        return await file.read()
+    contents = buffers.array((file.size,))
+    await file.seek(0)
+    read = await run_in_threadpool(file.file.readinto, contents) if file.size > _SPOOL_MAX_SIZE \
+        else file.file.readinto(contents)
+    return memoryview(contents)[:read]
+
+def _decode_upload(contents, frame_format: str, width: Optional[int], height: Optional[int],
+                   inference_size: Optional[int] = None, buffers: Optional[FrameLease] = None) -> IngestedFrame:
+    """Decode an uploaded frame, mapping malformed input to a 400.
+
+    With the worker pool, frames are held to the pool's pixel limit (413 beyond it).
+    """
+    max_pixels = INFERENCE_MAX_FRAME_PIXELS if inference_pool is not None else None
+    try:
+        return decode_frame(contents, frame_format, width, height, inference_size, buffers, max_pixels)
+    except FrameTooLargeError:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _no_pose_response(history_cursor: Optional[int] = None) -> AnalysisResponse:
+    """Live response for a frame without a pose; delta clients keep their history."""
+    return AnalysisResponse(
+        analysis=_no_pose_result(),
+        session_stats=SessionStats(),
+        posture_history=[],
+        angle_history={},
+        history_sequence=history_cursor or 0,
+        history_delta=history_cursor is not None
+    )
+
+def _client_key(request: Request, session_id: str) -> str:
+    """Admission key: one client is one session from one address."""
+    host = request.client.host if request.client else ""
+    return f"{host}/{session_id}"
+
+def _analyze_in_process(frame: IngestedFrame, media_type: str):
+    """Single-image analysis on the in-process analyzer (runs in the threadpool)."""
+    landmarks = analyzer.detect_landmarks(frame.rgb(), frame.scale)
+    
+    if landmarks is None:
+        return model_response(_no_pose_result(), media_type)
+    
+    analysis = analyzer.analyze_posture_comprehensive(landmarks)
+    
+    if analysis is None:
+        raise HTTPException(status_code=500, detail="Analysis failed")
+    
+    return model_response(analysis, media_type)
+
 @api_router.post("/analyze", response_model=PostureAnalysisResult)
-async def analyze_posture(file: UploadFile = File(...)):
-    """Analyze posture from a single image."""
+async def analyze_posture(request: Request, file: UploadFile = File(...), session_id: str = "default",
+                          frame_format: str = "jpeg", width: Optional[int] = None,
+                          height: Optional[int] = None, inference_size: Optional[int] = None,
+                          accept: Optional[str] = Header(default=None)):
+    """Analyze posture from a single image.
+
+    `frame_format` accepts any encoded image ("jpeg") or raw rgb, rgba, nv12 and i420
+    frames of the given `width` and `height`. `inference_size` lets JPEGs decode at a
+    reduced scale whose long side still covers that many pixels.
+    """
+    media_type = negotiate_media_type(accept)
+    buffers = frame_buffers.lease()
     try:
-        contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if image is None:
-            raise HTTPException(status_code=400, detail="Invalid image format")
-        
-        height, width = image.shape[:2]
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = analyzer.pose.process(image_rgb)
-        
-        if not results.pose_landmarks:
-            return PostureAnalysisResult(
-                score=0,
-                grade="F",
-                issues=["No pose detected"],
-                detailed_issues={},
-                angles={},
-                measurements={},
-                recommendations=["Ensure full body is visible and well-lit"]
-            )
-        
-        landmarks = analyzer.extract_landmarks(results.pose_landmarks, width, height)
-        analysis = analyzer.analyze_posture_comprehensive(landmarks)
-        
-        if analysis is None:
-            raise HTTPException(status_code=500, detail="Analysis failed")
-        
-        return analysis
+        contents = await _read_upload(file, buffers)
+        frame = _decode_upload(contents, frame_format, width, height, inference_size or INFERENCE_INPUT_SIZE, buffers)
+
+        async with admission.admit(_client_key(request, session_id)):
+            if inference_pool is not None:
+                payload = await inference_pool.submit(session_id, frame.data, MODE_ANALYZE,
+                                                      {"media_type": media_type, "color": frame.color,
+                                                       "scale": frame.scale})
+                if not payload["pose"]:
+                    return model_response(_no_pose_result(), media_type)
+                if payload["body"] is None:
+                    raise HTTPException(status_code=500, detail="Analysis failed")
+                return encoded_response(payload["body"], media_type)
+
+            return await run_in_threadpool(_analyze_in_process, frame, media_type)
         
+    except (HTTPException, AdmissionRejected, FrameTooLargeError):
+        raise
     except Exception as e:
         logging.error(f"Error in analyze_posture: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        buffers.close()
 
-@api_router.post("/analyze_frame")
-async def analyze_frame(file: UploadFile = File(...)):
-    """Analyze posture from frame and return annotated image."""
+def _annotate_in_process(frame: IngestedFrame, frame_start_time: float):
+    """Analyze a live frame and draw the overlay on the in-process analyzer (runs in the threadpool).
+
+    Returns the annotated JPEG and the frame summary for the session aggregate.
+    """
     global _frame_count
-    frame_start_time = time.time()
 
-    try:
-        contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if image is None:
-            raise HTTPException(status_code=400, detail="Invalid image format")
+    landmarks = analyzer.detect_landmarks(frame.rgb(), frame.scale)
+    image = frame.bgr()
 
-        height, width = image.shape[:2]
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = analyzer.pose.process(image_rgb)
+    if landmarks is None:
+        cv2.putText(image, "No pose detected", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
+        _, img_encoded = cv2.imencode('.jpg', image)
+        return img_encoded.tobytes(), None
 
-        if not results.pose_landmarks:
-            cv2.putText(image, "No pose detected", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
-            _, img_encoded = cv2.imencode('.jpg', image)
-            return StreamingResponse(iter([img_encoded.tobytes()]), media_type="image/jpeg")
+    # Analyze landmarks
+    analysis = analyzer.analyze_posture_comprehensive(landmarks)
 
-        # Extract landmarks and analyze
-        landmarks = analyzer.extract_landmarks(results.pose_landmarks, width, height)
-        analysis = analyzer.analyze_posture_comprehensive(landmarks)
+    if analysis is not None:
+        # Update tracking data (the histories are updated by the analysis itself)
+        analyzer.update_session_stats(analysis)
 
-        if analysis is not None:
-            # Update tracking data
-            analyzer.posture_history.append(analysis.score)
-            analyzer.update_session_stats(analysis)
+    # Draw skeleton and enhanced UI
+    analyzer.draw_enhanced_skeleton(image, landmarks, scale=1 / frame.scale)
 
-        # Draw skeleton and enhanced UI
-        analyzer.draw_enhanced_skeleton(image, landmarks)
+    frame_end_time = time.time()
+    frame_fps = 1.0 / (frame_end_time - frame_start_time) if frame_end_time > frame_start_time else 0
+    _fps_counter.append(frame_fps)
+    _frame_count += 1
+    avg_fps = sum(_fps_counter) / len(_fps_counter)
+    frame_stats = {"fps": avg_fps, "frame_count": _frame_count}
 
-        frame_end_time = time.time()
-        frame_fps = 1.0 / (frame_end_time - frame_start_time) if frame_end_time > frame_start_time else 0
-        _fps_counter.append(frame_fps)
-        _frame_count += 1
-        avg_fps = sum(_fps_counter) / len(_fps_counter)
-        frame_stats = {"fps": avg_fps, "frame_count": _frame_count}
+    if analysis is not None:
+        analyzer.draw_enhanced_ui(image, analysis, frame_stats, overlay=frame.scratch(image.shape))
 
-        if analysis is not None:
-            analyzer.draw_enhanced_ui(image, analysis, frame_stats)
+    _, img_encoded = cv2.imencode('.jpg', image)
+    return img_encoded.tobytes(), frame_summary(analysis) if analysis is not None else None
 
-        _, img_encoded = cv2.imencode('.jpg', image)
-        return StreamingResponse(iter([img_encoded.tobytes()]), media_type="image/jpeg")
+@api_router.post("/analyze_frame")
+async def analyze_frame(request: Request, file: UploadFile = File(...), session_id: Optional[str] = None,
+                        frame_format: str = "jpeg", width: Optional[int] = None,
+                        height: Optional[int] = None, output_size: Optional[int] = None):
+    """Analyze posture from frame and return annotated image.
+
+    Accepts the same frame formats as /analyze. The annotated JPEG keeps the upload's
+    resolution unless `output_size` is given: JPEGs are then decoded at a reduced scale
+    whose long side still covers that many pixels, and annotated and returned at that size.
+    Frames with a `session_id` are aggregated into that live session; without one they
+    are only analyzed.
+    """
+    frame_start_time = time.time()
+    stream_id = session_id or "default"
+    buffers = frame_buffers.lease()
+    try:
+        contents = await _read_upload(file, buffers)
+        frame = _decode_upload(contents, frame_format, width, height, output_size, buffers)
+
+        async with admission.admit(_client_key(request, stream_id)):
+            if inference_pool is not None:
+                payload = await inference_pool.submit(stream_id, frame.data, MODE_ANNOTATE,
+                                                      {"color": frame.color, "scale": frame.scale})
+                jpeg, summary = payload["jpeg"], payload["frame"]
+            else:
+                jpeg, summary = await run_in_threadpool(_annotate_in_process, frame, frame_start_time)
+        if session_id:
+            live_sessions.record(session_id, summary)
+        return StreamingResponse(iter([jpeg]), media_type="image/jpeg")
         
+    except (HTTPException, AdmissionRejected, FrameTooLargeError):
+        raise
     except Exception as e:
         logging.error(f"Error in analyze_frame: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        buffers.close()
 
-@api_router.post("/analyze_frame_json", response_model=AnalysisResponse)
-async def analyze_frame_json(file: UploadFile = File(...)):
-    """Analyze posture from frame and return JSON results."""
-    try:
-        contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if image is None:
-            raise HTTPException(status_code=400, detail="Invalid image format")
-
-        height, width = image.shape[:2]
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = analyzer.pose.process(image_rgb)
-
-        if not results.pose_landmarks:
-            return AnalysisResponse(
-                analysis=PostureAnalysisResult(
-                    score=0,
-                    grade="F",
-                    issues=["No pose detected"],
-                    detailed_issues={},
-                    angles={},
-                    measurements={},
-                    recommendations=["Ensure full body is visible and well-lit"]
-                ),
-                session_stats=SessionStats(),
-                posture_history=[],
-                angle_history={}
-            )
+def _analyze_frame_json_in_process(frame: IngestedFrame, history_cursor: Optional[int], media_type: str):
+    """Live-frame analysis with session tracking on the in-process analyzer (runs in the threadpool).
 
-        landmarks = analyzer.extract_landmarks(results.pose_landmarks, width, height)
-        analysis = analyzer.analyze_posture_comprehensive(landmarks)
+    Returns the response and the frame summary for the session aggregate.
+    """
+    landmarks = analyzer.detect_landmarks(frame.rgb(), frame.scale)
 
-        if analysis is not None:
-            analyzer.posture_history.append(analysis.score)
-            analyzer.update_session_stats(analysis)
+    if landmarks is None:
+        return model_response(_no_pose_response(history_cursor), media_type), None
 
-        # Prepare session stats
-        session_stats = SessionStats(
-            duration=analyzer.session_stats.get('duration', '00:00:00'),
-            average_score=analyzer.session_stats.get('average_score', 0.0),
-            improvement_trend=analyzer.session_stats.get('improvement_trend', '0%'),
-            start_time=analyzer.session_stats.get('start_time'),
-            frame_count=analyzer.session_stats.get('frame_count', 0)
-        )
+    analysis = analyzer.analyze_posture_comprehensive(landmarks)
 
-        return AnalysisResponse(
-            analysis=analysis,
-            session_stats=session_stats,
-            posture_history=list(analyzer.posture_history),
-            angle_history={k: list(v) for k, v in analyzer.angle_history.items()}
-        )
+    if analysis is None:
+        raise HTTPException(status_code=500, detail="Analysis failed")
+
+    analyzer.update_session_stats(analysis)
+
+    return model_response(analyzer.build_analysis_response(analysis, history_cursor), media_type), frame_summary(analysis)
+
+@api_router.post("/analyze_frame_json", response_model=AnalysisResponse)
+async def analyze_frame_json(request: Request, file: UploadFile = File(...), session_id: Optional[str] = None,
+                             history_cursor: Optional[int] = None, frame_format: str = "jpeg",
+                             width: Optional[int] = None, height: Optional[int] = None,
+                             inference_size: Optional[int] = None,
+                             accept: Optional[str] = Header(default=None)):
+    """Analyze posture from frame and return JSON results.
+
+    Pass the `history_sequence` of the previous response as `history_cursor` to receive
+    only new history samples (`history_delta` true) instead of the full histories.
+    Send `Accept: application/msgpack` for a MessagePack body with the same schema.
+    Frame format and `inference_size` work as for /analyze. Frames with a `session_id`
+    are aggregated into that live session; without one they are only analyzed.
+    """
+    media_type = negotiate_media_type(accept)
+    stream_id = session_id or "default"
+    buffers = frame_buffers.lease()
+    try:
+        contents = await _read_upload(file, buffers)
+        frame = _decode_upload(contents, frame_format, width, height, inference_size or INFERENCE_INPUT_SIZE, buffers)
+
+        async with admission.admit(_client_key(request, stream_id)):
+            if inference_pool is not None:
+                payload = await inference_pool.submit(stream_id, frame.data, MODE_JSON,
+                                                      {"history_cursor": history_cursor, "media_type": media_type,
+                                                       "color": frame.color, "scale": frame.scale})
+                if not payload["pose"]:
+                    response = model_response(_no_pose_response(history_cursor), media_type)
+                elif payload["body"] is None:
+                    raise HTTPException(status_code=500, detail="Analysis failed")
+                else:
+                    response = encoded_response(payload["body"], media_type)
+                summary = payload["frame"]
+            else:
+                response, summary = await run_in_threadpool(_analyze_frame_json_in_process, frame,
+                                                            history_cursor, media_type)
+        if session_id:
+            live_sessions.record(session_id, summary)
+        return response
         
+    except (HTTPException, AdmissionRejected, FrameTooLargeError):
+        raise
     except Exception as e:
         logging.error(f"Error in analyze_frame_json: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        buffers.close()
+
+def _analyze_multi_in_process(frame: IngestedFrame, session_id: str, media_type: str):
+    """Multi-person analysis on the session's in-process analyzer (runs in the threadpool)."""
+    multi_analyzer = multi_analyzers.get(session_id)
+    if multi_analyzer is None:
+        if len(multi_analyzers) >= MULTI_POSE_MAX_SESSIONS:
+            _, evicted = multi_analyzers.popitem(last=False)
+            evicted.close()
+        multi_analyzer = multi_analyzers[session_id] = MultiPersonAnalyzer()
+    multi_analyzers.move_to_end(session_id)
+
+    people = multi_analyzer.analyze(frame.rgb(), frame.scale)
+    return model_response(multi_analyzer.build_response(people), media_type)
+
+@api_router.post("/analyze_frame_multi", response_model=MultiPersonAnalysisResponse)
+async def analyze_frame_multi(request: Request, file: UploadFile = File(...), session_id: str = "default",
+                              frame_format: str = "jpeg", width: Optional[int] = None,
+                              height: Optional[int] = None, inference_size: Optional[int] = None,
+                              accept: Optional[str] = Header(default=None)):
+    """Analyze every person in a live frame with one model pass.
+
+    Each person keeps a `person_id` across the session's frames, with their own score
+    and angle histories. Needs a multi-pose model (`MULTI_POSE_MODEL`); frame format
+    and `inference_size` work as for /analyze.
+    """
+    if not multi_pose_available():
+        raise HTTPException(status_code=503, detail="Multi-person analysis is not configured (set MULTI_POSE_MODEL)")
+    media_type = negotiate_media_type(accept)
+    buffers = frame_buffers.lease()
+    try:
+        contents = await _read_upload(file, buffers)
+        frame = _decode_upload(contents, frame_format, width, height, inference_size or INFERENCE_INPUT_SIZE, buffers)
+
+        async with admission.admit(_client_key(request, session_id)):
+            if inference_pool is not None:
+                payload = await inference_pool.submit(session_id, frame.data, MODE_MULTI,
+                                                      {"media_type": media_type, "color": frame.color,
+                                                       "scale": frame.scale})
+                return encoded_response(payload["body"], media_type)
+
+            return await run_in_threadpool(_analyze_multi_in_process, frame, session_id, media_type)
+
+    except (HTTPException, AdmissionRejected, FrameTooLargeError):
+        raise
+    except Exception as e:
+        logging.error(f"Error in analyze_frame_multi: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        buffers.close()
 
 # User Management Endpoints
 @api_router.get("/user/profile", response_model=User)
-async def get_user_profile():
+async def get_user_profile(request: Request):
     """Get user profile information."""
+    etag = _etag_for(request, f"users:{DEMO_USER_ID}")
+    if _client_has(request, etag):
+        return not_modified(etag)
     try:
         user = await database.get_user(DEMO_USER_ID)
         if not user:
@@ -245,7 +632,7 @@ async def get_user_profile():
                 total_sessions=48
             )
             user = await database.create_user(demo_user)
-        return user
+        return _json_response(request, user, etag)
     except Exception as e:
         logging.error(f"Database error in get_user_profile: {e}")
         # Return demo user data without database
@@ -289,9 +676,72 @@ async def get_user_stats():
 
 # Session Management Endpoints
 @api_router.get("/sessions/history", response_model=List[Session])
-async def get_session_history(days: int = 7):
+async def get_session_history(request: Request, days: int = 7):
     """Get user's session history."""
-    return await database.get_user_sessions(DEMO_USER_ID, days)
+    etag = _etag_for(request, f"sessions:{DEMO_USER_ID}")
+    if _client_has(request, etag):
+        return not_modified(etag)
+    return _json_response(request, await database.get_user_sessions(DEMO_USER_ID, days), etag)
+
+@api_router.get("/sessions/export")
+async def export_session_history(format: str = "ndjson", fields: Optional[str] = None,
+                                 days: Optional[int] = None, batch_size: int = 500):
+    """Stream the user's full session history as NDJSON or CSV.
+
+    Sessions are read from the database cursor `batch_size` at a time and written out
+    as they arrive. `fields` is a comma-separated subset of Session fields; `days`
+    limits the export to recent sessions.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format '{format}', expected ndjson or csv")
+    if not 1 <= batch_size <= 5000:
+        raise HTTPException(status_code=400, detail="batch_size must be between 1 and 5000")
+    try:
+        selected_fields = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    chunks = export_sessions(
+        database.iter_user_sessions(DEMO_USER_ID, days, selected_fields, batch_size),
+        format, selected_fields, batch_size
+    )
+    # Pull the first chunk before responding so an unavailable database is still a clean error
+    try:
+        first_chunk = await chunks.__anext__()
+    except StopAsyncIteration:
+        first_chunk = b""
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        logging.error(f"Error in export_session_history: {e}")
+        raise HTTPException(status_code=500, detail="Session export failed")
+
+    async def body():
+        yield first_chunk
+        async for chunk in chunks:
+            yield chunk
+
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(body(), media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="sessions.{extension}"'
+    })
+
+@api_router.post("/sessions/{session_id}/end", response_model=Session)
+async def end_live_session(session_id: str):
+    """Finalize a live session from its streamed frames and save it.
+
+    Sessions left open are finalized the same way after LIVE_SESSION_IDLE_SECONDS
+    without frames, so clients that disconnect still get a session record.
+    """
+    session = await live_sessions.end(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"No live session '{session_id}' with enough frames to save")
+    return session
+
+@api_router.get("/sessions/live")
+async def open_live_sessions():
+    """Live sessions still being aggregated, and finalization counts."""
+    return live_sessions.get_stats()
 
 @api_router.get("/sessions/latest", response_model=Optional[Session])
 async def get_latest_session():
@@ -324,9 +774,27 @@ async def create_appointment(appointment_data: dict):
 
 # Community Endpoints
 @api_router.get("/community/posts", response_model=List[CommunityPost])
-async def get_community_posts(limit: int = 20):
+async def get_community_posts(request: Request, limit: int = 20):
     """Get community posts."""
-    return await database.get_community_posts(limit)
+    etag = _etag_for(request, "community_posts")
+    if _client_has(request, etag):
+        return not_modified(etag)
+    return _json_response(request, await database.get_community_posts(limit), etag)
+
+@api_router.get("/community/feed", response_model=CommunityFeedPage)
+async def get_community_feed(limit: int = 20, cursor: Optional[str] = None):
+    """Page through community posts, newest first.
+
+    Pass the previous page's `next_cursor` as `cursor` to continue; it is null on the
+    last page.
+    """
+    if not 1 <= limit <= 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+    try:
+        posts, next_cursor = await database.get_community_page(limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return CommunityFeedPage(posts=posts, next_cursor=next_cursor)
 
 @api_router.post("/community/posts", response_model=CommunityPost)
 async def create_community_post(post_data: dict):
@@ -345,38 +813,56 @@ async def like_post(post_id: str):
 
 # Learning Resources Endpoints
 @api_router.get("/resources", response_model=List[LearningResource])
-async def get_learning_resources(resource_type: Optional[str] = None):
+async def get_learning_resources(request: Request, resource_type: Optional[str] = None):
     """Get learning resources."""
-    return await database.get_learning_resources(resource_type)
+    etag = _etag_for(request, "learning_resources")
+    if _client_has(request, etag):
+        return not_modified(etag)
+    return _json_response(request, await database.get_learning_resources(resource_type), etag)
 
 @api_router.get("/progress/chart")
-async def get_progress_chart(days: int = 7):
-    """Get progress chart data."""
-    sessions = await database.get_user_sessions(DEMO_USER_ID, days)
-    
-    progress_data = []
-    for session in sessions:
-        progress_data.append({
-            "date": session.date.isoformat(),
-            "score": session.score,
-            "session": session.session_type,
-            "duration": session.duration,
-            "grade": session.grade
-        })
-    
-    return {
-        "progress_data": progress_data,
-        "summary": {
-            "total_sessions": len(sessions),
-            "average_score": sum(s.score for s in sessions) / len(sessions) if sessions else 0,
-            "best_score": max(s.score for s in sessions) if sessions else 0,
-            "improvement": "Positive" if len(sessions) >= 2 and sessions[0].score > sessions[-1].score else "Stable"
-        }
-    }
+async def get_progress_chart(request: Request, days: int = 7, resolution: str = "auto", points: int = 200):
+    """Get progress chart data.
+
+    At most `points` points come back whatever the range: `resolution` is "auto"
+    (every session while they fit, else LTTB), "lttb", or "hour"/"day"/"week" buckets
+    with mean, min and max score.
+    """
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported resolution '{resolution}', expected one of {', '.join(RESOLUTIONS)}")
+    if not 3 <= points <= 2000:
+        raise HTTPException(status_code=400, detail="points must be between 3 and 2000")
+    if days < 1:
+        raise HTTPException(status_code=400, detail="days must be at least 1")
+    scope = f"sessions:{DEMO_USER_ID}"
+    etag = _etag_for(request, scope)
+    if _client_has(request, etag):
+        return not_modified(etag)
+
+    key = (DEMO_USER_ID, days, resolution, points)
+    version = database.versions.get(scope)
+    chart = progress_charts.get(key, version)
+    if chart is None:
+        try:
+            chart = await build_progress_chart(
+                database.iter_user_sessions(DEMO_USER_ID, days, PROGRESS_FIELDS), resolution, points)
+        except Exception as e:
+            logging.error(f"Database error in get_progress_chart: {e}")
+            return _json_response(request, empty_chart(resolution))
+        progress_charts.put(key, version, chart)
+    return _json_response(request, chart, etag)
+
+@api_router.get("/progress/chart/cache")
+async def progress_chart_cache():
+    """Progress chart cache occupancy and hit counts."""
+    return progress_charts.get_stats()
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Reject oversized bodies before they are read (inside CORS so 413s carry CORS headers)
+app.add_middleware(UploadLimitMiddleware, limits=upload_limits)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -0,0 +1,293 @@
+import asyncio
+import logging
+import math
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from schemas import PostureAnalysisResult, Session
+
+logger = logging.getLogger(__name__)
+
+# Per-frame summary carried from the analyzer (or an inference worker): score, grade, issues, angles
+FrameSummary = Tuple[int, str, Tuple[str, ...], Dict[str, float]]
+
+# An issue is reported for the session (or a stretch) when it shows in at least this share of frames
+ISSUE_MIN_SHARE = 0.1
+STRETCH_ISSUE_MIN_SHARE = 0.2
+IMPROVEMENT_MIN_POINTS = 5
+
+
+def frame_summary(analysis: PostureAnalysisResult) -> FrameSummary:
+    return analysis.score, analysis.grade, tuple(analysis.issues), dict(analysis.angles)
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class _RunningStats:
+    """Count, mean, standard deviation, min and max in constant memory (Welford)."""
+
+    __slots__ = ("count", "mean", "_m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def as_dict(self) -> Dict[str, float]:
+        std = math.sqrt(self._m2 / self.count) if self.count else 0.0
+        return {"mean": round(self.mean, 2), "std": round(std, 2), "min": round(self.min, 2),
+                "max": round(self.max, 2), "samples": self.count}
+
+
+class SessionAggregate:
+    """Running summary of one live session, updated frame by frame.
+
+    Memory is independent of session length: per-angle and score statistics are
+    running moments, issue and grade tallies are bounded by the rule profile, and
+    only the frames of the trailing `stretch_seconds` window are held to find the
+    best and worst stretches.
+    """
+
+    def __init__(self, session_id: str, stretch_seconds: float = 30.0, max_gap: float = 2.0):
+        self.session_id = session_id
+        self.stretch_seconds = stretch_seconds
+        self.max_gap = max_gap
+        self.started_at = datetime.utcnow()
+        self.last_seen = time.monotonic()
+        self._first_pose: Optional[float] = None
+        self._last_pose: Optional[float] = None
+        self._last_grade: Optional[str] = None
+
+        self.frames = 0
+        self.no_pose_frames = 0
+        self.score = _RunningStats()
+        self.angles: Dict[str, _RunningStats] = {}
+        self.issue_frames: Counter = Counter()
+        self.grade_seconds: Dict[str, float] = {}
+
+        self._window: deque = deque()       # (time, score, issues) within the stretch window
+        self._window_sum = 0
+        self._window_issues: Counter = Counter()
+        self._first_stretch: Optional[Tuple[float, set]] = None
+        self.best: Optional[Dict[str, float]] = None
+        self.worst: Optional[Dict[str, float]] = None
+
+    def add(self, frame: Optional[FrameSummary], now: Optional[float] = None):
+        """Fold in one frame; None records a frame without a detected pose."""
+        now = time.monotonic() if now is None else now
+        self.last_seen = now
+        if frame is None:
+            self.no_pose_frames += 1
+            return
+        score, grade, issues, angles = frame
+
+        if self._last_pose is not None:
+            # The previous grade holds until this frame, ignoring pauses in the stream
+            gap = min(now - self._last_pose, self.max_gap)
+            self.grade_seconds[self._last_grade] = self.grade_seconds.get(self._last_grade, 0.0) + gap
+        else:
+            self._first_pose = now
+        self._last_pose = now
+        self._last_grade = grade
+
+        self.frames += 1
+        self.score.add(score)
+        for name, value in angles.items():
+            stats = self.angles.get(name)
+            if stats is None:
+                stats = self.angles[name] = _RunningStats()
+            stats.add(value)
+        self.issue_frames.update(set(issues))
+        self._advance_window(now, score, issues)
+
+    def _advance_window(self, now: float, score: int, issues: Tuple[str, ...]):
+        self._window.append((now, score, issues))
+        self._window_sum += score
+        self._window_issues.update(set(issues))
+        while now - self._window[0][0] > self.stretch_seconds:
+            _, old_score, old_issues = self._window.popleft()
+            self._window_sum -= old_score
+            self._window_issues.subtract(set(old_issues))
+        if now - self._first_pose < self.stretch_seconds:
+            return
+
+        if self._first_stretch is None:
+            self._first_stretch = (self._window_sum / len(self._window), self._stretch_issues())
+        stretch = {
+            "start_s": round(self._window[0][0] - self._first_pose, 1),
+            "end_s": round(now - self._first_pose, 1),
+            "average_score": round(self._window_sum / len(self._window), 1)
+        }
+        if self.best is None or stretch["average_score"] > self.best["average_score"]:
+            self.best = stretch
+        if self.worst is None or stretch["average_score"] < self.worst["average_score"]:
+            self.worst = stretch
+
+    def _stretch_issues(self) -> set:
+        threshold = STRETCH_ISSUE_MIN_SHARE * len(self._window)
+        return {issue for issue, count in self._window_issues.items() if count >= threshold}
+
+    @property
+    def active_seconds(self) -> float:
+        return 0.0 if self._first_pose is None else self._last_pose - self._first_pose
+
+    def summary(self) -> Dict[str, Any]:
+        """Full statistics, stored on the finalized Session."""
+        whole = None
+        if self.best is None and self.frames:
+            # Shorter than one stretch: the whole session is both
+            whole = {"start_s": 0.0, "end_s": round(self.active_seconds, 1),
+                     "average_score": round(self.score.mean, 1)}
+        return {
+            "frames": self.frames,
+            "no_pose_frames": self.no_pose_frames,
+            "active_seconds": round(self.active_seconds, 1),
+            "score": self.score.as_dict() if self.frames else None,
+            "angles": {name: stats.as_dict() for name, stats in self.angles.items()},
+            "issue_frequency": {issue: round(count / self.frames, 3)
+                                for issue, count in self.issue_frames.most_common()} if self.frames else {},
+            "grade_seconds": {grade: round(seconds, 1) for grade, seconds in self.grade_seconds.items()},
+            "best_stretch": self.best or whole,
+            "worst_stretch": self.worst or whole
+        }
+
+    def improvements(self) -> List[str]:
+        if self._first_stretch is None:
+            return []
+        first_score, first_issues = self._first_stretch
+        last_score = self._window_sum / len(self._window)
+        improvements = []
+        if last_score - first_score >= IMPROVEMENT_MIN_POINTS:
+            improvements.append(f"Score improved from {first_score:.0f} to {last_score:.0f} during the session")
+        improvements.extend(f"Corrected: {issue}" for issue in sorted(first_issues - self._stretch_issues()))
+        return improvements
+
+    def to_session(self, user_id: str, grade: Callable[[int], str]) -> Session:
+        score = round(self.score.mean)
+        return Session(
+            user_id=user_id,
+            date=self.started_at,
+            duration=format_duration(self.active_seconds),
+            score=score,
+            grade=grade(score),
+            improvements=self.improvements(),
+            issues=[issue for issue, count in self.issue_frames.most_common()
+                    if count >= ISSUE_MIN_SHARE * self.frames],
+            angles={name: round(stats.mean, 2) for name, stats in self.angles.items()},
+            session_type="Real-time Analysis",
+            summary=self.summary()
+        )
+
+
+class LiveSessionTracker:
+    """Aggregates live frames per session and saves each session once when it ends.
+
+    A session ends through `end()` (the client says so), after `idle_timeout` seconds
+    without frames, or at shutdown. Sessions with fewer than `min_frames` pose frames
+    are dropped. `on_end`, if given, is called with the id of every session that ends,
+    saved or not. All methods run on the event loop.
+    """
+
+    def __init__(self, save: Callable[[Session], Awaitable[Session]], user_id: str,
+                 grade: Callable[[int], str], idle_timeout: float = 120.0, min_frames: int = 10,
+                 stretch_seconds: float = 30.0, on_end: Optional[Callable[[str], None]] = None):
+        self.save = save
+        self.on_end = on_end
+        self.user_id = user_id
+        self.grade = grade
+        self.idle_timeout = idle_timeout
+        self.min_frames = min_frames
+        self.stretch_seconds = stretch_seconds
+        self._sessions: Dict[str, SessionAggregate] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self.stats = {'finalized': 0, 'idle_finalized': 0, 'discarded': 0}
+
+    def record(self, session_id: str, frame: Optional[FrameSummary]):
+        aggregate = self._sessions.get(session_id)
+        if aggregate is None:
+            aggregate = self._sessions[session_id] = SessionAggregate(session_id, self.stretch_seconds)
+        aggregate.add(frame)
+
+    async def end(self, session_id: str) -> Optional[Session]:
+        """Finalize and save a session; None if it is unknown or too short to keep."""
+        aggregate = self._sessions.pop(session_id, None)
+        if aggregate is None:
+            return None
+        return await self._finalize(aggregate)
+
+    async def _finalize(self, aggregate: SessionAggregate) -> Optional[Session]:
+        if self.on_end is not None:
+            try:
+                self.on_end(aggregate.session_id)
+            except Exception as e:
+                logger.error(f"Session end hook failed for {aggregate.session_id}: {e}")
+        if aggregate.frames < max(self.min_frames, 1):
+            self.stats['discarded'] += 1
+            return None
+        session = await self.save(aggregate.to_session(self.user_id, self.grade))
+        self.stats['finalized'] += 1
+        return session
+
+    async def sweep(self):
+        """Finalize sessions idle for longer than `idle_timeout`."""
+        now = time.monotonic()
+        idle = [session_id for session_id, aggregate in self._sessions.items()
+                if now - aggregate.last_seen > self.idle_timeout]
+        for session_id in idle:
+            aggregate = self._sessions.pop(session_id)
+            try:
+                if await self._finalize(aggregate) is not None:
+                    self.stats['idle_finalized'] += 1
+            except Exception as e:
+                logger.error(f"Failed to finalize idle session {session_id}: {e}")
+
+    async def _sweep_loop(self):
+        interval = max(1.0, min(self.idle_timeout / 4, 15.0))
+        while True:
+            await asyncio.sleep(interval)
+            await self.sweep()
+
+    def start(self):
+        self._sweeper = asyncio.get_running_loop().create_task(self._sweep_loop())
+
+    async def stop(self):
+        """Stop sweeping and finalize every open session."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+        for session_id in list(self._sessions):
+            try:
+                await self.end(session_id)
+            except Exception as e:
+                logger.error(f"Failed to finalize session {session_id} at shutdown: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "open_sessions": {
+                session_id: {"frames": aggregate.frames, "no_pose_frames": aggregate.no_pose_frames,
+                             "idle_seconds": round(now - aggregate.last_seen, 1)}
+                for session_id, aggregate in self._sessions.items()
+            },
+            "idle_timeout": self.idle_timeout,
+            **self.stats
+        }
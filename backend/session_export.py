@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from schemas import Session
+
+# Export format -> media type and file extension
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv")
+}
+SESSION_FIELDS = list(Session.model_fields)
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Validate a comma-separated field selection; empty selects every Session field."""
+    if not fields:
+        return list(SESSION_FIELDS)
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in SESSION_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown session fields: {', '.join(unknown)}. Available: {', '.join(SESSION_FIELDS)}")
+    return selected
+
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _csv_cell(value: Any) -> Any:
+    """Flatten a session value into one CSV cell."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        return "; ".join(str(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, separators=(",", ":"))
+    return value
+
+
+async def export_sessions(documents: AsyncIterator[Dict[str, Any]], export_format: str,
+                          fields: List[str], batch_size: int = 500) -> AsyncIterator[bytes]:
+    """Encode raw session documents, yielding one chunk per `batch_size` documents.
+
+    Only one batch is held at a time, so memory stays flat however long the export is.
+    """
+    buffer = io.StringIO()
+    writer = None
+    if export_format == "csv":
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+
+    count = 0
+    async for document in documents:
+        if writer is not None:
+            writer.writerow([_csv_cell(document.get(field)) for field in fields])
+        else:
+            buffer.write(json.dumps({field: document.get(field) for field in fields}, default=_json_default))
+            buffer.write("\n")
+        count += 1
+        if count == batch_size:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
@@ -0,0 +1,129 @@
+"""Skeleton overlay specification and renderer.
+
+The spec is declared once by landmark name, compiled to index arrays at import, and
+served to clients (`/api/skeleton`) so browser overlays match the server's.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from posture_rules import LANDMARK_INDEX, LANDMARK_NAMES
+
+Color = Tuple[int, int, int]  # BGR, as OpenCV draws
+
+# (group, colour, line thickness, connections)
+SKELETON_GROUPS = (
+    ("head", (255, 255, 0), 2, [("nose", "left_ear"), ("nose", "right_ear")]),
+    ("torso", (0, 255, 0), 4, [("left_shoulder", "right_shoulder"), ("left_shoulder", "left_hip"),
+                               ("right_shoulder", "right_hip"), ("left_hip", "right_hip")]),
+    ("arms", (255, 0, 255), 3, [("left_shoulder", "left_elbow"), ("right_shoulder", "right_elbow")]),
+    ("legs", (0, 255, 255), 3, [("left_hip", "left_knee"), ("right_hip", "right_knee"),
+                                ("left_knee", "left_ankle"), ("right_knee", "right_ankle")])
+)
+
+# Joint -> (colour, radius); each joint also gets a 2 px black outline
+SKELETON_JOINTS = {
+    'nose': ((255, 255, 255), 6),
+    'left_ear': ((255, 255, 0), 5),
+    'right_ear': ((255, 255, 0), 5),
+    'left_shoulder': ((0, 255, 0), 8),
+    'right_shoulder': ((0, 255, 0), 8),
+    'left_elbow': ((255, 0, 255), 6),
+    'right_elbow': ((255, 0, 255), 6),
+    'left_hip': ((0, 255, 255), 8),
+    'right_hip': ((0, 255, 255), 8),
+    'left_knee': ((0, 255, 255), 6),
+    'right_knee': ((0, 255, 255), 6),
+    'left_ankle': ((0, 255, 255), 6),
+    'right_ankle': ((0, 255, 255), 6)
+}
+JOINT_OUTLINE = 2
+DEFAULT_MIN_VISIBILITY = 0.5
+
+
+class CompiledSkeleton:
+    """Index arrays for one draw call per line group and per joint style."""
+
+    def __init__(self):
+        self.lines: List[Tuple[np.ndarray, Color, int]] = [
+            (np.array([(LANDMARK_INDEX[a], LANDMARK_INDEX[b]) for a, b in connections], dtype=np.intp),
+             color, thickness)
+            for _, color, thickness, connections in SKELETON_GROUPS
+        ]
+        styles: Dict[Tuple[Color, int], List[int]] = {}
+        for name, style in SKELETON_JOINTS.items():
+            styles.setdefault(style, []).append(LANDMARK_INDEX[name])
+        self.joints: List[Tuple[np.ndarray, Color, int]] = [
+            (np.array(indices, dtype=np.intp), color, radius) for (color, radius), indices in styles.items()
+        ]
+        radii: Dict[int, List[int]] = {}
+        for name, (_, radius) in SKELETON_JOINTS.items():
+            radii.setdefault(radius, []).append(LANDMARK_INDEX[name])
+        self.outlines: List[Tuple[np.ndarray, int]] = [
+            (np.array(indices, dtype=np.intp), radius) for radius, indices in radii.items()
+        ]
+
+    def draw(self, image: np.ndarray, points: np.ndarray, visible: Optional[np.ndarray] = None,
+             scale: float = 1.0):
+        """Draw onto `image` from a (13, 2) landmark array, NaN where missing.
+
+        `visible` masks out joints (and their connections). `scale` maps landmark
+        coordinates onto an image of a different size, such as a reduced-size
+        overlay; line widths and radii scale with it.
+        """
+        valid = ~np.isnan(points).any(axis=1)
+        if visible is not None:
+            valid &= visible
+        pixels = np.zeros(points.shape, dtype=np.int32)
+        pixels[valid] = np.rint(points[valid] * scale)
+
+        for pairs, color, thickness in self.lines:
+            segments = pixels[pairs[valid[pairs].all(axis=1)]]
+            if len(segments):
+                cv2.polylines(image, segments, False, color, _scaled(thickness, scale))
+
+        # A zero-length segment of thickness 2r is a filled disc of radius r, so each joint
+        # style is one call. Black discs first leave the outline ring around the coloured ones.
+        for indices, radius in self.outlines:
+            discs = _discs(pixels, indices[valid[indices]])
+            if len(discs):
+                cv2.polylines(image, discs, False, (0, 0, 0), 2 * _scaled(radius + JOINT_OUTLINE, scale))
+        for indices, color, radius in self.joints:
+            discs = _discs(pixels, indices[valid[indices]])
+            if len(discs):
+                cv2.polylines(image, discs, False, color, 2 * _scaled(radius, scale))
+
+
+def _discs(pixels: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    points = pixels[indices][:, np.newaxis]
+    return np.concatenate([points, points], axis=1)
+
+
+def _scaled(size: int, scale: float) -> int:
+    return max(1, int(round(size * scale)))
+
+
+def _hex(color: Color) -> str:
+    blue, green, red = color
+    return f"#{red:02x}{green:02x}{blue:02x}"
+
+
+def skeleton_spec(min_visibility: float = DEFAULT_MIN_VISIBILITY) -> Dict[str, Any]:
+    """JSON form of the spec for client-side renderers; colours are RGB hex."""
+    return {
+        "landmarks": LANDMARK_NAMES,
+        "min_visibility": min_visibility,
+        "groups": [
+            {"name": name, "color": _hex(color), "thickness": thickness,
+             "connections": [[LANDMARK_INDEX[a], LANDMARK_INDEX[b]] for a, b in connections]}
+            for name, color, thickness, connections in SKELETON_GROUPS
+        ],
+        "joints": [
+            {"landmark": LANDMARK_INDEX[name], "color": _hex(color), "radius": radius, "outline": JOINT_OUTLINE}
+            for name, (color, radius) in SKELETON_JOINTS.items()
+        ]
+    }
+
+
+SKELETON = CompiledSkeleton()
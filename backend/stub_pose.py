@@ -0,0 +1,84 @@
+import random
+import time
+from types import SimpleNamespace
+from typing import List, Optional
+
+# Normalized (x, y) of a person standing side-on, by MediaPipe pose landmark index
+_STANDING_POSE = {
+    0: (0.52, 0.12),   # nose
+    7: (0.47, 0.12),   # left ear
+    8: (0.49, 0.12),   # right ear
+    11: (0.46, 0.24),  # left shoulder
+    12: (0.50, 0.24),  # right shoulder
+    13: (0.45, 0.38),  # left elbow
+    14: (0.51, 0.38),  # right elbow
+    15: (0.46, 0.50),  # left wrist
+    16: (0.52, 0.50),  # right wrist
+    23: (0.47, 0.52),  # left hip
+    24: (0.50, 0.52),  # right hip
+    25: (0.47, 0.72),  # left knee
+    26: (0.50, 0.72),  # right knee
+    27: (0.47, 0.92),  # left ankle
+    28: (0.50, 0.92)   # right ankle
+}
+_LANDMARK_COUNT = 33
+
+
+class StubPose:
+    """Stand-in for mp.solutions.pose.Pose that skips the model.
+
+    Returns a standing pose with a little per-frame jitter after an optional fixed
+    delay, so load tests exercise everything around inference at a chosen model cost.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter: float = 0.01, seed: Optional[int] = None):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter
+        self._random = random.Random(seed)
+
+    def process(self, image):
+        if self.latency:
+            time.sleep(self.latency)
+        return SimpleNamespace(pose_landmarks=SimpleNamespace(landmark=self._standing()))
+
+    def _standing(self, shift_x: float = 0.0) -> List[SimpleNamespace]:
+        landmarks = []
+        for index in range(_LANDMARK_COUNT):
+            if index in _STANDING_POSE:
+                x, y = _STANDING_POSE[index]
+                visibility = 0.99
+            else:
+                x, y = _STANDING_POSE[0]
+                visibility = 0.1
+            landmarks.append(SimpleNamespace(
+                x=x + shift_x + self._random.uniform(-self.jitter, self.jitter),
+                y=y + self._random.uniform(-self.jitter, self.jitter),
+                z=0.0,
+                visibility=visibility
+            ))
+        return landmarks
+
+    def close(self):
+        pass
+
+
+class StubMultiPose(StubPose):
+    """Stand-in for the multi-pose landmarker: `people` standing poses side by side.
+
+    Poses come back in a shuffled order each frame, as a detector gives no ordering
+    guarantee, so the person tracker is exercised too.
+    """
+
+    def __init__(self, people: int = 2, latency_ms: float = 0.0, jitter: float = 0.01,
+                 seed: Optional[int] = None):
+        super().__init__(latency_ms, jitter, seed)
+        self.people = people
+
+    def detect(self, image) -> List[List[SimpleNamespace]]:
+        if self.latency:
+            time.sleep(self.latency)
+        # Spread people evenly across the frame around the single pose's position
+        centre = _STANDING_POSE[0][0]
+        poses = [self._standing((person + 0.5) / self.people - centre) for person in range(self.people)]
+        self._random.shuffle(poses)
+        return poses
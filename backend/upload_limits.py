@@ -0,0 +1,70 @@
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+
+class UploadLimits:
+    """Maximum request body size per path, with a default for every other path (0 = unlimited)."""
+
+    def __init__(self, default: int, per_path: Optional[Dict[str, int]] = None):
+        self.default = default
+        self.per_path = dict(per_path or {})
+        self.stats = {'rejected_declared': 0, 'rejected_streamed': 0}
+
+    def limit_for(self, path: str) -> int:
+        return self.per_path.get(path, self.default)
+
+    def get_stats(self) -> Dict:
+        return {"default": self.default, "per_path": self.per_path, **self.stats}
+
+
+def _too_large(limit: int) -> str:
+    return f"Request body exceeds the {limit} byte limit for this endpoint"
+
+
+class UploadLimitMiddleware:
+    """Rejects oversized request bodies with 413 before the application reads them.
+
+    A Content-Length over the limit is refused without reading any of the body;
+    bodies without one are counted as they stream in and cut off at the limit, so
+    multipart parsing never spools more than the limit.
+    """
+
+    def __init__(self, app, limits: UploadLimits):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limit = self.limits.limit_for(scope["path"])
+        if not limit:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > limit:
+                    self.limits.stats['rejected_declared'] += 1
+                    response = JSONResponse({"detail": _too_large(limit)}, status_code=413,
+                                            headers={"Connection": "close"})
+                    await response(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    self.limits.stats['rejected_streamed'] += 1
+                    # FastAPI re-raises HTTPExceptions from body parsing, so this becomes the 413
+                    raise HTTPException(status_code=413, detail=_too_large(limit))
+            return message
+
+        await self.app(scope, limited_receive, send)
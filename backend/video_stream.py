@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional, Tuple, Union
+
+import cv2
+
+from posture_analyzer import PostureAnalyzer
+
+logger = logging.getLogger(__name__)
+
+MJPEG_BOUNDARY = "frame"
+MJPEG_MEDIA_TYPE = f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}"
+
+
+def parse_source(source: str) -> Union[int, str]:
+    """Device indices are given as plain integers; anything else is a URL or file path."""
+    return int(source) if source.strip().isdigit() else source
+
+
+class LiveVideoStream:
+    """Server-side capture loop that analyzes, annotates and encodes each frame once.
+
+    Frames are captured and processed on a background thread. Every encoded frame is
+    published as one ready-made multipart part; viewers always take the newest part,
+    so a slow viewer skips frames instead of queueing them. While nobody is watching
+    the loop only grabs frames to keep live sources current.
+    """
+
+    def __init__(self, source: Union[int, str], analyzer: Optional[PostureAnalyzer] = None,
+                 jpeg_quality: int = 80, loop_file: bool = True, reconnect_delay: float = 2.0):
+        self.source = source
+        self.analyzer = analyzer or PostureAnalyzer()
+        self.jpeg_quality = jpeg_quality
+        self.loop_file = loop_file
+        self.reconnect_delay = reconnect_delay
+        self.viewers = 0
+        self.stats = {'frames_captured': 0, 'frames_encoded': 0, 'frames_sent': 0,
+                      'frames_skipped': 0, 'reconnects': 0}
+        self._fps_counter = deque(maxlen=30)
+        self._frame: Optional[Tuple[int, bytes]] = None
+        self._frame_event: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start capturing; must be called from the event loop that serves viewers."""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._frame_event = asyncio.Event()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._capture_loop, name="live-video-stream", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        """Stop capturing and end all viewer streams."""
+        self._stopping.set()
+        if self._thread is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._thread.join)
+            self._thread = None
+        if self._frame_event is not None:
+            self._frame_event.set()
+
+    def _open(self) -> Optional[cv2.VideoCapture]:
+        capture = cv2.VideoCapture(self.source)
+        if not capture.isOpened():
+            capture.release()
+            return None
+        return capture
+
+    def _capture_loop(self):
+        is_file = isinstance(self.source, str) and "://" not in self.source
+        capture = None
+        sequence = 0
+        frame_interval = 0.0
+        next_frame_time = time.monotonic()
+
+        while not self._stopping.is_set():
+            if capture is None:
+                capture = self._open()
+                if capture is None:
+                    logger.warning(f"Video source {self.source!r} unavailable, retrying in {self.reconnect_delay}s")
+                    self._stopping.wait(self.reconnect_delay)
+                    continue
+                # Files are read as fast as the decoder allows, so pace them at their own frame rate
+                fps = capture.get(cv2.CAP_PROP_FPS) if is_file else 0
+                frame_interval = 1.0 / fps if fps and fps > 0 else 0.0
+
+            if frame_interval:
+                delay = next_frame_time - time.monotonic()
+                if delay > 0:
+                    self._stopping.wait(delay)
+                next_frame_time = max(next_frame_time + frame_interval, time.monotonic() - frame_interval)
+
+            if self.viewers == 0:
+                # Keep the source drained without decoding or analyzing
+                ok = capture.grab()
+                image = None
+            else:
+                ok, image = capture.read()
+
+            if not ok:
+                if is_file and self.loop_file and capture.set(cv2.CAP_PROP_POS_FRAMES, 0):
+                    continue
+                capture.release()
+                capture = None
+                self.stats['reconnects'] += 1
+                self._stopping.wait(self.reconnect_delay)
+                continue
+
+            self.stats['frames_captured'] += 1
+            if image is None:
+                continue
+
+            try:
+                part = self._process(image)
+            except Exception as e:
+                logger.error(f"Live stream frame failed: {e}")
+                continue
+            sequence += 1
+            self._loop.call_soon_threadsafe(self._publish, sequence, part)
+
+        if capture is not None:
+            capture.release()
+
+    def _process(self, image) -> bytes:
+        """Run the analyze/draw pipeline and return the encoded multipart part."""
+        frame_start_time = time.time()
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        landmarks = self.analyzer.detect_landmarks(image_rgb)
+
+        if landmarks is None:
+            cv2.putText(image, "No pose detected", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
+        else:
+            analysis = self.analyzer.analyze_posture_comprehensive(landmarks)
+            if analysis is not None:
+                self.analyzer.update_session_stats(analysis)
+
+            self.analyzer.draw_enhanced_skeleton(image, landmarks)
+
+            frame_end_time = time.time()
+            if frame_end_time > frame_start_time:
+                self._fps_counter.append(1.0 / (frame_end_time - frame_start_time))
+            if analysis is not None:
+                avg_fps = sum(self._fps_counter) / len(self._fps_counter) if self._fps_counter else 0
+                self.analyzer.draw_enhanced_ui(image, analysis, {"fps": avg_fps,
+                                                                 "frame_count": self.stats['frames_encoded'] + 1})
+
+        _, img_encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        jpeg = img_encoded.tobytes()
+        self.stats['frames_encoded'] += 1
+        header = (f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                  f"Content-Length: {len(jpeg)}\r\n\r\n").encode("ascii")
+        return header + jpeg + b"\r\n"
+
+    def _publish(self, sequence: int, part: bytes):
+        # Runs on the event loop: replace the latest frame and wake every waiting viewer
+        self._frame = (sequence, part)
+        event, self._frame_event = self._frame_event, asyncio.Event()
+        event.set()
+
+    async def parts(self) -> AsyncIterator[bytes]:
+        """Yield multipart parts for one viewer, always skipping to the newest frame."""
+        self.viewers += 1
+        last_sequence = 0
+        try:
+            while self.running:
+                frame = self._frame
+                if frame is None or frame[0] == last_sequence:
+                    await self._frame_event.wait()
+                    continue
+                if last_sequence:
+                    self.stats['frames_skipped'] += frame[0] - last_sequence - 1
+                last_sequence = frame[0]
+                yield frame[1]
+                self.stats['frames_sent'] += 1
+        finally:
+            self.viewers -= 1
+            if self.viewers == 0:
+                # Unwatched frames stop being produced; don't show a stale one to the next viewer
+                self._frame = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"source": str(self.source), "running": self.running, "viewers": self.viewers, **self.stats}
@@ -0,0 +1,11 @@
+import os
+import sys
+from pathlib import Path
+
+# Backend modules import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# In-process Mongo and synthetic landmarks, so the API runs without mongod or the pose model
+os.environ.setdefault("MONGO_URL", "memory://")
+os.environ.setdefault("DB_NAME", "physiolens_test")
+os.environ.setdefault("POSE_BACKEND", "stub")
@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+import pytest
+
+import server
+from admission import AdmissionController, AdmissionRejected
+
+
+async def _hold(controller, client_id, release: asyncio.Event, admitted: list):
+    async with controller.admit(client_id):
+        admitted.append(client_id)
+        await release.wait()
+
+
+async def _request(controller, client_id, admitted: list):
+    try:
+        async with controller.admit(client_id):
+            admitted.append(client_id)
+        return "ok"
+    except AdmissionRejected as e:
+        return e
+
+
+def test_newer_frame_supersedes_the_queued_one():
+    async def run():
+        controller = AdmissionController(1, max_queue=4, queue_timeout=5)
+        release, admitted = asyncio.Event(), []
+        holder = asyncio.create_task(_hold(controller, "a", release, admitted))
+        await asyncio.sleep(0)
+        first = asyncio.create_task(_request(controller, "b", admitted))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(_request(controller, "b", admitted))
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(holder, first, second)
+        return controller, admitted, results
+
+    controller, admitted, (_, first, second) = asyncio.run(run())
+    assert isinstance(first, AdmissionRejected)
+    assert (first.reason, first.retry_after) == ("superseded", 0)
+    assert second == "ok"
+    assert admitted == ["a", "b"]
+    assert controller.stats['superseded'] == 1
+    assert controller.in_flight == 0 and not controller._waiting
+
+
+def test_full_queue_is_shed_with_retry_after():
+    async def run():
+        controller = AdmissionController(1, max_queue=1, queue_timeout=5)
+        release, admitted = asyncio.Event(), []
+        holder = asyncio.create_task(_hold(controller, "a", release, admitted))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(_request(controller, "b", admitted))
+        await asyncio.sleep(0)
+        rejected = await _request(controller, "c", admitted)
+        release.set()
+        await asyncio.gather(holder, queued)
+        return controller, rejected, queued.result()
+
+    controller, rejected, queued = asyncio.run(run())
+    assert rejected.reason == "queue_full"
+    assert rejected.retry_after >= 1
+    assert queued == "ok"
+    assert controller.stats['shed_queue_full'] == 1
+
+
+def test_queue_timeout_is_shed_with_retry_after():
+    async def run():
+        controller = AdmissionController(1, max_queue=4, queue_timeout=0.02)
+        release, admitted = asyncio.Event(), []
+        holder = asyncio.create_task(_hold(controller, "a", release, admitted))
+        await asyncio.sleep(0)
+        rejected = await _request(controller, "b", admitted)
+        release.set()
+        await holder
+        return controller, rejected
+
+    controller, rejected = asyncio.run(run())
+    assert rejected.reason == "deadline"
+    assert rejected.retry_after >= 1
+    assert controller.stats['shed_deadline'] == 1
+    assert controller.in_flight == 0 and not controller._waiting
+
+
+def test_free_slot_goes_to_the_client_with_fewest_in_flight():
+    async def run():
+        controller = AdmissionController(2, max_queue=4, queue_timeout=5)
+        release_a, release_b, admitted = asyncio.Event(), asyncio.Event(), []
+        holders = [asyncio.create_task(_hold(controller, "a", release_a, admitted)),
+                   asyncio.create_task(_hold(controller, "b", release_b, admitted))]
+        await asyncio.sleep(0)
+        # "a" queues first, but "c" has nothing in flight
+        waiting = [asyncio.create_task(_request(controller, "a", admitted)),
+                   asyncio.create_task(_request(controller, "c", admitted))]
+        await asyncio.sleep(0)
+        release_b.set()
+        await holders[1]
+        await asyncio.sleep(0)
+        release_a.set()
+        await asyncio.gather(holders[0], *waiting)
+        return admitted
+
+    assert asyncio.run(run()) == ["a", "b", "c", "a"]
+
+
+def test_rejection_maps_to_503_with_retry_after():
+    response = asyncio.run(server.admission_rejected_handler(None, AdmissionRejected("deadline", 3)))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert json.loads(response.body) == {"detail": "Inference busy (deadline)"}
@@ -0,0 +1,145 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from pymongo.errors import ConnectionFailure
+
+import circuit_breaker
+import server
+from circuit_breaker import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker, CircuitOpenError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # Only the breaker sees the fake clock; the event loop keeps real time
+    monkeypatch.setattr(circuit_breaker, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+class Probe:
+    def __init__(self):
+        self.healthy = False
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if not self.healthy:
+            raise ConnectionFailure("still down")
+
+
+async def _fail(breaker, exc=ConnectionFailure("down")):
+    try:
+        async with breaker:
+            raise exc
+    except type(exc):
+        pass
+
+
+def test_closed_open_half_open_closed(clock):
+    async def run():
+        probe = Probe()
+        breaker = CircuitBreaker("db", probe, failure_threshold=3, reset_timeout=10,
+                                 failure_types=(ConnectionFailure,))
+        for _ in range(2):
+            await _fail(breaker)
+        assert breaker.state == STATE_CLOSED
+
+        await _fail(breaker)
+        assert breaker.state == STATE_OPEN
+        with pytest.raises(CircuitOpenError) as error:
+            async with breaker:
+                pass
+        assert error.value.retry_after == 10
+        assert probe.calls == 0
+
+        # After the reset timeout one call starts a probe and still fails fast
+        clock.now += 10
+        with pytest.raises(CircuitOpenError):
+            async with breaker:
+                pass
+        assert breaker.state == STATE_HALF_OPEN
+        await breaker._probe_task
+        assert breaker.state == STATE_OPEN and probe.calls == 1
+
+        # A failed probe keeps it open for another reset timeout
+        clock.now += 5
+        with pytest.raises(CircuitOpenError) as error:
+            async with breaker:
+                pass
+        assert error.value.retry_after == 5
+        assert probe.calls == 1
+
+        clock.now += 5
+        probe.healthy = True
+        with pytest.raises(CircuitOpenError):
+            async with breaker:
+                pass
+        await breaker._probe_task
+        assert breaker.state == STATE_CLOSED
+        async with breaker:
+            pass
+        return breaker
+
+    breaker = asyncio.run(run())
+    assert breaker.stats['opened'] == 1
+    assert breaker.stats['probes'] == 2
+    assert breaker.consecutive_failures == 0
+
+
+def test_only_failure_types_count(clock):
+    async def run():
+        breaker = CircuitBreaker("db", Probe(), failure_threshold=1, failure_types=(ConnectionFailure,))
+        await _fail(breaker, ValueError("bad query"))
+        return breaker
+
+    breaker = asyncio.run(run())
+    assert breaker.state == STATE_CLOSED
+    assert breaker.stats['failures'] == 0
+
+
+def test_success_resets_the_failure_count(clock):
+    async def run():
+        breaker = CircuitBreaker("db", Probe(), failure_threshold=2, failure_types=(ConnectionFailure,))
+        await _fail(breaker)
+        async with breaker:
+            pass
+        await _fail(breaker)
+        return breaker
+
+    assert asyncio.run(run()).state == STATE_CLOSED
+
+
+@pytest.fixture
+def open_database_breaker():
+    breaker = server.database.breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(ConnectionFailure("down"))
+    # Keep the breaker from probing (and closing) during the test
+    reset_timeout, breaker.reset_timeout = breaker.reset_timeout, 3600
+    yield breaker
+    breaker.reset_timeout = reset_timeout
+    breaker.state = STATE_CLOSED
+    breaker.consecutive_failures = 0
+
+
+def test_open_breaker_reaches_the_api(open_database_breaker):
+    with TestClient(server.app) as client:
+        health = client.get("/api/health/database").json()["breaker"]
+        assert health["state"] == STATE_OPEN
+        assert health["retry_after_seconds"] > 0
+        assert health["last_error"] == "ConnectionFailure: down"
+
+        response = client.get("/api/sessions/export")
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) > 0
+        assert response.json() == {"detail": "MongoDB unavailable (circuit open)"}
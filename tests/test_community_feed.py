@@ -0,0 +1,168 @@
+import asyncio
+import base64
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import community_feed
+import server
+from community_feed import FeedCache, decode_cursor, encode_cursor, feed_key, normalize_timestamp
+from database import Database
+from schemas import CommunityPost
+
+BASE = datetime(2026, 3, 1, 12, 0, 0)
+
+
+def _post(post_id: str, seconds: float = 0) -> CommunityPost:
+    return CommunityPost(id=post_id, user_id="u", author="A", avatar="", content=post_id,
+                         timestamp=BASE + timedelta(seconds=seconds))
+
+
+def _feed_order(posts):
+    return [post.id for post in sorted(posts, key=feed_key, reverse=True)]
+
+
+async def _walk(database: Database, limit: int):
+    ids, cursor = [], None
+    while True:
+        page, cursor = await database.get_community_page(limit, cursor)
+        ids.extend(post.id for post in page)
+        if cursor is None:
+            return ids
+
+
+async def _database(posts, **options) -> Database:
+    database = Database("memory://", "feed_test", **options)
+    for post in posts:
+        await database.create_post(post)
+    return database
+
+
+def test_cursor_round_trip():
+    post = _post("p-1", 0.123456)
+    cursor = encode_cursor(post)
+    assert "=" not in cursor
+    # Millisecond precision, as MongoDB stores it
+    assert decode_cursor(cursor) == (BASE + timedelta(milliseconds=123), "p-1")
+    assert decode_cursor(cursor) == feed_key(post)
+
+
+def test_timestamps_normalize_to_naive_utc_milliseconds():
+    aware = datetime(2026, 3, 1, 14, 0, 0, 999999, tzinfo=timezone(timedelta(hours=2)))
+    assert normalize_timestamp(aware) == datetime(2026, 3, 1, 12, 0, 0, 999000)
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not a cursor!",
+    base64.urlsafe_b64encode(b"[1, 2]").decode(),
+    base64.urlsafe_b64encode(b'["1", "id"]').decode(),
+    base64.urlsafe_b64encode(b'{"a": 1}').decode(),
+    base64.urlsafe_b64encode(b"[1e400, \"id\"]").decode(),
+    base64.urlsafe_b64encode(b"[99999999999999999999, \"id\"]").decode(),
+])
+def test_malformed_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError, match="Invalid feed cursor"):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("cache_size", [3, 100])
+def test_pages_break_timestamp_ties_by_id(cache_size):
+    # Five posts share each timestamp: pages must neither skip nor repeat them
+    posts = [_post(f"p-{index:02d}", index // 5) for index in range(23)]
+
+    async def run():
+        database = await _database(posts[::-1], feed_cache_size=cache_size)
+        return [await _walk(database, limit) for limit in (1, 2, 4, 7, 50)]
+
+    for ids in asyncio.run(run()):
+        assert ids == _feed_order(posts)
+
+
+def test_cached_and_queried_pages_agree():
+    posts = [_post(f"p-{index:02d}", index // 3) for index in range(12)]
+
+    async def run():
+        cached = await _database(posts, feed_cache_size=100)
+        queried = await _database(posts, feed_cache_size=100, feed_cache_ttl=0)
+        return await _walk(cached, 5), await _walk(queried, 5), cached.feed.stats, queried.feed.stats
+
+    cached_ids, queried_ids, cached_stats, queried_stats = asyncio.run(run())
+    assert cached_ids == queried_ids == _feed_order(posts)
+    assert cached_stats["hits"] == 3 and cached_stats["loads"] == 1
+    assert queried_stats["hits"] == 0
+
+
+def test_new_post_shows_on_the_cached_first_page():
+    posts = [_post(f"p-{index:02d}", index) for index in range(5)]
+
+    async def run():
+        database = await _database(posts)
+        first, _ = await database.get_community_page(3)
+        loads = database.feed.stats["loads"]
+        await database.create_post(_post("p-new", 60))
+        await database.like_post("p-03")
+        after, cursor = await database.get_community_page(3)
+        rest, _ = await database.get_community_page(3, cursor)
+        return first, after, rest, database.feed.stats["loads"] - loads
+
+    first, after, rest, extra_loads = asyncio.run(run())
+    assert [post.id for post in first] == ["p-04", "p-03", "p-02"]
+    assert [post.id for post in after] == ["p-new", "p-04", "p-03"]
+    assert after[2].likes == 1
+    assert [post.id for post in rest] == ["p-02", "p-01", "p-00"]
+    # Served from the updated cache, without reloading it
+    assert extra_loads == 0
+
+
+def test_full_cache_keeps_the_newest_posts():
+    cache = FeedCache(capacity=3, ttl=60)
+    cache.load([_post("p-2", 2), _post("p-1", 1), _post("p-0", 0)], cache.writes)
+    assert cache.get_stats()["complete"] is False
+    cache.add(_post("p-3", 3))
+    cache.add(_post("p-old", -10))
+    page, cursor = cache.page(3)
+    assert [post.id for post in page] == ["p-3", "p-2", "p-1"]
+    assert decode_cursor(cursor) == feed_key(page[-1])
+    # The next page reaches past the cached head, so it goes to the database
+    assert cache.page(3, decode_cursor(cursor)) is None
+
+
+def test_load_overlapping_a_write_is_discarded():
+    cache = FeedCache(capacity=10, ttl=60)
+    writes_at_start = cache.writes
+    cache.add(_post("p-new", 5))
+    cache.load([_post("p-0", 0)], writes_at_start)
+    assert cache.page(5) is None
+    assert cache.get_stats()["loads"] == 0
+
+
+def test_expired_cache_misses(monkeypatch):
+    cache = FeedCache(capacity=10, ttl=30)
+    now = [100.0]
+    monkeypatch.setattr(community_feed, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    cache.load([_post("p-0")], cache.writes)
+    assert cache.page(5) is not None
+    now[0] = 130.0
+    assert cache.page(5) is None
+
+
+def test_feed_endpoint():
+    with TestClient(server.app) as client:
+        created = {client.post("/api/community/posts", json={"author": "A", "avatar": "", "content": "new"}).json()["id"]
+                   for _ in range(3)}
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            page = client.get("/api/community/feed", params=params).json()
+            assert len(page["posts"]) <= 2
+            seen.extend(post["id"] for post in page["posts"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert len(seen) == len(set(seen))
+        assert created <= set(seen)
+        assert client.get("/api/community/feed", params={"cursor": "bogus"}).status_code == 400
+        assert client.get("/api/community/feed", params={"limit": 0}).status_code == 400
@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+import cv2
+import msgpack
+import numpy as np
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.testclient import TestClient
+
+import server
+from fast_response import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, encode_model, negotiate_media_type
+from inference_pool import MODE_ANALYZE, MODE_JSON, InferencePool
+from posture_analyzer import PostureAnalyzer
+from schemas import AnalysisResponse, PostureAnalysisResult
+
+FRAME = np.full((240, 320, 3), 120, np.uint8)
+JPEG = cv2.imencode(".jpg", FRAME)[1].tobytes()
+
+
+def _response_field(path):
+    return next(route for route in server.app.routes if getattr(route, "path", None) == path).response_field
+
+
+def _validated_body(path, content) -> bytes:
+    """Body FastAPI produces when it validates `content` against the route's response_model."""
+    return JSONResponse(asyncio.run(serialize_response(field=_response_field(path), response_content=content))).body
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(server.app) as client:
+        yield client
+
+
+@pytest.fixture
+def analyzer():
+    analyzer = PostureAnalyzer()
+    yield analyzer
+    analyzer.pose.close()
+
+
+def _analysis(analyzer):
+    landmarks = analyzer.detect_landmarks(cv2.cvtColor(FRAME, cv2.COLOR_BGR2RGB))
+    return analyzer.analyze_posture_comprehensive(landmarks)
+
+
+def test_constructed_analysis_encodes_like_response_model(analyzer):
+    analysis = _analysis(analyzer)
+    assert encode_model(analysis) == _validated_body("/api/analyze", analysis)
+
+
+def test_constructed_live_response_encodes_like_response_model(analyzer):
+    cursor = analyzer.history_sequence
+    for _ in range(3):
+        analysis = _analysis(analyzer)
+        analyzer.update_session_stats(analysis)
+    for response in (analyzer.build_analysis_response(analysis),
+                     analyzer.build_analysis_response(analysis, history_cursor=cursor)):
+        assert encode_model(response) == _validated_body("/api/analyze_frame_json", response)
+    assert analyzer.build_analysis_response(analysis, history_cursor=cursor).history_delta
+
+
+def test_msgpack_carries_the_json_values(analyzer):
+    analysis = _analysis(analyzer)
+    response = analyzer.build_analysis_response(analysis)
+    for model in (analysis, response):
+        assert msgpack.unpackb(encode_model(model, MSGPACK_MEDIA_TYPE)) == json.loads(encode_model(model))
+
+
+def test_accept_negotiation():
+    assert negotiate_media_type(None) == JSON_MEDIA_TYPE
+    assert negotiate_media_type("application/json") == JSON_MEDIA_TYPE
+    assert negotiate_media_type("application/x-msgpack, application/json;q=0.5") == MSGPACK_MEDIA_TYPE
+    assert negotiate_media_type("application/msgpack;q=0") == JSON_MEDIA_TYPE
+
+
+@pytest.mark.parametrize("path", ["/api/analyze", "/api/analyze_frame_json"])
+def test_endpoint_body_matches_response_model(client, path):
+    response = client.post(path, files={"file": ("frame.jpg", JPEG, "image/jpeg")})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == JSON_MEDIA_TYPE
+    assert response.content == _validated_body(path, json.loads(response.content))
+
+
+@pytest.mark.parametrize("path, model", [("/api/analyze", PostureAnalysisResult),
+                                         ("/api/analyze_frame_json", AnalysisResponse)])
+def test_endpoint_msgpack_decodes_to_the_same_schema(client, path, model):
+    response = client.post(path, files={"file": ("frame.jpg", JPEG, "image/jpeg")},
+                           headers={"Accept": "application/msgpack"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == MSGPACK_MEDIA_TYPE
+    decoded = msgpack.unpackb(response.content)
+    assert json.loads(_validated_body(path, decoded)) == decoded
+    model.model_validate(decoded)
+
+
+def test_pool_bodies_match_response_model():
+    async def run():
+        pool = InferencePool(1, slots_per_worker=2, max_frame_bytes=FRAME.nbytes)
+        await pool.start()
+        try:
+            analyze = await pool.submit("pool", FRAME, MODE_ANALYZE, {"media_type": JSON_MEDIA_TYPE})
+            live = await pool.submit("pool", FRAME, MODE_JSON, {"media_type": JSON_MEDIA_TYPE})
+            packed = await pool.submit("pool", FRAME, MODE_JSON, {"media_type": MSGPACK_MEDIA_TYPE})
+        finally:
+            await pool.stop()
+        return analyze, live, packed
+
+    analyze, live, packed = asyncio.run(run())
+    assert analyze["pose"] and live["pose"]
+    assert analyze["body"] == _validated_body("/api/analyze", json.loads(analyze["body"]))
+    assert live["body"] == _validated_body("/api/analyze_frame_json", json.loads(live["body"]))
+    decoded = msgpack.unpackb(packed["body"])
+    assert json.loads(_validated_body("/api/analyze_frame_json", decoded)) == decoded
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from frame_buffers import FrameBufferPool, bucket_size
+
+
+@pytest.mark.parametrize("size", [1, 4096, 4097, 65537, 921600, 1048576, 1048577, 6220800, 33177601])
+def test_bucket_slack_is_at_most_an_eighth(size):
+    bucket = bucket_size(size)
+    assert bucket >= size
+    if size > 32768:
+        assert (bucket - size) / size < 0.125
+    else:
+        # Small buffers round up to whole 4 KiB steps
+        assert bucket % 4096 == 0 and bucket - size < 4096
+
+
+def test_bucket_steps():
+    assert bucket_size(1048576) == 1048576
+    assert bucket_size(1048577) == 1179648
+    # Eight buckets between consecutive powers of two
+    assert len({bucket_size(size) for size in range(1048577, 2097153, 4096)}) == 8
+
+
+def test_hits_misses_and_idle_bytes():
+    pool = FrameBufferPool(max_idle_bytes=1 << 20)
+    with pool.lease() as lease:
+        image = lease.array((240, 320, 3))
+        assert image.shape == (240, 320, 3) and image.dtype == np.uint8
+        lease.array((240, 320, 3))
+    stats = pool.get_stats()
+    bucket = bucket_size(240 * 320 * 3)
+    assert (stats['hits'], stats['misses']) == (0, 2)
+    assert stats['in_use_bytes'] == 0
+    assert stats['idle_bytes'] == 2 * bucket
+    assert stats['peak_in_use_bytes'] == 2 * bucket
+    assert stats['buckets'] == {bucket: 2}
+
+    # The same frame size reuses the idle buffers
+    for _ in range(3):
+        with pool.lease() as lease:
+            lease.array((240, 320, 3))
+    stats = pool.get_stats()
+    assert (stats['hits'], stats['misses']) == (3, 2)
+    assert stats['hit_rate'] == 0.6
+    assert stats['buckets'] == {bucket: 2}
+    assert stats['peak_total_bytes'] == 2 * bucket
+
+
+def test_buffers_beyond_the_idle_cap_are_dropped():
+    pool = FrameBufferPool(max_idle_bytes=300 * 1024)
+    lease = pool.lease()
+    first = lease.array((200 * 1024,))
+    lease.array((200 * 1024,))
+    assert pool.get_stats()['in_use_bytes'] == 2 * bucket_size(200 * 1024)
+    lease.close()
+    stats = pool.get_stats()
+    assert stats['dropped'] == 1
+    assert stats['idle_bytes'] == bucket_size(200 * 1024)
+    assert stats['in_use_bytes'] == 0
+    # Closing twice gives nothing back twice
+    lease.close()
+    assert pool.get_stats()['idle_bytes'] == bucket_size(200 * 1024)
+    assert first.base is not None
@@ -0,0 +1,88 @@
+import struct
+
+import cv2
+import numpy as np
+import pytest
+
+from frame_ingest import FrameTooLargeError, decode_frame, frame_shape, jpeg_size, max_frame_bytes, reduction_factor
+
+
+def _jpeg(width, height):
+    image = np.zeros((height, width, 3), np.uint8)
+    image[:, : width // 2] = (255, 0, 0)
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+def _with_orientation(jpeg: bytes, orientation: int) -> bytes:
+    """Insert an EXIF APP1 segment holding only the orientation tag."""
+    ifd = struct.pack("<H", 1) + struct.pack("<HHIHH", 0x0112, 3, 1, orientation, 0) + struct.pack("<I", 0)
+    exif = b"Exif\0\0" + b"II*\0" + struct.pack("<I", 8) + ifd
+    return jpeg[:2] + b"\xff\xe1" + struct.pack(">H", len(exif) + 2) + exif + jpeg[2:]
+
+
+def test_reduced_decode_scale():
+    frame = decode_frame(_jpeg(800, 400), inference_size=200)
+    assert frame.data.shape[:2] == (100, 200)
+    assert frame.scale == 4.0
+
+
+def test_reduced_decode_scale_rounds_up():
+    frame = decode_frame(_jpeg(801, 401), inference_size=200)
+    # libjpeg rounds 801 / 4 up to 201
+    assert frame.data.shape[1] == 201
+    assert frame.scale == pytest.approx(801 / 201)
+
+
+@pytest.mark.parametrize("orientation", [6, 8])
+def test_exif_rotated_jpeg_keeps_scale(orientation):
+    contents = _with_orientation(_jpeg(800, 400), orientation)
+    assert jpeg_size(contents) == (800, 400)
+    frame = decode_frame(contents, inference_size=200)
+    # Portrait after rotation: width and height swap, the scale does not
+    assert frame.data.shape[:2] == (200, 100)
+    assert frame.scale == 4.0
+    assert decode_frame(contents).data.shape[:2] == (800, 400)
+
+
+def test_raw_frames_validate_size():
+    rgb = np.zeros((4, 6, 3), np.uint8)
+    frame = decode_frame(rgb.tobytes(), "rgb", 6, 4)
+    assert frame.rgb().shape == (4, 6, 3)
+    assert frame.bgr().shape == (4, 6, 3)
+    with pytest.raises(ValueError):
+        decode_frame(rgb.tobytes()[:-1], "rgb", 6, 4)
+    with pytest.raises(ValueError):
+        decode_frame(np.zeros(6 * 3 * 3 // 2, np.uint8).tobytes(), "i420", 6, 3)
+
+
+def test_max_pixels_picks_a_reduced_decode():
+    assert reduction_factor(3840, 2160, None, 1920 * 1080) == 2
+    assert reduction_factor(3840, 2160, 1000, 1920 * 1080) == 2
+    # inference_size asks for more reduction than the limit needs
+    assert reduction_factor(3840, 2160, 400, 1920 * 1080) == 8
+    # libjpeg rounds reduced sizes up, so 1/2 of 3841x2161 no longer fits
+    assert reduction_factor(3841, 2161, None, 1920 * 1080) == 4
+    with pytest.raises(FrameTooLargeError):
+        reduction_factor(100000, 100000, None, 1920 * 1080)
+
+    frame = decode_frame(_jpeg(800, 400), max_pixels=200 * 100)
+    assert frame.data.shape[:2] == (100, 200)
+    assert frame.scale == 4.0
+    assert decode_frame(_jpeg(800, 400), max_pixels=800 * 400).scale == 1.0
+
+
+def test_max_pixels_rejects_other_images():
+    png = cv2.imencode(".png", np.zeros((400, 800, 3), np.uint8))[1].tobytes()
+    with pytest.raises(FrameTooLargeError):
+        decode_frame(png, max_pixels=800 * 400 - 1)
+    assert decode_frame(png, max_pixels=800 * 400).data.shape == (400, 800, 3)
+
+
+@pytest.mark.parametrize("frame_format", ["rgb", "rgba", "nv12", "i420"])
+def test_raw_frames_within_max_pixels_fit_a_slot(frame_format):
+    shape = frame_shape(frame_format, 1920, 1080)
+    contents = np.zeros(shape, np.uint8).tobytes()
+    frame = decode_frame(contents, frame_format, 1920, 1080, max_pixels=1920 * 1080)
+    assert frame.data.nbytes <= max_frame_bytes(1920 * 1080)
+    with pytest.raises(FrameTooLargeError):
+        decode_frame(contents, frame_format, 1920, 1080, max_pixels=1920 * 1080 - 1)
@@ -0,0 +1,136 @@
+import asyncio
+import json
+
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from fast_response import JSON_MEDIA_TYPE
+from inference_pool import MODE_JSON, InferencePool
+from posture_analyzer import HistorySeries, PostureAnalyzer
+
+FRAME = np.zeros((240, 320, 3), np.uint8)
+JPEG = cv2.imencode(".jpg", FRAME)[1].tobytes()
+
+
+@pytest.fixture
+def analyzer():
+    analyzer = PostureAnalyzer()
+    yield analyzer
+    analyzer.pose.close()
+
+
+def _analyze(analyzer, frames=1):
+    for _ in range(frames):
+        analysis = analyzer.analyze_posture_comprehensive(analyzer.detect_landmarks(FRAME))
+        analyzer.update_session_stats(analysis)
+    return analysis
+
+
+def test_history_series_numbers_samples_and_tracks_evictions():
+    sequence = [10]
+    first, second = HistorySeries(3, sequence), HistorySeries(3, sequence)
+    first.append(1.0)
+    second.append(2.0)
+    first.append(3.0)
+    assert list(first.sequence_numbers) == [11, 13]
+    assert first.since(10) == [1.0, 3.0]
+    assert first.since(11) == [3.0]
+    assert first.since(13) == []
+    for value in (4.0, 5.0):
+        first.append(value)
+    # Sample 11 was evicted, so a cursor before it can no longer be served as a delta
+    assert first.evicted_through == 11
+    assert first.since(10) is None
+    assert first.since(11) == [3.0, 4.0, 5.0]
+
+
+def test_one_sample_per_frame(analyzer):
+    _analyze(analyzer, 3)
+    assert len(analyzer.posture_history) == 3
+    assert all(len(history) == 3 for history in analyzer.angle_history.values())
+
+
+def test_delta_since_cursor(analyzer):
+    analysis = _analyze(analyzer, 2)
+    cursor = analyzer.build_analysis_response(analysis).history_sequence
+
+    analysis = _analyze(analyzer)
+    response = analyzer.build_analysis_response(analysis, cursor)
+    assert response.history_delta
+    assert response.posture_history == [float(analysis.score)]
+    assert {name: len(values) for name, values in response.angle_history.items()} == \
+        {'neck': 1, 'shoulder': 1, 'hip': 1, 'knee': 1}
+    assert response.history_sequence > cursor
+
+    # Nothing new since the latest sequence
+    unchanged = analyzer.build_analysis_response(analysis, response.history_sequence)
+    assert unchanged.history_delta and unchanged.posture_history == []
+    assert unchanged.history_sequence == response.history_sequence
+
+
+def test_cursor_older_than_the_window_resyncs(analyzer):
+    analysis = _analyze(analyzer)
+    cursor = analyzer.build_analysis_response(analysis).history_sequence
+    # The angle histories keep 50 samples: after 50 more frames every sample newer than
+    # the cursor is still there, one more evicts the first of them
+    analysis = _analyze(analyzer, 50)
+    assert analyzer.build_analysis_response(analysis, cursor).history_delta
+    analysis = _analyze(analyzer)
+    response = analyzer.build_analysis_response(analysis, cursor)
+    assert not response.history_delta
+    assert len(response.posture_history) == 52
+    assert all(len(values) == 50 for values in response.angle_history.values())
+
+
+@pytest.mark.parametrize("offset", [1, 10 ** 6])
+def test_cursor_ahead_of_the_session_resyncs(analyzer, offset):
+    analysis = _analyze(analyzer, 2)
+    response = analyzer.build_analysis_response(analysis, analyzer.history_sequence + offset)
+    assert not response.history_delta
+    assert len(response.posture_history) == 2
+
+
+def test_negative_cursor_resyncs(analyzer):
+    analysis = _analyze(analyzer)
+    assert not analyzer.build_analysis_response(analysis, -1).history_delta
+
+
+def test_endpoint_returns_one_new_sample_per_frame():
+    with TestClient(server.app) as client:
+        def post(**params):
+            response = client.post("/api/analyze_frame_json", params=params,
+                                   files={"file": ("frame.jpg", JPEG, "image/jpeg")})
+            assert response.status_code == 200
+            return response.json()
+
+        cursor = post()["history_sequence"]
+        for _ in range(3):
+            body = post(history_cursor=cursor)
+            assert body["history_delta"]
+            assert len(body["posture_history"]) == 1
+            cursor = body["history_sequence"]
+
+
+def test_pool_returns_one_new_sample_per_frame():
+    async def run():
+        pool = InferencePool(1, slots_per_worker=1, max_frame_bytes=FRAME.nbytes)
+        await pool.start()
+        try:
+            bodies = []
+            cursor = None
+            for _ in range(3):
+                payload = await pool.submit("delta", FRAME, MODE_JSON,
+                                            {"history_cursor": cursor, "media_type": JSON_MEDIA_TYPE})
+                bodies.append(json.loads(payload["body"]))
+                cursor = bodies[-1]["history_sequence"]
+            return bodies
+        finally:
+            await pool.stop()
+
+    first, second, third = asyncio.run(run())
+    assert not first["history_delta"] and len(first["posture_history"]) == 1
+    assert second["history_delta"] and len(second["posture_history"]) == 1
+    assert third["history_delta"] and len(third["posture_history"]) == 1
@@ -0,0 +1,151 @@
+import gzip
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+import http_cache
+import server
+from http_cache import (VersionStamps, compressed_response, etag_matches, make_etag, negotiate_encoding,
+                        not_modified)
+
+FAKE_BROTLI = SimpleNamespace(compress=lambda body, quality: b"br:" + body)
+
+
+def _request(path="/api/resources", query="", accept_encoding=None):
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query.encode(),
+                    "headers": headers})
+
+
+def test_etag_follows_scope_versions_and_url():
+    stamps = VersionStamps()
+    etag = make_etag(stamps, ["sessions:u"], _request())
+    assert etag.startswith('W/"') and stamps.epoch in etag
+    assert make_etag(stamps, ["sessions:u"], _request()) == etag
+
+    stamps.bump("community_posts")
+    assert make_etag(stamps, ["sessions:u"], _request()) == etag
+    stamps.bump("sessions:u")
+    bumped = make_etag(stamps, ["sessions:u"], _request())
+    assert bumped != etag
+
+    assert make_etag(stamps, ["sessions:u"], _request(query="days=30")) != bumped
+    assert make_etag(stamps, ["sessions:u"], _request(path="/api/progress/chart")) != bumped
+    # Another process (or a restart) has its own epoch
+    assert make_etag(VersionStamps(), ["sessions:u"], _request()) != etag
+
+
+def test_etag_rolls_over_with_max_age(monkeypatch):
+    stamps = VersionStamps()
+    now = [1000.0]
+    monkeypatch.setattr(http_cache, "time", SimpleNamespace(time=lambda: now[0]))
+    etag = make_etag(stamps, ["resources"], _request(), max_age=60)
+    now[0] = 1019.0
+    assert make_etag(stamps, ["resources"], _request(), max_age=60) == etag
+    now[0] = 1020.0
+    assert make_etag(stamps, ["resources"], _request(), max_age=60) != etag
+    assert make_etag(stamps, ["resources"], _request()) == make_etag(stamps, ["resources"], _request(), max_age=0)
+
+
+@pytest.mark.parametrize("if_none_match, expected", [
+    (None, False),
+    ("", False),
+    ("*", True),
+    ('W/"abc"', True),
+    ('"abc"', True),
+    ('"other", W/"abc"', True),
+    ('"other"', False),
+    ('W/"abcd"', False),
+])
+def test_etag_matching_is_weak(if_none_match, expected):
+    assert etag_matches(if_none_match, 'W/"abc"') is expected
+
+
+@pytest.mark.parametrize("accept_encoding, with_brotli, expected", [
+    (None, True, None),
+    ("identity", True, None),
+    ("gzip", True, "gzip"),
+    ("gzip, deflate, br", True, "br"),
+    ("gzip, deflate, br", False, "gzip"),
+    ("br;q=0, gzip;q=0.5", True, "gzip"),
+    ("gzip;q=0", True, None),
+    ("gzip; q=0.0, *;q=1", False, None),
+    ("*", False, "gzip"),
+    ("*;q=0", True, None),
+    ("gzip;q=bogus", True, None),
+    ("GZIP", True, "gzip"),
+])
+def test_encoding_negotiation(monkeypatch, accept_encoding, with_brotli, expected):
+    monkeypatch.setattr(http_cache, "brotli", FAKE_BROTLI if with_brotli else None)
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+def test_compression_threshold_and_headers(monkeypatch):
+    monkeypatch.setattr(http_cache, "brotli", None)
+    body = b'{"items": [' + b"1, " * 600 + b"1]}"
+
+    response = compressed_response(_request(accept_encoding="gzip"), body, "application/json", min_size=len(body))
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert "etag" not in response.headers
+    assert gzip.decompress(response.body) == body
+
+    small = compressed_response(_request(accept_encoding="gzip"), body, "application/json", min_size=len(body) + 1)
+    assert "content-encoding" not in small.headers
+    assert small.body == body
+    assert small.headers["vary"] == "Accept-Encoding"
+
+    identity = compressed_response(_request(), body, "application/json", 'W/"x"', min_size=0)
+    assert identity.body == body and "content-encoding" not in identity.headers
+    assert identity.headers["etag"] == 'W/"x"'
+    assert identity.headers["cache-control"] == "no-cache"
+
+
+def test_brotli_is_used_when_installed(monkeypatch):
+    monkeypatch.setattr(http_cache, "brotli", FAKE_BROTLI)
+    response = compressed_response(_request(accept_encoding="gzip, br"), b"x" * 10, "application/json", min_size=0)
+    assert response.headers["content-encoding"] == "br"
+    assert response.body == b"br:" + b"x" * 10
+
+
+def test_not_modified_carries_validators():
+    response = not_modified('W/"x"')
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == 'W/"x"'
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_conditional_get_on_dashboard_endpoint():
+    with TestClient(server.app) as client:
+        first = client.get("/api/community/posts")
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+
+        cached = client.get("/api/community/posts", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+        assert cached.content == b""
+
+        assert client.get("/api/community/posts?limit=5", headers={"If-None-Match": etag}).status_code == 200
+
+        client.post("/api/community/posts", json={"author": "Tester", "avatar": "", "content": "New post"})
+        changed = client.get("/api/community/posts", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+        assert any(post["content"] == "New post" for post in changed.json())
+
+
+def test_dashboard_bodies_are_gzipped_above_the_threshold(monkeypatch):
+    with TestClient(server.app) as client:
+        monkeypatch.setattr(server, "RESPONSE_COMPRESSION_MIN_BYTES", 0)
+        compressed = client.get("/api/resources", headers={"Accept-Encoding": "gzip"})
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert compressed.headers["vary"] == "Accept-Encoding"
+
+        monkeypatch.setattr(server, "RESPONSE_COMPRESSION_MIN_BYTES", len(compressed.content) + 1)
+        plain = client.get("/api/resources", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in plain.headers
+        assert plain.json() == compressed.json()
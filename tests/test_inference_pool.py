@@ -0,0 +1,200 @@
+import asyncio
+import json
+import os
+import signal
+
+import cv2
+import numpy as np
+import pytest
+
+from fast_response import JSON_MEDIA_TYPE
+from frame_ingest import FrameTooLargeError, max_frame_bytes
+from inference_pool import MODE_ANALYZE, MODE_ANNOTATE, MODE_JSON, InferencePool, WorkerCrashedError
+from landmark_recording import LandmarkRecording
+
+FRAME = np.zeros((240, 320, 3), np.uint8)
+FRAME[:, 160:] = (0, 0, 200)
+
+
+def _run_pool(scenario, workers=1, slots=2, max_frame_bytes=FRAME.nbytes):
+    async def run():
+        pool = InferencePool(workers, slots_per_worker=slots, max_frame_bytes=max_frame_bytes)
+        await pool.start()
+        try:
+            return await scenario(pool)
+        finally:
+            await pool.stop()
+    return asyncio.run(run())
+
+
+def _sessions_on_different_workers(pool):
+    sessions = {}
+    for number in range(100):
+        sessions.setdefault(pool.route(f"session-{number}"), f"session-{number}")
+        if len(sessions) == pool.num_workers:
+            return [sessions[index] for index in range(pool.num_workers)]
+    raise AssertionError("sessions did not spread over the workers")
+
+
+async def _wait_for(condition, timeout=10.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.05)
+
+
+def test_frames_round_trip_through_shared_memory():
+    async def scenario(pool):
+        analyze = await pool.submit("a", FRAME, MODE_ANALYZE, {"media_type": JSON_MEDIA_TYPE})
+        # More concurrent frames than slots: each waits for a free slot
+        annotated = await asyncio.gather(*[pool.submit("a", FRAME, MODE_ANNOTATE) for _ in range(5)])
+        rgb = await pool.submit("a", np.ascontiguousarray(FRAME[..., ::-1]), MODE_ANNOTATE, {"color": "rgb"})
+        return analyze, annotated, rgb, pool.stats()
+
+    analyze, annotated, rgb, stats = _run_pool(scenario)
+    assert analyze["pose"]
+    assert json.loads(analyze["body"])["score"] >= 0
+    for payload in annotated + [rgb]:
+        assert payload["frame"] is not None
+        image = cv2.imdecode(np.frombuffer(payload["jpeg"], np.uint8), cv2.IMREAD_COLOR)
+        assert image.shape == FRAME.shape
+        # The top rows are clear of the overlay and keep the uploaded colours
+        for half in (slice(0, 150), slice(170, 320)):
+            assert np.abs(image[:4, half].mean(axis=(0, 1)) - FRAME[:4, half].mean(axis=(0, 1))).max() < 5
+    [worker] = stats["workers"]
+    assert worker["free_slots"] == 2 and worker["in_flight"] == 0
+
+
+def test_oversized_frame_is_rejected_without_taking_a_slot():
+    async def scenario(pool):
+        with pytest.raises(FrameTooLargeError):
+            await pool.submit("a", np.zeros((241, 320, 3), np.uint8), MODE_ANALYZE)
+        return pool.stats()
+
+    [worker] = _run_pool(scenario)["workers"]
+    assert worker["free_slots"] == 2
+
+
+def test_sessions_stick_to_their_worker():
+    async def scenario(pool):
+        first, second = _sessions_on_different_workers(pool)
+        assert pool.route(first) == pool.route(first)
+        counts = []
+        for _ in range(3):
+            for session_id in (first, second):
+                payload = await pool.submit(session_id, FRAME, MODE_JSON, {"media_type": JSON_MEDIA_TYPE})
+                counts.append(json.loads(payload["body"])["session_stats"]["frame_count"])
+        return counts
+
+    # Each session's analyzer lives on one worker and sees only that session's frames
+    assert _run_pool(scenario, workers=2) == [1, 1, 2, 2, 3, 3]
+
+
+def test_crashed_worker_is_reaped_and_respawned(monkeypatch):
+    monkeypatch.setenv("STUB_POSE_LATENCY_MS", "300")
+
+    async def scenario(pool):
+        worker = pool._workers[0]
+        old_process = worker.process
+        in_flight = asyncio.ensure_future(pool.submit("a", FRAME, MODE_ANALYZE))
+        await _wait_for(lambda: worker.pending)
+        os.kill(old_process.pid, signal.SIGKILL)
+        with pytest.raises(WorkerCrashedError):
+            await in_flight
+        await _wait_for(lambda: worker.restarts == 1)
+        payload = await pool.submit("a", FRAME, MODE_ANALYZE)
+        return old_process, worker.process, payload, pool.stats()
+
+    old_process, new_process, payload, stats = _run_pool(scenario)
+    # Joined by the pool, so the exit status is collected rather than left to a zombie
+    assert old_process.exitcode == -signal.SIGKILL
+    assert new_process.pid != old_process.pid
+    assert payload["pose"]
+    [worker] = stats["workers"]
+    assert worker["alive"] and worker["restarts"] == 1
+    assert worker["free_slots"] == 2
+
+
+def test_ending_a_session_closes_its_recording(tmp_path, monkeypatch):
+    monkeypatch.setenv("LANDMARK_RECORDING_DIR", str(tmp_path))
+
+    async def scenario(pool):
+        for _ in range(3):
+            await pool.submit("recorded", FRAME, MODE_JSON)
+        await pool.submit("other", FRAME, MODE_JSON)
+        unflushed = [len(LandmarkRecording(path)) for path in tmp_path.glob("recorded-*.plmk")]
+        pool.end_session("recorded")
+        [path] = tmp_path.glob("recorded-*.plmk")
+        await _wait_for(lambda: len(LandmarkRecording(path)) == 3)
+        # The worker carries on, opening a new analyzer for the session's next frame
+        await pool.submit("recorded", FRAME, MODE_JSON)
+        return unflushed
+
+    assert _run_pool(scenario) == [0]
+
+
+class RecordingPool:
+    """Stands in for a started pool and records what the endpoints submit."""
+
+    def __init__(self):
+        self.frames = []
+
+    async def submit(self, session_id, image, mode, options=None):
+        self.frames.append((image.shape, options))
+        return {"pose": False, "body": None}
+
+
+@pytest.fixture
+def pool_client(monkeypatch):
+    import server
+    from fastapi.testclient import TestClient
+
+    pool = RecordingPool()
+    with TestClient(server.app) as client:
+        monkeypatch.setattr(server, "inference_pool", pool)
+        monkeypatch.setattr(server, "INFERENCE_MAX_FRAME_PIXELS", 320 * 240)
+        yield client, pool
+
+
+def test_pool_mode_decodes_large_jpegs_to_fit(pool_client):
+    client, pool = pool_client
+    jpeg = cv2.imencode(".jpg", np.zeros((960, 1280, 3), np.uint8))[1].tobytes()
+    response = client.post("/api/analyze", files={"file": ("frame.jpg", jpeg, "image/jpeg")})
+    assert response.status_code == 200
+    [(shape, options)] = pool.frames
+    assert shape == (240, 320, 3)
+    assert options["scale"] == 4.0
+
+
+def test_pool_mode_rejects_frames_it_cannot_shrink(pool_client):
+    client, pool = pool_client
+    png = cv2.imencode(".png", np.zeros((480, 640, 3), np.uint8))[1].tobytes()
+    response = client.post("/api/analyze_frame_json", files={"file": ("frame.png", png, "image/png")})
+    assert response.status_code == 413
+    assert "pixel limit" in response.json()["detail"]
+    assert pool.frames == []
+
+
+def test_pool_mode_takes_raw_rgba_up_to_the_limit(pool_client):
+    client, pool = pool_client
+    rgba = np.zeros((240, 320, 4), np.uint8).tobytes()
+    response = client.post("/api/analyze?frame_format=rgba&width=320&height=240",
+                           files={"file": ("frame.raw", rgba, "application/octet-stream")})
+    assert response.status_code == 200
+    [(shape, options)] = pool.frames
+    assert shape == (240, 320, 4) and options["color"] == "rgba"
+
+    larger = np.zeros((240, 322, 4), np.uint8).tobytes()
+    response = client.post("/api/analyze?frame_format=rgba&width=322&height=240",
+                           files={"file": ("frame.raw", larger, "application/octet-stream")})
+    assert response.status_code == 413
+    assert len(pool.frames) == 1
+
+
+def test_slots_hold_a_raw_rgba_frame():
+    rgba = np.zeros((240, 320, 4), np.uint8)
+
+    async def scenario(pool):
+        return await pool.submit("a", rgba, MODE_ANALYZE, {"color": "rgba", "media_type": JSON_MEDIA_TYPE})
+
+    assert _run_pool(scenario, max_frame_bytes=max_frame_bytes(320 * 240))["pose"]
@@ -0,0 +1,127 @@
+import io
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import landmark_recording
+from landmark_recording import LandmarkRecorder, LandmarkRecording, reanalyze, summarize
+from posture_rules import DEFAULT_PROFILE, LANDMARK_NAMES, GradeBand, PostureRule, RuleProfile
+
+
+def _frames(count, seed=0):
+    rng = np.random.default_rng(seed)
+    base = np.array([(322, 80), (312, 78), (332, 78), (290, 150), (350, 151), (285, 230), (355, 230),
+                     (300, 300), (340, 301), (301, 400), (339, 400), (302, 500), (338, 500)], dtype=np.float64)
+    return base + rng.normal(0, 15, size=(count, len(LANDMARK_NAMES), 2))
+
+
+@pytest.fixture
+def recording(tmp_path):
+    points = _frames(10)
+    path = tmp_path / "session.plmk"
+    # Chunks of four leave a partial last chunk, written on close
+    with LandmarkRecorder(path, chunk_frames=4, metadata={"session_id": "s1"}) as recorder:
+        for index, frame in enumerate(points):
+            recorder.append(frame, timestamp=1000.0 + index)
+    return path, points
+
+
+def test_round_trip_through_memmap(recording):
+    path, points = recording
+    reader = LandmarkRecording(path)
+    assert len(reader) == 10
+    assert reader.metadata["session_id"] == "s1"
+    assert reader.metadata["landmarks"] == LANDMARK_NAMES
+    chunks = list(reader.iter_chunks())
+    assert [len(timestamps) for timestamps, _ in chunks] == [4, 4, 2]
+    timestamps = np.concatenate([timestamps for timestamps, _ in chunks])
+    stored = np.concatenate([chunk for _, chunk in chunks])
+    np.testing.assert_array_equal(timestamps, 1000.0 + np.arange(10))
+    np.testing.assert_array_equal(stored, points.astype(np.float32))
+    reader.close()
+
+
+def test_reanalyze_matches_live_scoring(recording):
+    path, points = recording
+    profile = DEFAULT_PROFILE.compile()
+    expected = profile.evaluate_points(points.astype(np.float32).astype(np.float64))
+    scores = np.concatenate([evaluation.scores for _, evaluation in reanalyze(path, profile)])
+    np.testing.assert_array_equal(scores, expected.scores)
+
+
+def test_truncated_chunk_is_ignored_and_appending_resumes(recording):
+    path, points = recording
+    size = path.stat().st_size
+    with open(path, "r+b") as file:
+        file.truncate(size - 16)
+    assert len(LandmarkRecording(path)) == 8
+
+    with LandmarkRecorder(path) as recorder:
+        assert recorder.frames_written == 8
+        recorder.append(points[0], timestamp=2000.0)
+    assert len(LandmarkRecording(path)) == 9
+
+
+def test_summarize_uses_profile_max_score(recording):
+    path, _ = recording
+    # Every frame scores above 100, so a worst score clamped to 100 would show
+    profile = RuleProfile(
+        name="wide",
+        rules=[PostureRule(id="never", metric="neck_angle", op=">", threshold=1000, issue="Never")],
+        grade_bands=[GradeBand(min_score=0, grade="Any")],
+        max_score=150
+    ).compile()
+    frames_out = io.StringIO()
+    summary = summarize(path, profile, frames_out)
+    assert summary["frames"] == 10
+    assert summary["best_score"] == summary["worst_score"] == 150
+    assert summary["grade_distribution"] == {"Any": 10}
+    lines = [json.loads(line) for line in frames_out.getvalue().splitlines()]
+    assert [line["timestamp"] for line in lines] == [1000.0 + index for index in range(10)]
+
+
+def test_summarize_worst_score_across_chunks(recording):
+    path, points = recording
+    profile = DEFAULT_PROFILE.compile()
+    scores = profile.evaluate_points(points.astype(np.float32).astype(np.float64)).scores
+    summary = summarize(path, profile)
+    assert summary["worst_score"] == int(scores.min())
+    assert summary["best_score"] == int(scores.max())
+
+
+def test_buffer_is_flushed_every_interval(tmp_path, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(landmark_recording, "time", SimpleNamespace(time=lambda: 1000.0 + now[0],
+                                                                    monotonic=lambda: now[0]))
+    points = _frames(6)
+    path = tmp_path / "session.plmk"
+    recorder = LandmarkRecorder(path, flush_interval=5.0)
+    for frame in points[:3]:
+        recorder.append(frame)
+        now[0] += 2.0
+    # The third frame arrived 4 s in; the fourth, at 6 s, writes all four
+    assert len(LandmarkRecording(path)) == 0
+    recorder.append(points[3])
+    assert len(LandmarkRecording(path)) == 4
+    recorder.append(points[4])
+    assert len(LandmarkRecording(path)) == 4
+    # Without close(), as after a crash: only the unflushed frame is lost
+    reader = LandmarkRecording(path)
+    assert [len(timestamps) for timestamps, _ in reader.iter_chunks()] == [4]
+    reader.close()
+    recorder.close()
+    assert len(LandmarkRecording(path)) == 5
+
+
+def test_interval_flush_can_be_disabled(tmp_path, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(landmark_recording, "time", SimpleNamespace(time=lambda: now[0], monotonic=lambda: now[0]))
+    path = tmp_path / "session.plmk"
+    with LandmarkRecorder(path, chunk_frames=3, flush_interval=None) as recorder:
+        for frame in _frames(2):
+            now[0] += 60.0
+            recorder.append(frame)
+        assert len(LandmarkRecording(path)) == 0
+    assert len(LandmarkRecording(path)) == 2
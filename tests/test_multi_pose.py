@@ -0,0 +1,128 @@
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from multi_pose import MultiPersonAnalyzer, PersonTracker
+from stub_pose import StubMultiPose
+
+IMAGE = np.zeros((480, 640, 3), np.uint8)
+
+
+def _box(x, width=50):
+    return np.array([x, 0, x + width, 200], dtype=np.float64)
+
+
+class ScriptedPoses:
+    """Detector returning prepared poses frame by frame."""
+
+    def __init__(self, frames):
+        self.frames = list(frames)
+
+    def detect(self, image):
+        return self.frames.pop(0)
+
+    def close(self):
+        pass
+
+
+def _pose(shift_x, head_forward=0.0):
+    landmarks = StubMultiPose(people=1, jitter=0.0)._standing(shift_x)
+    for index in (7, 8):   # ears
+        landmarks[index] = SimpleNamespace(x=landmarks[index].x + head_forward, y=landmarks[index].y + 0.05,
+                                           z=0.0, visibility=0.99)
+    return landmarks
+
+
+def test_ids_are_stable_across_shuffled_frames():
+    analyzer = MultiPersonAnalyzer(detector=StubMultiPose(people=3, seed=7))
+    first = analyzer.analyze(IMAGE)
+    positions = {track.person_id: track.box[0] for track, _ in first}
+    assert sorted(positions) == [1, 2, 3]
+    for _ in range(30):
+        people = analyzer.analyze(IMAGE)
+        assert [track.person_id for track, _ in people] == [1, 2, 3]
+        for track, _ in people:
+            assert abs(track.box[0] - positions[track.person_id]) < 20
+    assert analyzer.tracker.stats == {'tracks_started': 3, 'tracks_dropped': 0}
+
+
+def test_track_survives_max_missed_frames_then_is_dropped():
+    tracker = PersonTracker(max_missed=3)
+    [track] = tracker.update(np.array([_box(100)]))
+    for missed in range(1, 4):
+        assert tracker.update(np.empty((0, 4))) == []
+        assert tracker.tracks == [track] and track.missed == missed
+    # Back within max_missed frames: same id
+    assert tracker.update(np.array([_box(100)])) == [track]
+    assert track.missed == 0
+
+    for _ in range(3):
+        tracker.update(np.empty((0, 4)))
+    assert tracker.tracks == [track]
+    tracker.update(np.empty((0, 4)))
+    assert tracker.tracks == []
+    assert tracker.stats == {'tracks_started': 1, 'tracks_dropped': 1}
+    [returning] = tracker.update(np.array([_box(100)]))
+    assert returning.person_id == 2
+
+
+def test_moving_people_keep_their_ids():
+    tracker = PersonTracker()
+    ids = None
+    for frame in range(20):
+        boxes = np.array([_box(300 - 6 * frame), _box(10 + 8 * frame)])
+        tracks = tracker.update(boxes[::-1] if frame % 2 else boxes)
+        if frame % 2:
+            tracks = tracks[::-1]
+        current = [track.person_id for track in tracks]
+        ids = ids or current
+        assert current == ids
+
+
+def test_frame_without_people():
+    analyzer = MultiPersonAnalyzer(detector=StubMultiPose(people=0))
+    people = analyzer.analyze(IMAGE)
+    assert people == []
+    response = analyzer.build_response(people).model_dump()
+    assert response == {"people": [], "person_count": 0, "tracked_people": 0, "frame_count": 1}
+
+
+def test_each_person_keeps_their_own_history():
+    frames = [[_pose(-0.3), _pose(0.3, head_forward=0.06)] for _ in range(4)]
+    frames.append([_pose(0.3, head_forward=0.06)])   # first person out of view
+    analyzer = MultiPersonAnalyzer(detector=ScriptedPoses(frames))
+    for _ in range(5):
+        people = analyzer.analyze(IMAGE)
+    response = analyzer.build_response(people)
+    assert [person.person_id for person in response.people] == [2]
+    assert response.tracked_people == 2
+
+    upright, leaning = sorted(analyzer.tracker.tracks, key=lambda track: track.person_id)
+    assert upright.frame_count == 4 and leaning.frame_count == 5
+    assert len(upright.posture_history) == 4 and len(leaning.posture_history) == 5
+    assert len(set(upright.posture_history)) == len(set(leaning.posture_history)) == 1
+    assert upright.posture_history[0] > leaning.posture_history[0]
+    assert upright.average_score == upright.posture_history[0]
+    assert len(upright.angle_history['neck']) == 4 and len(leaning.angle_history['neck']) == 5
+    assert upright.angle_history['neck'][0] < leaning.angle_history['neck'][0]
+
+    [person] = response.people
+    assert person.posture_history == [float(score) for score in leaning.posture_history]
+    assert "Forward head posture detected" in person.analysis.issues
+
+
+def test_endpoint_returns_people_by_id():
+    jpeg = cv2.imencode(".jpg", IMAGE)[1].tobytes()
+    with TestClient(server.app) as client:
+        for _ in range(3):
+            response = client.post("/api/analyze_frame_multi?session_id=room",
+                                   files={"file": ("frame.jpg", jpeg, "image/jpeg")})
+        assert response.status_code == 200
+        body = response.json()
+        assert [person["person_id"] for person in body["people"]] == [1, 2]
+        assert all(person["frame_count"] == 3 for person in body["people"])
+        assert body["frame_count"] == 3
@@ -0,0 +1,148 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from pose_roi import PoseRegionOfInterest
+from posture_analyzer import POSE_LANDMARK_IDS, PostureAnalyzer
+from posture_rules import LANDMARK_NAMES
+from stub_pose import StubPose
+
+WIDTH, HEIGHT = 640, 480
+
+
+class FramePose:
+    """Pose model stand-in that reports fixed full-frame landmarks relative to its input.
+
+    Landmarks are normalized to the region the analyzer cropped, as a real model would
+    place them in the image it was given.
+    """
+
+    def __init__(self, roi: PoseRegionOfInterest, points: np.ndarray, visibility: float = 0.99):
+        self.roi = roi
+        self.points = points            # (33, 2) full-frame pixels
+        self.visibility = np.full(len(points), visibility)
+        self.lose_in_crop = False
+        self.inputs = []
+
+    def process(self, image):
+        self.inputs.append(image.shape[:2])
+        x0, y0, x1, y1 = self.roi.region or (0, 0, WIDTH, HEIGHT)
+        if self.lose_in_crop and self.roi.region is not None:
+            return SimpleNamespace(pose_landmarks=None)
+        landmarks = [SimpleNamespace(x=(x - x0) / (x1 - x0), y=(y - y0) / (y1 - y0), z=0.0, visibility=visibility)
+                     for (x, y), visibility in zip(self.points, self.visibility)]
+        return SimpleNamespace(pose_landmarks=SimpleNamespace(landmark=landmarks))
+
+    def close(self):
+        pass
+
+
+def _standing_points():
+    landmarks = StubPose(jitter=0.0)._standing()
+    # Put the pose in the top half, so the crop is smaller than the frame both ways
+    return np.array([(landmark.x * WIDTH, landmark.y * HEIGHT / 2 + 40) for landmark in landmarks])
+
+
+IMAGE = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+
+
+def _analyzer(points, **roi_options):
+    roi = PoseRegionOfInterest(**roi_options)
+    analyzer = PostureAnalyzer(roi=roi)
+    analyzer.pose.close()
+    analyzer.pose = FramePose(roi, points)
+    return analyzer, roi
+
+
+def _expected(points, scale=1.0):
+    return {name: tuple(points[landmark_id] * scale) for name, landmark_id in zip(LANDMARK_NAMES, POSE_LANDMARK_IDS)}
+
+
+@pytest.mark.parametrize("max_side", [None, 64])
+def test_crop_landmarks_map_back_to_the_full_frame(max_side):
+    points = _standing_points()
+    analyzer, roi = _analyzer(points, max_side=max_side)
+
+    full = analyzer.detect_landmarks(IMAGE, scale=2.0)
+    assert roi.region is not None
+    x0, y0, x1, y1 = roi.region
+    assert 0 < x1 - x0 < WIDTH and 0 < y1 - y0 < HEIGHT
+    cropped = analyzer.detect_landmarks(IMAGE, scale=2.0)
+
+    for landmarks in (full, cropped):
+        for name, (x, y) in _expected(points, 2.0).items():
+            assert landmarks[name] == pytest.approx((x, y))
+    full_input, crop_input = analyzer.pose.inputs
+    if max_side:
+        assert max(full_input) == max(crop_input) == max_side
+    else:
+        assert full_input == (HEIGHT, WIDTH)
+        assert crop_input == (y1 - y0, x1 - x0)
+    assert roi.get_stats() == {'roi_frames': 1, 'full_frames': 1, 'fallbacks': 0, 'retries': 0, 'hit_rate': 0.5}
+
+
+def test_region_stays_fixed_while_the_pose_stays_inside():
+    points = _standing_points()
+    analyzer, roi = _analyzer(points)
+    analyzer.detect_landmarks(IMAGE)
+    region = roi.region
+    analyzer.pose.points = points + (2, 1)
+    analyzer.detect_landmarks(IMAGE)
+    assert roi.region == region
+
+
+def test_pose_near_a_crop_edge_falls_back_to_the_full_frame():
+    points = _standing_points()
+    analyzer, roi = _analyzer(points)
+    analyzer.detect_landmarks(IMAGE)
+    x0, _, x1, _ = roi.region
+    # Move the pose so its right side sits on the crop's right edge
+    analyzer.pose.points = points + (x1 - points[:, 0].max() - 1, 0)
+    analyzer.detect_landmarks(IMAGE)
+    assert roi.region is None
+    assert roi.stats['fallbacks'] == 1
+    analyzer.detect_landmarks(IMAGE)
+    assert analyzer.pose.inputs[-1] == (HEIGHT, WIDTH)
+    assert roi.stats['full_frames'] == 2
+
+
+def test_low_visibility_falls_back_to_the_full_frame():
+    points = _standing_points()
+    analyzer, roi = _analyzer(points)
+    analyzer.detect_landmarks(IMAGE)
+    assert roi.region is not None
+    analyzer.pose.visibility[:] = 0.2
+    analyzer.detect_landmarks(IMAGE)
+    assert roi.region is None
+    assert roi.stats['fallbacks'] == 1
+
+
+def test_pose_lost_in_the_crop_is_retried_on_the_full_frame():
+    points = _standing_points()
+    analyzer, roi = _analyzer(points)
+    analyzer.detect_landmarks(IMAGE)
+    analyzer.pose.lose_in_crop = True
+    landmarks = analyzer.detect_landmarks(IMAGE)
+    assert landmarks is not None
+    for name, (x, y) in _expected(points).items():
+        assert landmarks[name] == pytest.approx((x, y))
+    # The crop, then the retry on the full frame
+    assert analyzer.pose.inputs[-1] == (HEIGHT, WIDTH)
+    assert analyzer.pose.inputs[-2] != (HEIGHT, WIDTH)
+    assert roi.stats['retries'] == 1
+    # The retry found the pose, so the next frame is cropped again
+    assert roi.region is not None
+
+
+def test_roi_endpoint(monkeypatch):
+    with TestClient(server.app) as client:
+        assert client.get("/api/inference/roi").json() == {"enabled": False}
+        roi = PoseRegionOfInterest()
+        roi.stats.update(roi_frames=3, full_frames=1)
+        monkeypatch.setattr(server.analyzer, "roi", roi)
+        assert client.get("/api/inference/roi").json() == {
+            "enabled": True, "roi_frames": 3, "full_frames": 1, "fallbacks": 0, "retries": 0, "hit_rate": 0.75
+        }
@@ -0,0 +1,167 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+import posture_rules
+from posture_rules import DEFAULT_PROFILE, get_active_profile, landmarks_to_array, load_profile
+
+STANDING = {
+    'nose': (322.0, 80.0), 'left_ear': (312.0, 78.0), 'right_ear': (332.0, 78.0),
+    'left_shoulder': (290.0, 150.0), 'right_shoulder': (350.0, 151.0),
+    'left_elbow': (285.0, 230.0), 'right_elbow': (355.0, 230.0),
+    'left_hip': (300.0, 300.0), 'right_hip': (340.0, 301.0),
+    'left_knee': (301.0, 400.0), 'right_knee': (339.0, 400.0),
+    'left_ankle': (302.0, 500.0), 'right_ankle': (338.0, 500.0)
+}
+
+
+def _moved(**changes):
+    landmarks = dict(STANDING)
+    landmarks.update(changes)
+    return landmarks
+
+
+FIXTURES = {
+    'standing': STANDING,
+    'forward_head': _moved(left_ear=(352.0, 120.0), right_ear=(372.0, 120.0)),
+    'uneven_shoulders': _moved(left_shoulder=(290.0, 125.0)),
+    'hip_tilt': _moved(right_hip=(340.0, 320.0)),
+    'bent_knee': _moved(left_knee=(340.0, 400.0)),
+    'leaning': _moved(nose=(380.0, 80.0), left_ear=(370.0, 78.0), right_ear=(390.0, 78.0)),
+    'everything': _moved(left_ear=(352.0, 120.0), right_ear=(372.0, 120.0), left_shoulder=(290.0, 125.0),
+                         right_hip=(340.0, 320.0), left_knee=(340.0, 400.0), nose=(380.0, 80.0)),
+    'no_legs': {name: point for name, point in STANDING.items() if 'knee' not in name and 'ankle' not in name},
+    'no_head': {name: point for name, point in STANDING.items() if name not in ('nose', 'left_ear', 'right_ear')}
+}
+
+
+def _baseline_analysis(landmarks):
+    """The hand-written analysis the rule engine replaced, kept as the reference."""
+    issues, detailed_issues, recommendations, angles, measurements = [], {}, [], {}, {}
+    if all(k in landmarks for k in ['nose', 'left_ear', 'right_ear', 'left_shoulder', 'right_shoulder']):
+        ear_center = ((landmarks['left_ear'][0] + landmarks['right_ear'][0]) / 2,
+                      (landmarks['left_ear'][1] + landmarks['right_ear'][1]) / 2)
+        shoulder_center = ((landmarks['left_shoulder'][0] + landmarks['right_shoulder'][0]) / 2,
+                           (landmarks['left_shoulder'][1] + landmarks['right_shoulder'][1]) / 2)
+        head_forward = abs(ear_center[0] - shoulder_center[0])
+        vertical_distance = abs(ear_center[1] - shoulder_center[1])
+        if vertical_distance > 0:
+            neck_angle = math.degrees(math.atan(head_forward / vertical_distance))
+            angles['neck_angle'] = round(neck_angle, 1)
+            if neck_angle > 15:
+                issues.append("Forward head posture detected")
+                detailed_issues['forward_head'] = f"Head is {neck_angle:.1f}° forward"
+                recommendations.append("Practice chin tucks and neck strengthening exercises")
+    if 'left_shoulder' in landmarks and 'right_shoulder' in landmarks:
+        shoulder_diff = abs(landmarks['left_shoulder'][1] - landmarks['right_shoulder'][1])
+        shoulder_angle = math.degrees(math.atan2(
+            shoulder_diff, abs(landmarks['left_shoulder'][0] - landmarks['right_shoulder'][0])))
+        angles['shoulder_angle'] = round(180 - shoulder_angle, 1)
+        if shoulder_diff > 20:
+            issues.append("Uneven shoulder height")
+            detailed_issues['shoulder_imbalance'] = f"Shoulder height difference: {shoulder_diff:.1f}px"
+            recommendations.append("Focus on shoulder blade exercises and posture awareness")
+    if 'left_hip' in landmarks and 'right_hip' in landmarks:
+        hip_diff = abs(landmarks['left_hip'][1] - landmarks['right_hip'][1])
+        hip_angle = 180 - math.degrees(math.atan2(hip_diff, abs(landmarks['left_hip'][0] - landmarks['right_hip'][0])))
+        angles['hip_angle'] = round(hip_angle, 1)
+        if hip_diff > 15:
+            issues.append("Hip misalignment detected")
+            detailed_issues['hip_tilt'] = f"Hip height difference: {hip_diff:.1f}px"
+            recommendations.append("Strengthen core muscles and practice pelvic tilts")
+    if all(k in landmarks for k in ['left_hip', 'left_knee', 'left_ankle']):
+        hip, knee, ankle = (np.array(landmarks[k]) for k in ('left_hip', 'left_knee', 'left_ankle'))
+        vector1, vector2 = hip - knee, ankle - knee
+        cos_angle = np.clip(np.dot(vector1, vector2) / (np.linalg.norm(vector1) * np.linalg.norm(vector2)), -1, 1)
+        knee_angle = math.degrees(np.arccos(cos_angle))
+        angles['knee_angle'] = round(knee_angle, 1)
+        if knee_angle < 160:
+            issues.append("Knee flexion while standing")
+            detailed_issues['knee_bend'] = f"Knee angle: {knee_angle:.1f}°"
+            recommendations.append("Focus on standing posture and leg strengthening")
+    if all(k in landmarks for k in ['nose', 'left_shoulder', 'right_shoulder', 'left_hip', 'right_hip']):
+        shoulder_center_x = (landmarks['left_shoulder'][0] + landmarks['right_shoulder'][0]) / 2
+        hip_center_x = (landmarks['left_hip'][0] + landmarks['right_hip'][0]) / 2
+        head_hip_offset = abs(landmarks['nose'][0] - hip_center_x)
+        measurements['head_hip_offset'] = head_hip_offset
+        measurements['shoulder_hip_offset'] = abs(shoulder_center_x - hip_center_x)
+        if head_hip_offset > 30:
+            issues.append("Poor overall spinal alignment")
+            recommendations.append("Focus on whole-body postural awareness")
+
+    score = 100 - len(issues) * 15
+    if 'neck_angle' in angles:
+        score -= max(0, (angles['neck_angle'] - 10) * 2)
+    if 'shoulder_angle' in angles:
+        score -= max(0, abs(angles['shoulder_angle'] - 180) * 0.5)
+    if 'knee_angle' in angles and angles['knee_angle'] < 170:
+        score -= (170 - angles['knee_angle']) * 0.5
+    score = max(0, min(100, int(score)))
+    grade = next(grade for edge, grade in [(95, "A+"), (90, "A"), (85, "B+"), (80, "B"), (75, "C+"),
+                                           (70, "C"), (60, "D"), (0, "F")] if score >= edge)
+    return {
+        'score': score, 'grade': grade, 'issues': issues, 'detailed_issues': detailed_issues,
+        'angles': angles, 'measurements': measurements,
+        'recommendations': recommendations or list(DEFAULT_PROFILE.default_recommendations)
+    }
+
+
+@pytest.fixture
+def profile():
+    return DEFAULT_PROFILE.compile()
+
+
+def test_fixtures_cover_every_rule(profile):
+    fired = {issue for landmarks in FIXTURES.values() for issue in _baseline_analysis(landmarks)['issues']}
+    assert fired == {rule.issue for rule in DEFAULT_PROFILE.rules}
+
+
+@pytest.mark.parametrize("name", FIXTURES)
+def test_single_frame_matches_baseline(profile, name):
+    points = landmarks_to_array(FIXTURES[name])
+    result = profile.result(profile.evaluate_points(points[np.newaxis]), 0)
+    assert result.model_dump() == _baseline_analysis(FIXTURES[name])
+
+
+def test_batch_matches_baseline(profile):
+    points = np.stack([landmarks_to_array(landmarks) for landmarks in FIXTURES.values()])
+    evaluation = profile.evaluate_points(points)
+    assert len(evaluation) == len(FIXTURES)
+    for index, landmarks in enumerate(FIXTURES.values()):
+        expected = _baseline_analysis(landmarks)
+        assert profile.result(evaluation, index).model_dump() == expected
+        assert int(evaluation.scores[index]) == expected['score']
+        assert evaluation.grades[index] == expected['grade']
+
+
+def test_scalar_score_matches_baseline(profile):
+    for landmarks in FIXTURES.values():
+        expected = _baseline_analysis(landmarks)
+        values = {**expected['angles'], **expected['measurements']}
+        assert profile.score(values, len(expected['issues']) * 15) == expected['score']
+
+
+def test_custom_profile_loads_from_environment(tmp_path, monkeypatch):
+    custom = {
+        "name": "strict",
+        "rules": [{"id": "forward_head", "metric": "neck_angle", "op": ">", "threshold": 5,
+                   "issue": "Head forward", "penalty": 40}],
+        "grade_bands": [{"min_score": 50, "grade": "Pass"}, {"min_score": 0, "grade": "Fail"}],
+        "max_score": 120
+    }
+    path = tmp_path / "strict.json"
+    path.write_text(json.dumps(custom))
+    assert load_profile(str(path)).name == "strict"
+
+    monkeypatch.setenv("POSTURE_RULE_PROFILE", str(path))
+    monkeypatch.setattr(posture_rules, "_active_profile", None)
+    profile = get_active_profile()
+    assert profile.profile.name == "strict"
+
+    evaluation = profile.evaluate_points(np.stack([landmarks_to_array(FIXTURES['standing']),
+                                                   landmarks_to_array(FIXTURES['forward_head'])]))
+    assert evaluation.scores.tolist() == [120, 80]
+    assert evaluation.grades == ["Pass", "Pass"]
+    assert profile.result(evaluation, 1).issues == ["Head forward"]
@@ -0,0 +1,125 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from progress_series import ProgressChartCache, bucket_start, build_progress_chart, lttb
+
+
+async def _sessions(rows):
+    for row in rows:
+        yield row
+
+
+def _chart(rows, resolution="auto", points=200):
+    return asyncio.run(build_progress_chart(_sessions(rows), resolution, points))
+
+
+def test_lttb_keeps_endpoints_and_length():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 30) * 40 + 50
+    indices = lttb(x, y, 50)
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_keeps_a_lone_spike():
+    x = np.arange(500, dtype=np.float64)
+    y = np.full(500, 70.0)
+    y[317] = 5.0
+    assert 317 in lttb(x, y, 20)
+
+
+def test_lttb_returns_everything_when_it_fits():
+    x = np.arange(10, dtype=np.float64)
+    np.testing.assert_array_equal(lttb(x, x, 10), np.arange(10))
+    np.testing.assert_array_equal(lttb(x, x, 2), np.arange(10))
+
+
+@pytest.mark.parametrize("resolution", ["auto", "lttb"])
+def test_downsampled_chart_has_requested_points(resolution):
+    start = datetime(2024, 1, 1)
+    rows = [{"date": start + timedelta(minutes=10 * i), "score": 50 + i % 40, "grade": "C"} for i in range(3000)]
+    chart = _chart(rows, resolution, 120)
+    assert chart["points"] == len(chart["progress_data"]) == 120
+    assert chart["resolution"] == "lttb"
+    # Newest first, with the first and last sessions kept
+    assert chart["progress_data"][0]["date"] == rows[-1]["date"].isoformat()
+    assert chart["progress_data"][-1]["date"] == rows[0]["date"].isoformat()
+    assert chart["summary"]["total_sessions"] == 3000
+
+
+def test_auto_keeps_raw_sessions_that_fit():
+    rows = [{"date": datetime(2024, 1, 1, hour), "score": 60 + hour, "session_type": "Live"} for hour in range(5)]
+    chart = _chart(rows)
+    assert chart["resolution"] == "raw"
+    assert [point["score"] for point in chart["progress_data"]] == [64, 63, 62, 61, 60]
+
+
+def test_bucket_start():
+    moment = datetime(2024, 3, 14, 15, 9, 26)   # a Thursday
+    assert bucket_start(moment, "hour") == datetime(2024, 3, 14, 15)
+    assert bucket_start(moment, "day") == datetime(2024, 3, 14)
+    assert bucket_start(moment, "week") == datetime(2024, 3, 11)
+
+
+BUCKET_ROWS = [
+    {"date": datetime(2024, 3, 10, 23, 30), "score": 40},   # Sunday, previous week
+    {"date": datetime(2024, 3, 11, 8, 5), "score": 60},
+    {"date": datetime(2024, 3, 11, 8, 55), "score": 81},
+    {"date": datetime(2024, 3, 11, 9, 10), "score": 70},
+    {"date": datetime(2024, 3, 13, 18, 0), "score": 90},
+]
+
+
+@pytest.mark.parametrize("resolution, expected", [
+    ("hour", [("2024-03-13T18:00:00", 90.0, 90, 90, 1), ("2024-03-11T09:00:00", 70.0, 70, 70, 1),
+              ("2024-03-11T08:00:00", 70.5, 60, 81, 2), ("2024-03-10T23:00:00", 40.0, 40, 40, 1)]),
+    ("day", [("2024-03-13T00:00:00", 90.0, 90, 90, 1), ("2024-03-11T00:00:00", 70.3, 60, 81, 3),
+             ("2024-03-10T00:00:00", 40.0, 40, 40, 1)]),
+    ("week", [("2024-03-11T00:00:00", 75.2, 60, 90, 4), ("2024-03-04T00:00:00", 40.0, 40, 40, 1)]),
+])
+def test_time_buckets(resolution, expected):
+    chart = _chart(BUCKET_ROWS, resolution)
+    assert chart["resolution"] == resolution
+    assert [(point["date"], point["score"], point["min_score"], point["max_score"], point["sessions"])
+            for point in chart["progress_data"]] == expected
+    assert chart["summary"]["total_sessions"] == 5
+    assert chart["summary"]["best_score"] == 90
+
+
+def test_buckets_beyond_points_are_reduced():
+    rows = [{"date": datetime(2024, 1, 1) + timedelta(hours=i), "score": i % 100} for i in range(500)]
+    chart = _chart(rows, "hour", 50)
+    assert chart["points"] == 50
+    assert chart["resolution"] == "hour"
+
+
+def test_cache_entries_follow_the_version():
+    cache = ProgressChartCache(capacity=2, ttl=60)
+    cache.put("a", 1, {"chart": 1})
+    assert cache.get("a", 1) == {"chart": 1}
+    assert cache.get("a", 2) is None
+    cache.put("b", 1, {})
+    cache.put("c", 1, {})
+    assert cache.get("a", 1) is None     # evicted as least recently used
+    assert cache.get_stats() == {"entries": 2, "hits": 1, "misses": 2}
+
+
+def test_chart_cache_is_invalidated_by_a_new_session():
+    with TestClient(server.app) as client:
+        url = "/api/progress/chart?days=3650&points=500&resolution=lttb"
+        before = client.get(url).json()
+        hits = client.get("/api/progress/chart/cache").json()["hits"]
+        assert client.get(url).json() == before
+        assert client.get("/api/progress/chart/cache").json()["hits"] == hits + 1
+
+        created = client.post("/api/sessions", json={"duration": "00:05:00", "score": 77, "grade": "C+"})
+        assert created.status_code == 200
+        after = client.get(url).json()
+        assert after["summary"]["total_sessions"] == before["summary"]["total_sessions"] + 1
+        assert after["progress_data"][0]["score"] == 77
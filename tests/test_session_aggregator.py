@@ -0,0 +1,208 @@
+import asyncio
+
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from landmark_recording import LandmarkRecorder, LandmarkRecording
+from session_aggregator import LiveSessionTracker, SessionAggregate, format_duration
+
+JPEG = cv2.imencode(".jpg", np.zeros((240, 320, 3), np.uint8))[1].tobytes()
+
+
+def _frame(score, grade="B", issues=(), neck=20.0):
+    return score, grade, tuple(issues), {"neck_angle": neck}
+
+
+def _grade(score):
+    return "A" if score >= 90 else "B" if score >= 80 else "C"
+
+
+def test_running_statistics():
+    aggregate = SessionAggregate("s")
+    for second, score in enumerate([70, 80, 90]):
+        aggregate.add(_frame(score, neck=10.0 * (second + 1)), now=100.0 + second)
+    aggregate.add(None, now=103.0)
+    summary = aggregate.summary()
+    assert summary["frames"] == 3 and summary["no_pose_frames"] == 1
+    assert summary["score"] == {"mean": 80.0, "std": 8.16, "min": 70, "max": 90, "samples": 3}
+    assert summary["angles"]["neck_angle"]["mean"] == 20.0
+    assert summary["active_seconds"] == 2.0
+
+
+def test_issue_frequency_and_grade_seconds():
+    aggregate = SessionAggregate("s", max_gap=2.0)
+    aggregate.add(_frame(60, "C", ["Forward head posture detected"]), now=0.0)
+    aggregate.add(_frame(85, "B"), now=1.0)
+    # A pause in the stream counts as at most max_gap seconds of the previous grade
+    aggregate.add(_frame(95, "A"), now=11.0)
+    aggregate.add(_frame(95, "A", ["Forward head posture detected"]), now=12.0)
+    summary = aggregate.summary()
+    assert summary["issue_frequency"] == {"Forward head posture detected": 0.5}
+    assert summary["grade_seconds"] == {"C": 1.0, "B": 2.0, "A": 1.0}
+
+
+def test_best_and_worst_stretches_and_improvements():
+    aggregate = SessionAggregate("s", stretch_seconds=10.0)
+    for second in range(31):
+        score = 60 if second < 10 else 90 if second >= 20 else 75
+        issues = ["Uneven shoulders"] if second < 10 else []
+        aggregate.add(_frame(score, issues=issues), now=float(second))
+    summary = aggregate.summary()
+    assert summary["worst_stretch"]["average_score"] < 65
+    assert summary["best_stretch"] == {"start_s": 20.0, "end_s": 30.0, "average_score": 90.0}
+    assert aggregate.improvements() == ["Score improved from 61 to 90 during the session",
+                                        "Corrected: Uneven shoulders"]
+
+
+def test_short_session_is_its_own_stretch():
+    aggregate = SessionAggregate("s", stretch_seconds=30.0)
+    aggregate.add(_frame(80), now=0.0)
+    aggregate.add(_frame(90), now=4.0)
+    summary = aggregate.summary()
+    assert summary["best_stretch"] == summary["worst_stretch"] == {"start_s": 0.0, "end_s": 4.0, "average_score": 85.0}
+    assert aggregate.improvements() == []
+
+
+def test_to_session():
+    aggregate = SessionAggregate("s")
+    for second in range(20):
+        issues = ["Hip tilt"] if second < 3 else ["Leaning"] if second == 3 else []
+        aggregate.add(_frame(84 + second % 2, issues=issues), now=3600.0 + second * 200)
+    session = aggregate.to_session("user", _grade)
+    assert session.user_id == "user"
+    assert session.score == 84 and session.grade == "B"
+    assert session.duration == format_duration(19 * 200) == "01:03:20"
+    # Issues seen in fewer than 10% of frames are left out
+    assert session.issues == ["Hip tilt"]
+    assert session.angles == {"neck_angle": 20.0}
+    assert session.summary["frames"] == 20
+
+
+class SavedSessions(list):
+    async def __call__(self, session):
+        self.append(session)
+        return session
+
+
+def test_tracker_saves_each_session_once():
+    async def run():
+        saved = SavedSessions()
+        tracker = LiveSessionTracker(saved, "user", _grade, min_frames=3)
+        for score in (80, 90, 100):
+            tracker.record("a", _frame(score))
+        tracker.record("b", _frame(50))
+        tracker.record("b", None)
+        ended = await tracker.end("a")
+        again = await tracker.end("a")
+        short = await tracker.end("b")
+        return saved, ended, again, short, tracker.get_stats()
+
+    saved, ended, again, short, stats = asyncio.run(run())
+    assert [session.score for session in saved] == [90]
+    assert ended is saved[0]
+    assert again is None and short is None
+    assert stats["finalized"] == 1 and stats["discarded"] == 1
+    assert stats["open_sessions"] == {}
+
+
+def test_idle_sessions_are_swept_and_open_ones_saved_at_stop():
+    async def run():
+        saved = SavedSessions()
+        tracker = LiveSessionTracker(saved, "user", _grade, idle_timeout=60, min_frames=1)
+        tracker.record("idle", _frame(70))
+        tracker.record("active", _frame(80))
+        tracker._sessions["idle"].last_seen -= 61
+        await tracker.sweep()
+        swept = [session.score for session in saved]
+        tracker.start()
+        await tracker.stop()
+        return swept, [session.score for session in saved], tracker.get_stats()
+
+    swept, saved, stats = asyncio.run(run())
+    assert swept == [70]
+    assert saved == [70, 80]
+    assert stats["idle_finalized"] == 1 and stats["finalized"] == 2
+
+
+def test_every_ending_session_is_reported():
+    async def run():
+        ended = []
+        tracker = LiveSessionTracker(SavedSessions(), "user", _grade, idle_timeout=60, min_frames=2,
+                                     on_end=ended.append)
+        for session_id in ("saved", "short", "idle", "open"):
+            tracker.record(session_id, _frame(80))
+        tracker.record("saved", _frame(80))
+        await tracker.end("saved")
+        await tracker.end("short")
+        await tracker.end("unknown")
+        tracker._sessions["idle"].last_seen -= 61
+        await tracker.sweep()
+        await tracker.stop()
+        return ended
+
+    # Sessions too short to save still end
+    assert asyncio.run(run()) == ["saved", "short", "idle", "open"]
+
+
+def test_failing_end_hook_does_not_lose_the_session():
+    def fail(session_id):
+        raise OSError("disk full")
+
+    async def run():
+        saved = SavedSessions()
+        tracker = LiveSessionTracker(saved, "user", _grade, min_frames=1, on_end=fail)
+        tracker.record("a", _frame(80))
+        await tracker.end("a")
+        return saved
+
+    assert [session.score for session in asyncio.run(run())] == [80]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    with TestClient(server.app) as client:
+        monkeypatch.setattr(server.live_sessions, "min_frames", 2)
+        yield client
+
+
+def _post_frame(client, endpoint, **params):
+    response = client.post(f"/api/{endpoint}", params=params, files={"file": ("frame.jpg", JPEG, "image/jpeg")})
+    assert response.status_code == 200
+    return response
+
+
+def test_frames_without_a_session_id_are_not_aggregated(client):
+    for endpoint in ("analyze_frame_json", "analyze_frame"):
+        _post_frame(client, endpoint)
+    assert client.get("/api/sessions/live").json()["open_sessions"] == {}
+    assert client.post("/api/sessions/default/end").status_code == 404
+
+
+def test_concurrent_sessions_are_finalized_separately(client):
+    for _ in range(3):
+        _post_frame(client, "analyze_frame_json", session_id="first")
+    for _ in range(2):
+        _post_frame(client, "analyze_frame", session_id="second")
+    open_sessions = client.get("/api/sessions/live").json()["open_sessions"]
+    assert {session_id: stats["frames"] for session_id, stats in open_sessions.items()} == {"first": 3, "second": 2}
+
+    first = client.post("/api/sessions/first/end").json()
+    assert first["summary"]["frames"] == 3
+    assert first["session_type"] == "Real-time Analysis"
+    assert client.post("/api/sessions/first/end").status_code == 404
+    assert client.post("/api/sessions/second/end").json()["summary"]["frames"] == 2
+    assert client.get("/api/sessions/live").json()["open_sessions"] == {}
+
+
+def test_ending_a_session_flushes_the_recording(client, tmp_path, monkeypatch):
+    path = tmp_path / "default.plmk"
+    monkeypatch.setattr(server.analyzer, "recorder", LandmarkRecorder(path, flush_interval=None))
+    for _ in range(3):
+        _post_frame(client, "analyze_frame_json", session_id="recorded")
+    assert len(LandmarkRecording(path)) == 0
+    client.post("/api/sessions/recorded/end")
+    assert len(LandmarkRecording(path)) == 3
+    server.analyzer.stop_recording()
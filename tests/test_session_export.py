@@ -0,0 +1,112 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from session_export import SESSION_FIELDS, export_sessions, parse_fields
+
+DOCUMENTS = [
+    {"id": "s-1", "date": datetime(2026, 3, 1, 9, 30), "score": 81, "grade": "B",
+     "issues": ["Forward head posture detected", "Uneven shoulders"], "angles": {"neck_angle": 21.5},
+     "improvements": [], "duration": "00:10:00"},
+    {"id": "s-2", "date": datetime(2026, 3, 2, 9, 30), "score": 90, "grade": "A",
+     "issues": ['Said "hi", then left'], "angles": {}, "improvements": ["Line one\nline two"]},
+]
+
+
+async def _documents(documents):
+    for document in documents:
+        yield document
+
+
+def _export(documents, export_format, fields, batch_size=500):
+    async def run():
+        return [chunk async for chunk in export_sessions(_documents(documents), export_format, fields, batch_size)]
+    return asyncio.run(run())
+
+
+def test_parse_fields():
+    assert parse_fields(None) == SESSION_FIELDS
+    assert parse_fields("") == SESSION_FIELDS
+    assert parse_fields(" score, date ,,") == ["score", "date"]
+    with pytest.raises(ValueError, match="Unknown session fields: password"):
+        parse_fields("score,password")
+
+
+def test_ndjson_lines():
+    fields = ["id", "date", "score", "issues", "angles", "duration"]
+    [chunk] = _export(DOCUMENTS, "ndjson", fields)
+    lines = chunk.decode("utf-8").split("\n")
+    assert lines[-1] == ""
+    first, second = (json.loads(line) for line in lines[:-1])
+    assert list(first) == fields
+    assert first["date"] == "2026-03-01T09:30:00"
+    assert first["issues"] == DOCUMENTS[0]["issues"]
+    assert first["angles"] == {"neck_angle": 21.5}
+    # Missing fields are exported as null
+    assert second["duration"] is None
+
+
+def test_csv_header_and_escaping():
+    fields = ["id", "date", "score", "issues", "angles", "improvements", "duration"]
+    [chunk] = _export(DOCUMENTS, "csv", fields)
+    rows = list(csv.reader(io.StringIO(chunk.decode("utf-8"))))
+    assert rows[0] == fields
+    assert rows[1] == ["s-1", "2026-03-01T09:30:00", "81", "Forward head posture detected; Uneven shoulders",
+                       '{"neck_angle":21.5}', "", "00:10:00"]
+    # Quotes, commas and newlines survive the round trip
+    assert rows[2] == ["s-2", "2026-03-02T09:30:00", "90", 'Said "hi", then left', "{}", "Line one\nline two", ""]
+    assert len(rows) == 3
+
+
+@pytest.mark.parametrize("export_format, expected", [("ndjson", []), ("csv", [b"id,score\r\n"])])
+def test_empty_history(export_format, expected):
+    assert _export([], export_format, ["id", "score"]) == expected
+
+
+@pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+def test_one_chunk_per_batch(export_format):
+    documents = [{"id": f"s-{index}", "score": index} for index in range(5)]
+    chunks = _export(documents, export_format, ["id", "score"], batch_size=2)
+    assert len(chunks) == 3
+    text = b"".join(chunks).decode("utf-8")
+    if export_format == "csv":
+        rows = list(csv.reader(io.StringIO(text)))
+        assert rows[0] == ["id", "score"] and len(rows) == 6
+        assert chunks[0].startswith(b"id,score\r\n")
+    else:
+        assert [json.loads(line)["score"] for line in text.splitlines()] == list(range(5))
+
+
+def test_export_endpoint():
+    with TestClient(server.app) as client:
+        for score in (70, 80):
+            client.post("/api/sessions", json={"duration": "00:05:00", "score": score, "grade": "B",
+                                               "improvements": [], "issues": ["A, B"], "angles": {}})
+
+        response = client.get("/api/sessions/export", params={"format": "csv", "fields": "score,issues"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "text/csv; charset=utf-8"
+        assert response.headers["content-disposition"] == 'attachment; filename="sessions.csv"'
+        rows = list(csv.reader(io.StringIO(response.text)))
+        assert rows[0] == ["score", "issues"]
+        assert ["70", "A, B"] in rows and ["80", "A, B"] in rows
+
+        response = client.get("/api/sessions/export", params={"fields": "id,score"})
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert all(list(line) == ["id", "score"] for line in lines)
+
+        # Nothing in the range: an empty NDJSON body and a header-only CSV
+        assert client.get("/api/sessions/export", params={"days": 0}).content == b""
+        assert client.get("/api/sessions/export", params={"days": 0, "format": "csv",
+                                                          "fields": "score"}).text == "score\r\n"
+
+        assert client.get("/api/sessions/export", params={"format": "xml"}).status_code == 400
+        assert client.get("/api/sessions/export", params={"fields": "nope"}).status_code == 400
+        assert client.get("/api/sessions/export", params={"batch_size": 0}).status_code == 400
@@ -0,0 +1,165 @@
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from posture_analyzer import POSE_LANDMARK_IDS, PostureAnalyzer
+from posture_rules import LANDMARK_INDEX, LANDMARK_NAMES, landmarks_to_array
+from skeleton import SKELETON_JOINTS, CompiledSkeleton, skeleton_spec
+from stub_pose import StubPose
+
+WIDTH, HEIGHT = 640, 480
+BACKGROUND = 128
+
+# The per-connection drawing the compiled spec replaced: (colour, thickness, connections)
+BASELINE_CONNECTIONS = [
+    ((255, 255, 0), 2, [('nose', 'left_ear'), ('nose', 'right_ear')]),
+    ((0, 255, 0), 4, [('left_shoulder', 'right_shoulder'), ('left_shoulder', 'left_hip'),
+                      ('right_shoulder', 'right_hip'), ('left_hip', 'right_hip')]),
+    ((255, 0, 255), 3, [('left_shoulder', 'left_elbow'), ('right_shoulder', 'right_elbow')]),
+    ((0, 255, 255), 3, [('left_hip', 'left_knee'), ('right_hip', 'right_knee'),
+                        ('left_knee', 'left_ankle'), ('right_knee', 'right_ankle')]),
+]
+BASELINE_KEY_POINTS = {
+    'nose': ((255, 255, 255), 6),
+    'left_ear': ((255, 255, 0), 5), 'right_ear': ((255, 255, 0), 5),
+    'left_shoulder': ((0, 255, 0), 8), 'right_shoulder': ((0, 255, 0), 8),
+    'left_elbow': ((255, 0, 255), 6), 'right_elbow': ((255, 0, 255), 6),
+    'left_hip': ((0, 255, 255), 8), 'right_hip': ((0, 255, 255), 8),
+    'left_knee': ((0, 255, 255), 6), 'right_knee': ((0, 255, 255), 6),
+    'left_ankle': ((0, 255, 255), 6), 'right_ankle': ((0, 255, 255), 6),
+}
+
+
+def _baseline_lines(image, landmarks):
+    for color, thickness, connections in BASELINE_CONNECTIONS:
+        for start, end in connections:
+            if start in landmarks and end in landmarks:
+                cv2.line(image, tuple(map(int, landmarks[start])), tuple(map(int, landmarks[end])), color, thickness)
+
+
+def _baseline_joint(image, point, color, radius):
+    cv2.circle(image, point, radius, color, -1)
+    cv2.circle(image, point, radius + 1, (0, 0, 0), 2)
+
+
+def _landmarks():
+    pose = StubPose(jitter=0.0)._standing()
+    return {name: (round(pose[landmark_id].x * WIDTH), round(pose[landmark_id].y * HEIGHT))
+            for name, landmark_id in zip(LANDMARK_NAMES, POSE_LANDMARK_IDS)}
+
+
+def _canvas(height=HEIGHT, width=WIDTH):
+    return np.full((height, width, 3), BACKGROUND, np.uint8)
+
+
+def _lines_only() -> CompiledSkeleton:
+    skeleton = CompiledSkeleton()
+    skeleton.joints = skeleton.outlines = []
+    return skeleton
+
+
+def _within_a_pixel(mask, reference):
+    grown = cv2.dilate(reference.astype(np.uint8), np.ones((3, 3), np.uint8)).astype(bool)
+    return not (mask & ~grown).any()
+
+
+def test_spec_compiles_to_the_baseline_connections_and_joints():
+    skeleton = CompiledSkeleton()
+    compiled = [(color, thickness, [(LANDMARK_NAMES[a], LANDMARK_NAMES[b]) for a, b in pairs])
+                for pairs, color, thickness in skeleton.lines]
+    assert compiled == BASELINE_CONNECTIONS
+    assert SKELETON_JOINTS == BASELINE_KEY_POINTS
+
+    joints = {LANDMARK_NAMES[index]: (color, radius)
+              for indices, color, radius in skeleton.joints for index in indices}
+    assert joints == BASELINE_KEY_POINTS
+    outlines = {LANDMARK_NAMES[index]: radius for indices, radius in skeleton.outlines for index in indices}
+    assert outlines == {name: radius for name, (_, radius) in BASELINE_KEY_POINTS.items()}
+    # One draw call per group and per style, not per connection and joint
+    assert len(skeleton.lines) == 4 and len(skeleton.joints) == 6 and len(skeleton.outlines) == 3
+
+
+def test_lines_match_the_baseline_drawing():
+    landmarks = _landmarks()
+    baseline, compiled = _canvas(), _canvas()
+    _baseline_lines(baseline, landmarks)
+    _lines_only().draw(compiled, landmarks_to_array(landmarks))
+    assert np.array_equal(baseline, compiled)
+
+
+@pytest.mark.parametrize("name", list(SKELETON_JOINTS))
+def test_joints_match_the_baseline_drawing_within_a_pixel(name):
+    color, radius = SKELETON_JOINTS[name]
+    baseline, compiled = _canvas(60, 60), _canvas(60, 60)
+    _baseline_joint(baseline, (30, 30), color, radius)
+    points = np.full((len(LANDMARK_NAMES), 2), np.nan)
+    points[LANDMARK_INDEX[name]] = (30, 30)
+    CompiledSkeleton().draw(compiled, points)
+
+    assert tuple(compiled[30, 30]) == color
+    for region in (lambda image: (image != BACKGROUND).any(axis=2), lambda image: (image == color).all(axis=2)):
+        assert _within_a_pixel(region(compiled), region(baseline))
+        assert _within_a_pixel(region(baseline), region(compiled))
+    # The black outline still rings the disc
+    assert tuple(compiled[30, 30 + radius + 1]) == (0, 0, 0)
+
+
+def test_hidden_joints_are_drawn_like_missing_ones():
+    landmarks = _landmarks()
+    visible = np.ones(len(LANDMARK_NAMES), bool)
+    visible[LANDMARK_INDEX['left_knee']] = False
+
+    masked, missing = _canvas(), _canvas()
+    CompiledSkeleton().draw(masked, landmarks_to_array(landmarks), visible)
+    CompiledSkeleton().draw(missing, landmarks_to_array({k: v for k, v in landmarks.items() if k != 'left_knee'}))
+    assert np.array_equal(masked, missing)
+
+    # Both connections through the knee go with it, as in the baseline drawing
+    baseline, lines = _canvas(), _canvas()
+    _baseline_lines(baseline, {k: v for k, v in landmarks.items() if k != 'left_knee'})
+    _lines_only().draw(lines, landmarks_to_array(landmarks), visible)
+    assert np.array_equal(baseline, lines)
+    x, y = landmarks['left_knee']
+    assert (masked[y, x] == BACKGROUND).all()
+
+
+def test_analyzer_filters_by_detection_visibility():
+    analyzer = PostureAnalyzer()
+    landmarks = _landmarks()
+    analyzer.landmark_visibility = np.full(len(LANDMARK_NAMES), 0.9)
+    analyzer.landmark_visibility[LANDMARK_INDEX['right_elbow']] = analyzer.skeleton_min_visibility - 0.01
+
+    drawn, expected = _canvas(), _canvas()
+    analyzer.draw_enhanced_skeleton(drawn, landmarks)
+    CompiledSkeleton().draw(expected, landmarks_to_array({k: v for k, v in landmarks.items() if k != 'right_elbow'}))
+    assert np.array_equal(drawn, expected)
+    # An explicit visibility overrides the last detection's
+    everything, unfiltered = _canvas(), _canvas()
+    analyzer.draw_enhanced_skeleton(everything, landmarks, visibility=np.ones(len(LANDMARK_NAMES)))
+    CompiledSkeleton().draw(unfiltered, landmarks_to_array(landmarks))
+    assert np.array_equal(everything, unfiltered)
+
+
+def test_scaled_drawing_places_joints_at_scaled_positions():
+    landmarks = _landmarks()
+    image = _canvas(HEIGHT // 2, WIDTH // 2)
+    CompiledSkeleton().draw(image, landmarks_to_array(landmarks), scale=0.5)
+    for name in ('left_hip', 'right_hip', 'left_knee', 'right_knee', 'left_ankle', 'right_ankle'):
+        x, y = landmarks[name]
+        assert tuple(image[round(y / 2), round(x / 2)]) == SKELETON_JOINTS[name][0]
+
+
+def test_spec_endpoint_serves_the_compiled_spec():
+    spec = skeleton_spec(0.3)
+    assert spec["landmarks"] == LANDMARK_NAMES and spec["min_visibility"] == 0.3
+    assert [[tuple(pair) for pair in group["connections"]] for group in spec["groups"]] == \
+        [[tuple(pair) for pair in pairs.tolist()] for pairs, _, _ in CompiledSkeleton().lines]
+    # BGR drawing colours are served as RGB hex
+    assert spec["groups"][0]["color"] == "#00ffff"
+    assert {joint["landmark"]: joint["radius"] for joint in spec["joints"]} == \
+        {LANDMARK_INDEX[name]: radius for name, (_, radius) in SKELETON_JOINTS.items()}
+    with TestClient(server.app) as client:
+        served = client.get("/api/skeleton").json()
+    assert served == skeleton_spec(server.analyzer.skeleton_min_visibility)
@@ -0,0 +1,75 @@
+import pytest
+from fastapi import FastAPI, File, Request, UploadFile
+from fastapi.testclient import TestClient
+
+from upload_limits import UploadLimitMiddleware, UploadLimits
+
+
+@pytest.fixture
+def limits():
+    return UploadLimits(64, {"/upload": 1024})
+
+
+@pytest.fixture
+def client(limits):
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return {"size": len(await request.body())}
+
+    app.add_middleware(UploadLimitMiddleware, limits=limits)
+    return TestClient(app)
+
+
+def test_bodies_within_the_limit_pass(client):
+    response = client.post("/upload", files={"file": ("frame.jpg", b"x" * 500, "image/jpeg")})
+    assert response.status_code == 200
+    assert response.json() == {"size": 500}
+
+
+def test_declared_length_over_the_limit_is_refused_unread(client, limits):
+    response = client.post("/upload", files={"file": ("frame.jpg", b"x" * 2000, "image/jpeg")})
+    assert response.status_code == 413
+    assert response.headers["connection"] == "close"
+    assert response.json() == {"detail": "Request body exceeds the 1024 byte limit for this endpoint"}
+    assert limits.stats == {'rejected_declared': 1, 'rejected_streamed': 0}
+
+
+def test_chunked_body_is_cut_off_at_the_limit(client, limits):
+    sent = []
+
+    def chunks():
+        yield (b'--b\r\nContent-Disposition: form-data; name="file"; filename="f.jpg"\r\n'
+               b'Content-Type: image/jpeg\r\n\r\n')
+        for _ in range(20):
+            sent.append(1)
+            yield b"x" * 256
+
+    response = client.post("/upload", content=chunks(),
+                           headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Request body exceeds the 1024 byte limit for this endpoint"}
+    assert limits.stats == {'rejected_declared': 0, 'rejected_streamed': 1}
+
+
+def test_other_paths_use_the_default_limit(client, limits):
+    assert client.post("/echo", content=b"x" * 64).json() == {"size": 64}
+    assert client.post("/echo", content=b"x" * 65).status_code == 413
+    assert limits.limit_for("/echo") == 64
+
+
+def test_zero_disables_the_limit():
+    limits = UploadLimits(0)
+    app = FastAPI()
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return {"size": len(await request.body())}
+
+    app.add_middleware(UploadLimitMiddleware, limits=limits)
+    assert TestClient(app).post("/echo", content=b"x" * 100000).json() == {"size": 100000}
@@ -0,0 +1,112 @@
+import asyncio
+
+import cv2
+import numpy as np
+
+from posture_analyzer import PostureAnalyzer
+from video_stream import MJPEG_BOUNDARY, MJPEG_MEDIA_TYPE, LiveVideoStream, parse_source
+
+
+class FakeCaptureThread:
+    """Stands in for the capture thread, so tests publish frames by hand."""
+
+    def __init__(self):
+        self.alive = True
+
+    def is_alive(self):
+        return self.alive
+
+    def join(self):
+        self.alive = False
+
+
+def _started_stream() -> LiveVideoStream:
+    stream = LiveVideoStream(0, analyzer=object())
+    stream._loop = asyncio.get_running_loop()
+    stream._frame_event = asyncio.Event()
+    stream._thread = FakeCaptureThread()
+    return stream
+
+
+def _split_parts(body: bytes):
+    """Parse a multipart/x-mixed-replace body the way a client does, by Content-Length."""
+    jpegs = []
+    while body:
+        header, body = body.split(b"\r\n\r\n", 1)
+        lines = header.decode("ascii").split("\r\n")
+        assert lines[0] == f"--{MJPEG_BOUNDARY}"
+        headers = dict(line.split(": ", 1) for line in lines[1:])
+        assert headers["Content-Type"] == "image/jpeg"
+        length = int(headers["Content-Length"])
+        jpegs.append(body[:length])
+        assert body[length:length + 2] == b"\r\n"
+        body = body[length + 2:]
+    return jpegs
+
+
+def test_parse_source():
+    assert parse_source("0") == 0
+    assert parse_source(" 2 ") == 2
+    assert parse_source("rtsp://camera/stream") == "rtsp://camera/stream"
+    assert parse_source("clip.mp4") == "clip.mp4"
+
+
+def test_parts_are_framed_by_boundary_and_length():
+    assert MJPEG_MEDIA_TYPE == f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}"
+    stream = LiveVideoStream(0, analyzer=PostureAnalyzer())
+    parts = [stream._process(np.full((240, 320, 3), shade, np.uint8)) for shade in (40, 200)]
+
+    jpegs = _split_parts(b"".join(parts))
+    assert len(jpegs) == 2
+    for jpeg in jpegs:
+        assert jpeg.startswith(b"\xff\xd8") and jpeg.endswith(b"\xff\xd9")
+        assert cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR).shape == (240, 320, 3)
+    assert stream.stats['frames_encoded'] == 2
+
+
+def test_every_viewer_gets_the_newest_frame():
+    async def run():
+        stream = _started_stream()
+        first, second = stream.parts(), stream.parts()
+        waiting = [asyncio.ensure_future(viewer.__anext__()) for viewer in (first, second)]
+        await asyncio.sleep(0)
+        viewers = stream.viewers
+        stream._publish(1, b"one")
+        received = [await task for task in waiting]
+
+        # A viewer that falls behind skips straight to the newest frame
+        stream._publish(2, b"two")
+        stream._publish(3, b"three")
+        caught_up = [await viewer.__anext__() for viewer in (first, second)]
+
+        await first.aclose()
+        after_first = stream.viewers, stream._frame
+        await second.aclose()
+        return stream, viewers, received, caught_up, after_first
+
+    stream, viewers, received, caught_up, after_first = asyncio.run(run())
+    assert viewers == 2
+    assert received == [b"one", b"one"]
+    assert caught_up == [b"three", b"three"]
+    assert stream.stats['frames_sent'] == 2 and stream.stats['frames_skipped'] == 2
+    assert after_first == (1, (3, b"three"))
+    # The last viewer leaving drops the frame, so the next one never sees a stale image
+    assert stream.viewers == 0 and stream._frame is None
+
+
+def test_stop_ends_waiting_viewers():
+    async def run():
+        stream = _started_stream()
+        viewer = stream.parts()
+        waiting = asyncio.ensure_future(viewer.__anext__())
+        await asyncio.sleep(0)
+        await stream.stop()
+        try:
+            await waiting
+        except StopAsyncIteration:
+            return stream, True
+        return stream, False
+
+    stream, ended = asyncio.run(run())
+    assert ended
+    assert not stream.running and stream.viewers == 0